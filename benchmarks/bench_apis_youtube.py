@@ -0,0 +1,61 @@
+"""
+Cost of building the models of the youtube api responses, with and
+without validation, and as columns, over the json fixtures.
+
+    python -m benchmarks.bench_apis_youtube [items]
+
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+from datahtml.apis import youtube
+
+FIXTURES = Path(__file__).parent.parent / "tests"
+
+
+def response(name: str, n_items: int):
+    data = json.loads((FIXTURES / name).read_text())
+    items = data["items"]
+    data["items"] = [items[i % len(items)] for i in range(n_items)]
+    return data
+
+
+def rate(fn, data, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(data)
+    return len(data["items"]) * repeat / (time.perf_counter() - start)
+
+
+def main(n_items=10_000):
+    checked = youtube.Client()
+    trusted = youtube.Client(validate=False)
+    cases = [
+        (
+            "search",
+            response("youtube_search_response.json", n_items),
+            checked._dict2searchresponse,
+            trusted._dict2searchresponse,
+            youtube.search_columns,
+        ),
+        (
+            "videos",
+            response("youtube_video_multiple_ids.json", n_items),
+            checked._dict2videoresponse,
+            trusted._dict2videoresponse,
+            youtube.video_columns,
+        ),
+    ]
+    print(f"{n_items} items, items/s")
+    print(f"{'endpoint':<10}{'validated':>12}{'trusted':>12}{'columns':>12}")
+    for name, data, validated, construct, columns in cases:
+        print(
+            f"{name:<10}{rate(validated, data):>12.0f}"
+            f"{rate(construct, data):>12.0f}{rate(columns, data):>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,67 @@
+"""
+Parsing of a google result page, the single pass lxml parser
+against the previous one, based on BeautifulSoup.
+
+    python -m benchmarks.bench_google [repeat]
+
+"""
+import sys
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from bs4 import BeautifulSoup as BS
+
+from datahtml import google
+
+HTML = (Path(__file__).parent.parent / "tests" / "google_search.html").read_text()
+
+
+def _valid_url_reference(url) -> bool:
+    parsed = urlparse(url)
+    if parsed.scheme != "" and parsed.netloc != "":
+        return not any(u in parsed.netloc for u in ["gstatic", "google.com", "w3.org"])
+    return False
+
+
+def transform_result_reference(html) -> google.SearchResult:
+    soup = BS(html, "lxml")
+    links = soup.find_all(href=True)
+    v2 = []
+    for x in links:
+        q = parse_qs(urlparse(x["href"]).query).get("q")
+        if q and _valid_url_reference(q[0]):
+            v2.append(google.GLink(url=q[0], text=x.text))
+    related = set()
+    for x in links:
+        if x["href"].startswith("/search"):
+            q = parse_qs(urlparse(x["href"]).query).get("q")
+            if q:
+                related.add(q[0])
+    return google.SearchResult(links=v2, related=list(related))
+
+
+def rate(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(HTML)
+    return repeat / (time.perf_counter() - start)
+
+
+def main(repeat=50):
+    ref = transform_result_reference(HTML)
+    new = google.transform_result(HTML)
+    assert ref.links == new.links
+    assert sorted(ref.related) == sorted(new.related)
+    print(f"{len(new.links)} links, {len(new.related)} related")
+    print(f"{'impl':<12}{'pages/s':>12}")
+    for name, fn in [
+        ("reference", transform_result_reference),
+        ("lxml", google.transform_result),
+        ("simple", google.transform_result_simple),
+    ]:
+        print(f"{name:<12}{rate(fn, repeat):>12.1f}")
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
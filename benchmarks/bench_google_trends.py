@@ -0,0 +1,72 @@
+"""
+Parsing of the google trends rss, the xml parser against the
+html one used before, and a poll of many geos with a simulated latency.
+
+    python -m benchmarks.bench_google_trends [repeat] [geos]
+
+"""
+import sys
+import time
+import warnings
+from pathlib import Path
+
+from bs4 import XMLParsedAsHTMLWarning
+
+from datahtml import google_trends
+from datahtml.base import CrawlerSpec, CrawlResponse
+from datahtml.parsers import text2soup
+
+RSS = (Path(__file__).parent.parent / "tests" / "google_trends_rss.xml").read_bytes()
+LATENCY = 0.05
+
+
+def rate(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return repeat / (time.perf_counter() - start)
+
+
+class SlowCrawler(CrawlerSpec):
+    """Answers the fixture after `LATENCY` seconds"""
+
+    def get(self, url, headers=None, timeout_secs=60) -> CrawlResponse:
+        time.sleep(LATENCY)
+        return CrawlResponse(
+            content=RSS,
+            url=url,
+            headers={"content-type": "application/rss+xml"},
+            status_code=200,
+        )
+
+    async def aget(self, url, headers=None, timeout_secs=60) -> CrawlResponse:
+        return self.get(url, headers, timeout_secs)
+
+
+def main(repeat=100, geos=40):
+    warnings.simplefilter("ignore", XMLParsedAsHTMLWarning)
+    text = RSS.decode("utf-8")
+    assert google_trends.parse_entries(text2soup(text)) == google_trends.parse_feed(RSS)
+    print(f"{'parser':<12}{'feeds/s':>12}")
+    cases = [
+        ("html", lambda: google_trends.parse_entries(text2soup(text))),
+        ("xml", lambda: google_trends.parse_feed(RSS)),
+    ]
+    for name, fn in cases:
+        print(f"{name:<12}{rate(fn, repeat):>12.1f}")
+
+    c = SlowCrawler()
+    codes = [f"G{i}" for i in range(geos)]
+    start = time.perf_counter()
+    for g in codes:
+        google_trends.download(g, crawler=c)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    google_trends.download_many(codes, crawler=c, concurrency=16)
+    concurrent = time.perf_counter() - start
+    print(f"{geos} geos, {LATENCY}s latency")
+    print(f"serial {serial:.2f}s, download_many {concurrent:.2f}s")
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
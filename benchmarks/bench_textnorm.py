@@ -0,0 +1,56 @@
+"""
+Throughput of the text normalization used by the url index,
+over the link titles and url texts of the html fixtures.
+
+    python -m benchmarks.bench_textnorm [repeat]
+
+"""
+import sys
+import time
+from pathlib import Path
+
+from datahtml import textnorm
+from datahtml.parsers import text_from_link
+from datahtml.web import WebDocument
+
+FIXTURES = Path(__file__).parent.parent / "tests"
+
+
+def titles():
+    texts = []
+    for path in FIXTURES.glob("*.html"):
+        w = WebDocument("https://www.lanacion.com.ar/", html_txt=path.read_text())
+        for l in w.links():
+            if l.title:
+                texts.append(l.title)
+            texts.append(text_from_link(l.href))
+    return texts
+
+
+def rate(fn, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(texts)
+    return len(texts) * repeat / (time.perf_counter() - start)
+
+
+def main(repeat=200):
+    texts = titles()
+    # unique texts, so the cache doesn't help
+    unique = [f"{t} {i}" for i in range(repeat) for t in texts]
+    cases = [
+        ("regex", lambda ts: [textnorm.norm_words_re(t) for t in ts]),
+        ("translate", lambda ts: [textnorm._norm(t) for t in ts]),
+        ("norm_many", textnorm.norm_many),
+    ]
+    assert textnorm.norm_many(texts) == [textnorm.norm_words_re(t) for t in texts]
+    print(f"{len(texts)} texts")
+    print(f"{'impl':<12}{'unique/s':>12}{'repeated/s':>12}")
+    for name, fn in cases:
+        print(f"{name:<12}{rate(fn, unique, 1):>12.0f}{rate(fn, texts, repeat):>12.0f}")
+    cached = lambda ts: [textnorm.norm_words(t) for t in ts]
+    print(f"{'lru':<12}{'':>12}{rate(cached, texts, repeat):>12.0f}")
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,76 @@
+"""
+Build time and batch query throughput of the url index backends.
+
+    python -m benchmarks.bench_url_index [docs] [queries]
+
+"""
+import random
+import sys
+import time
+
+from datahtml.parsers import parse_url
+from datahtml.url_index import SearchLink, URLIndex
+from datahtml.url_index_numpy import NumpyURLIndex
+
+DOMAINS = ["infobae.com", "lanacion.com.ar", "clarin.com", "pagina12.com.ar"]
+
+
+def word(i: int) -> str:
+    letters = []
+    while True:
+        i, r = divmod(i, 26)
+        letters.append(chr(ord("a") + r))
+        if not i:
+            return "w" + "".join(letters)
+
+
+def corpus(n_docs: int, vocab_size=20_000, seed=42):
+    rnd = random.Random(seed)
+    vocab = [word(i) for i in range(vocab_size)]
+    # zipf like distribution of words, as in real titles
+    weights = [1 / (i + 1) for i in range(vocab_size)]
+    for i in range(n_docs):
+        words = rnd.choices(vocab, weights, k=rnd.randint(6, 14))
+        url = parse_url(f"https://www.{DOMAINS[i % len(DOMAINS)]}/nota-{i}")
+        yield SearchLink(text=" ".join(words), url=url)
+
+
+def queries(links, n_queries: int, seed=7):
+    rnd = random.Random(seed)
+    return [
+        " ".join(rnd.sample(l.text.split(), 2))
+        for l in rnd.choices(links, k=n_queries)
+    ]
+
+
+def timeit(fn):
+    start = time.perf_counter()
+    rsp = fn()
+    return time.perf_counter() - start, rsp
+
+
+def main(n_docs=100_000, n_queries=2_000):
+    links = list(corpus(n_docs))
+    qs = queries(links, n_queries)
+    backends = [("sqlite", URLIndex(cache_size=0)), ("numpy", NumpyURLIndex())]
+
+    print(f"{n_docs} docs, {n_queries} queries")
+    print(f"{'backend':<10}{'build s':>10}{'queries/s':>12}")
+    results = {}
+    for name, ix in backends:
+        build, _ = timeit(lambda: ix.build(links))
+        search, rsp = timeit(lambda: ix.search_many(qs, top_n=5))
+        results[name] = rsp
+        print(f"{name:<10}{build:>10.2f}{n_queries / search:>12.0f}")
+
+    # they differ because the length of a document in fts5 counts the
+    # tokens of its domain too, see datahtml.url_index_numpy
+    same = sum(
+        {l.url.fullurl for l in a} == {l.url.fullurl for l in b}
+        for a, b in zip(results["sqlite"], results["numpy"])
+    )
+    print(f"queries with the same top 5: {same}/{n_queries}")
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
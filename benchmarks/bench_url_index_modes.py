@@ -0,0 +1,85 @@
+"""
+Size, latency and recall of the search modes of the url index.
+
+Queries are words of a random title with a typo (a letter dropped) or
+with a plural "s" appended, recall is the share of queries that find
+the original title in the top 5.
+
+    python -m benchmarks.bench_url_index_modes [docs] [queries]
+
+"""
+import os
+import random
+import sys
+import tempfile
+
+from benchmarks.bench_url_index import corpus, timeit
+from datahtml.url_index import URLIndex
+
+
+def noisy_queries(links, n_queries: int, seed=11):
+    rnd = random.Random(seed)
+    rows = []
+    for l in rnd.choices(links, k=n_queries):
+        words = rnd.sample(l.text.split(), 2)
+        w = words[0]
+        if rnd.random() < 0.5:
+            pos = rnd.randrange(1, len(w))
+            words[0] = w[:pos] + w[pos + 1 :]
+        else:
+            words[0] = w + "s"
+        rows.append((" ".join(words), l.url.fullurl))
+    return rows
+
+
+def prefix_queries(links, n_queries: int, seed=13):
+    rnd = random.Random(seed)
+    return [
+        (" ".join(w[:3] for w in rnd.sample(l.text.split(), 2)), l.url.fullurl)
+        for l in rnd.choices(links, k=n_queries)
+    ]
+
+
+def recall(results, expected):
+    found = sum(url in {l.url.fullurl for l in rsp} for rsp, url in zip(results, expected))
+    return found / len(expected)
+
+
+def main(n_docs=50_000, n_queries=1_000):
+    links = list(corpus(n_docs))
+    cases = {
+        "exact": noisy_queries(links, n_queries),
+        "prefix": prefix_queries(links, n_queries),
+        "fuzzy": noisy_queries(links, n_queries),
+    }
+    print(f"{n_docs} docs, {n_queries} queries")
+    with tempfile.TemporaryDirectory() as tmp:
+        sizes = {}
+        for name, kwargs in [
+            ("plain", {}),
+            ("prefix", {"prefix": (2, 3)}),
+            ("trigram", {"trigram": True}),
+        ]:
+            path = os.path.join(tmp, f"{name}.db")
+            ix = URLIndex(path, cache_size=0, **kwargs)
+            build, _ = timeit(lambda: ix.build(links))
+            ix.conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            sizes[name] = os.path.getsize(path) / 2**20
+            print(f"{name:<10}build {build:>6.2f}s  size {sizes[name]:>7.1f}MB")
+            ix.close()
+
+        ix = URLIndex(
+            os.path.join(tmp, "all.db"), cache_size=0, prefix=(2, 3), trigram=True
+        )
+        ix.build(links)
+        print(f"{'mode':<10}{'queries/s':>12}{'recall':>10}")
+        for mode, rows in cases.items():
+            qs = [q for q, _ in rows]
+            secs, rsp = timeit(lambda: ix.search_many(qs, top_n=5, mode=mode))
+            exact_recall = recall(rsp, [u for _, u in rows])
+            print(f"{mode:<10}{n_queries / secs:>12.0f}{exact_recall:>10.2f}")
+        ix.close()
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
@@ -1,4 +1,8 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Any, Awaitable, Callable, Iterable, List
+
 from dateutil.parser import parse as dtparser
 
 
@@ -8,3 +12,33 @@ def difference_from_now(dt: str):
     diff = now - _dt
     return diff
 
+
+async def gather_limited(
+    aws: Iterable[Awaitable[Any]], limit: int = 10, return_exceptions=False
+) -> List[Any]:
+    """
+    Like :func:`asyncio.gather` but it keeps at most `limit` awaitables
+    running at the same time. Results keep the order of `aws`.
+    """
+    sem = asyncio.Semaphore(limit)
+
+    async def _run(aw):
+        async with sem:
+            return await aw
+
+    return await asyncio.gather(
+        *[_run(aw) for aw in aws], return_exceptions=return_exceptions
+    )
+
+
+def map_concurrent(fn: Callable[[Any], Any], items: Iterable[Any], workers=10) -> List[Any]:
+    """
+    Apply `fn` to each item using a pool of threads, it's the sync
+    counterpart of :func:`gather_limited` for blocking calls
+    like :meth:`datahtml.base.CrawlerSpec.get`. Results keep the order of `items`.
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(i) for i in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(fn, items))
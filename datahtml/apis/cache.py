@@ -0,0 +1,185 @@
+"""
+Cache of API responses.
+
+Responses are kept by endpoint and query in an in-memory LRU and,
+optionally, in a sqlite table shared between processes and runs.
+Each endpoint has its own TTL. After it, a response could still be served
+for `stale_ttl` seconds while the client refreshes it in the background.
+
+.. code-block:: python
+
+    from datahtml.apis import youtube
+    from datahtml.apis.cache import ResponseCache
+
+    cache = ResponseCache(uri="responses.db", ttls={"search": 1800, "videos": 600})
+    c = youtube.Client(cache=cache)
+    c.search(c.create_search("surf"))
+    print(cache.stats.hit_ratio, cache.stats.quota_saved)
+
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from attrs import define
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+@define
+class CacheStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    #: quota units not spent thanks to fresh hits
+    quota_saved: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+
+def cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+    """Key of a query, it doesn't depend on the order of the params"""
+    payload = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{endpoint}:{digest}"
+
+
+class ResponseCache:
+    """
+    :param maxsize: responses kept in memory.
+    :param uri: sqlite database used as a second tier, if given.
+    :param ttls: seconds a response is fresh, by endpoint.
+    :param default_ttl: TTL of endpoints not in `ttls`.
+    :param stale_ttl: seconds after the TTL a response is still served
+        while it's refreshed.
+    """
+
+    def __init__(
+        self,
+        maxsize=1024,
+        uri: Optional[str] = None,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 3600,
+        stale_ttl: float = 0,
+    ):
+        self.maxsize = maxsize
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.stats = CacheStats()
+        self._lru: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        if uri:
+            self.conn = sqlite3.connect(uri, check_same_thread=False)
+            self._create_tables()
+
+    def _create_tables(self):
+        with self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses
+            (key TEXT PRIMARY KEY, endpoint TEXT, stored_at REAL, data TEXT)
+            WITHOUT ROWID;
+            """
+            )
+
+    def ttl(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def _lookup(self, key: str) -> Optional[Tuple[float, Any]]:
+        entry = self._lru.get(key)
+        if entry is not None:
+            self._lru.move_to_end(key)
+            return entry
+        if self.conn is None:
+            return None
+        row = self.conn.execute(
+            "select stored_at, data from responses where key = ?;", (key,)
+        ).fetchone()
+        if not row:
+            return None
+        entry = (row[0], json.loads(row[1]))
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: Tuple[float, Any]):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def get(
+        self, endpoint: str, key: str, cost=0, now: Optional[float] = None
+    ) -> Tuple[Optional[Any], str]:
+        """
+        Look for a response.
+
+        :param cost: quota units of the request, counted as saved on fresh hits.
+        :return: the response, if any, and if it's :data:`FRESH`,
+            :data:`STALE` or a :data:`MISS`.
+        """
+        now = now or time.time()
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                age = now - entry[0]
+                ttl = self.ttl(endpoint)
+                if age <= ttl:
+                    self.stats.hits += 1
+                    self.stats.quota_saved += cost
+                    return entry[1], FRESH
+                if age <= ttl + self.stale_ttl:
+                    self.stats.stale_hits += 1
+                    return entry[1], STALE
+            self.stats.misses += 1
+            return None, MISS
+
+    def put(self, endpoint: str, key: str, data: Any, now: Optional[float] = None):
+        now = now or time.time()
+        with self._lock:
+            self._remember(key, (now, data))
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute(
+                        "insert or replace into responses values (?, ?, ?, ?);",
+                        (key, endpoint, now, json.dumps(data)),
+                    )
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """
+        Remove the responses of the sqlite tier which can't be served anymore.
+
+        :return: number of responses removed.
+        """
+        if self.conn is None:
+            return 0
+        now = now or time.time()
+        removed = 0
+        with self._lock, self.conn:
+            endpoints = [
+                r[0]
+                for r in self.conn.execute("select distinct endpoint from responses;")
+            ]
+            for endpoint in endpoints:
+                cur = self.conn.execute(
+                    "delete from responses where endpoint = ? and stored_at < ?;",
+                    (endpoint, now - self.ttl(endpoint) - self.stale_ttl),
+                )
+                removed += cur.rowcount
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute("delete from responses;")
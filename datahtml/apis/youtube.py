@@ -1,10 +1,32 @@
+import asyncio
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Any, Dict, List, Optional
-from urllib.parse import urlencode
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
 
 import httpx
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+from datahtml._utils import gather_limited, map_concurrent
+from datahtml.apis.cache import FRESH, STALE, ResponseCache, cache_key
+from datahtml.errors import QuotaExceeded
+
+#: quota units charged by each endpoint
+#: https://developers.google.com/youtube/v3/determine_quota_cost
+QUOTA_COSTS = {"search": 100, "videos": 1}
+
+#: max ids accepted by the videos endpoint in a single request
+MAX_IDS = 50
 
 
 class Topics(Enum):
@@ -96,9 +118,7 @@ class SearchQuery(BaseModel):
     region_code: Optional[str] = Field(alias="regionCode", default=None)
     lang: Optional[str] = Field(alias="relevanceLanguage", default=None)
 
-    class Config:
-        use_enum_values = True
-        allow_population_by_field_name = True
+    model_config = ConfigDict(use_enum_values=True, populate_by_name=True)
 
 
 class SearchItem(BaseModel):
@@ -112,17 +132,15 @@ class SearchItem(BaseModel):
     channel_id: str = Field(alias="channelId")
     channel_title: str = Field(alias="channelTitle")
 
-    class Config:
-        allow_population_by_field_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class SearchResponse(BaseModel):
     items: List[SearchItem]
     next_page: Optional[str] = Field(alias="nextPageToken", default=None)
-    total_results: Optional[str] = Field(alias="totalResults", default=None)
+    total_results: Optional[int] = Field(alias="totalResults", default=None)
 
-    class Config:
-        allow_population_by_field_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class VideoQuery(BaseModel):
@@ -134,9 +152,7 @@ class VideoQuery(BaseModel):
     video_category: Optional[str] = Field(alias="videoCategoryId", default=None)
     chart: Optional[str] = None
 
-    class Config:
-        use_enum_values = True
-        allow_population_by_field_name = True
+    model_config = ConfigDict(use_enum_values=True, populate_by_name=True)
 
 
 class VideoItem(BaseModel):
@@ -153,21 +169,63 @@ class VideoItem(BaseModel):
     channel_id: str = Field(alias="channelId")
     channel_title: str = Field(alias="channelTitle")
     view_count: str = Field(alias="viewCount")
-    like_count: str = Field(alias="likeCount")
-    comment_count: str = Field(alias="commentCount")
+    like_count: Optional[str] = Field(alias="likeCount", default=None)
+    comment_count: Optional[str] = Field(alias="commentCount", default=None)
 
-    class Config:
-        allow_population_by_field_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class VideoResponse(BaseModel):
     items: List[VideoItem]
+    next_page: Optional[str] = Field(alias="nextPageToken", default=None)
+    total_results: Optional[int] = Field(alias="totalResults", default=None)
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+async def _aclose_quietly(client: httpx.AsyncClient):
+    try:
+        await client.aclose()
+    except RuntimeError:
+        # the connections belong to a loop already closed
+        pass
 
 
 class Client:
+    """
+    Client of the YouTube Data API. HTTP connections are pooled by a
+    sync and an async httpx client, created on first use and released
+    with :meth:`close` and :meth:`aclose` or using the client as
+    a context manager.
+
+    :param api_key: by default it's taken from the `YOUTUBE_KEY` env var.
+    :param concurrency: requests run at the same time by :meth:`videos`
+        and :meth:`avideos`.
+    :param quota_limit: quota units this client can spend, when a request
+        would exceed it :class:`datahtml.errors.QuotaExceeded` is raised.
+    :param transport: an httpx transport shared by the sync and async
+        clients, like :class:`httpx.MockTransport` in tests.
+    :param cache: a :class:`datahtml.apis.cache.ResponseCache`, responses
+        are cached by endpoint and query.
+    :param validate: if False, responses are trusted and models are built
+        with ``model_construct``, without validation. It isn't faster for
+        these models, large pulls should use :meth:`videos_columns`.
+    """
+
     URL = "https://youtube.googleapis.com/youtube/v3"
 
-    def __init__(self, api_key=os.getenv("YOUTUBE_KEY"), debug=False):
+    def __init__(
+        self,
+        api_key=os.getenv("YOUTUBE_KEY"),
+        debug=False,
+        timeout_secs=30,
+        max_connections=20,
+        concurrency=8,
+        quota_limit: Optional[int] = None,
+        transport=None,
+        cache: Optional[ResponseCache] = None,
+        validate=True,
+    ):
         self._api_key = api_key
         self._h = {
             # "Authorization": f"Bearer {api_key}",
@@ -175,6 +233,41 @@ class Client:
         }
         self._debug = debug
         self._raw_rsp = None
+        self.timeout_secs = timeout_secs
+        self.concurrency = concurrency
+        self.quota_limit = quota_limit
+        #: quota units spent
+        self.quota_used = 0
+        #: requests done by endpoint
+        self.requests: Dict[str, int] = {}
+        self._limits = httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections
+        )
+        self._transport = transport
+        self._client: Optional[httpx.Client] = None
+        self._aclient: Optional[httpx.AsyncClient] = None
+        self._aclient_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._quota_lock = threading.Lock()
+        # the clients are created on first use, maybe by many threads at once
+        self._client_lock = threading.Lock()
+        self.cache = cache
+        self.validate = validate
+        # keys of stale responses being refreshed
+        self._refreshing: set = set()
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
+        self._refresh_tasks: set = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
 
     def _store_rsp(self, rsp: httpx.Response):
         if self._debug:
@@ -184,6 +277,163 @@ class Client:
     def _response(self) -> httpx.Response:
         return self._raw_rsp
 
+    @property
+    def client(self) -> httpx.Client:
+        with self._client_lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    base_url=self.URL,
+                    headers=self._h,
+                    limits=self._limits,
+                    timeout=self.timeout_secs,
+                    transport=self._transport,
+                )
+            return self._client
+
+    @property
+    def aclient(self) -> httpx.AsyncClient:
+        # connections of an async client can't be shared between event loops
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            if self._aclient is None or self._aclient_loop is not loop:
+                self._discard_aclient()
+                self._aclient = httpx.AsyncClient(
+                    base_url=self.URL,
+                    headers=self._h,
+                    limits=self._limits,
+                    timeout=self.timeout_secs,
+                    transport=self._transport,
+                )
+                self._aclient_loop = loop
+            return self._aclient
+
+    def _discard_aclient(self):
+        """
+        Close the async client without awaiting it: in its own loop when
+        it's still running, otherwise in the current one, or in a new one
+        when there is none.
+        """
+        client, loop = self._aclient, self._aclient_loop
+        self._aclient = None
+        self._aclient_loop = None
+        if client is None or self._transport is not None:
+            # a transport given by the user is shared by every client
+            return
+        try:
+            current: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if loop is not None and loop is not current and loop.is_running():
+            asyncio.run_coroutine_threadsafe(_aclose_quietly(client), loop)
+        elif current is not None:
+            task = current.create_task(_aclose_quietly(client))
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+        else:
+            asyncio.run(_aclose_quietly(client))
+
+    def close(self):
+        """Close the sync and the async clients"""
+        if self._refresh_executor is not None:
+            self._refresh_executor.shutdown()
+            self._refresh_executor = None
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            self._discard_aclient()
+
+    async def aclose(self):
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+            self._aclient_loop = None
+
+    def _charge(self, endpoint: str):
+        cost = QUOTA_COSTS.get(endpoint, 1)
+        with self._quota_lock:
+            limit = self.quota_limit
+            if limit is not None and self.quota_used + cost > limit:
+                raise QuotaExceeded(endpoint, self.quota_used, self.quota_limit)
+            self.quota_used += cost
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def _params(self, q: BaseModel) -> Dict[str, Any]:
+        data = q.model_dump(by_alias=True, exclude_none=True)
+        data.update({"key": self._api_key})
+        return data
+
+    def _request(self, endpoint: str, q: BaseModel) -> Dict[str, Any]:
+        self._charge(endpoint)
+        rsp = self.client.get(f"/{endpoint}", params=self._params(q))
+        self._store_rsp(rsp)
+        rsp.raise_for_status()
+        return rsp.json()
+
+    async def _arequest(self, endpoint: str, q: BaseModel) -> Dict[str, Any]:
+        self._charge(endpoint)
+        rsp = await self.aclient.get(f"/{endpoint}", params=self._params(q))
+        self._store_rsp(rsp)
+        rsp.raise_for_status()
+        return rsp.json()
+
+    def _from_cache(self, endpoint: str, q: BaseModel):
+        # the api key isn't part of the cache key
+        key = cache_key(endpoint, q.model_dump(by_alias=True, exclude_none=True))
+        data, state = self.cache.get(endpoint, key, cost=QUOTA_COSTS.get(endpoint, 1))
+        return key, data, state
+
+    def _start_refresh(self, key: str) -> bool:
+        with self._quota_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _refresh(self, endpoint: str, q: BaseModel, key: str):
+        try:
+            self.cache.put(endpoint, key, self._request(endpoint, q))
+        finally:
+            self._refreshing.discard(key)
+
+    async def _arefresh(self, endpoint: str, q: BaseModel, key: str):
+        try:
+            self.cache.put(endpoint, key, await self._arequest(endpoint, q))
+        finally:
+            self._refreshing.discard(key)
+
+    def _get(self, endpoint: str, q: BaseModel) -> Dict[str, Any]:
+        if self.cache is None:
+            return self._request(endpoint, q)
+        key, data, state = self._from_cache(endpoint, q)
+        if state == FRESH:
+            return data
+        if state == STALE:
+            if self._start_refresh(key):
+                if self._refresh_executor is None:
+                    self._refresh_executor = ThreadPoolExecutor(max_workers=1)
+                self._refresh_executor.submit(self._refresh, endpoint, q, key)
+            return data
+        data = self._request(endpoint, q)
+        self.cache.put(endpoint, key, data)
+        return data
+
+    async def _aget(self, endpoint: str, q: BaseModel) -> Dict[str, Any]:
+        if self.cache is None:
+            return await self._arequest(endpoint, q)
+        key, data, state = self._from_cache(endpoint, q)
+        if state == FRESH:
+            return data
+        if state == STALE:
+            if self._start_refresh(key):
+                task = asyncio.ensure_future(self._arefresh(endpoint, q, key))
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_tasks.discard)
+            return data
+        data = await self._arequest(endpoint, q)
+        self.cache.put(endpoint, key, data)
+        return data
+
     @staticmethod
     def create_search(q: str) -> SearchQuery:
         return SearchQuery(q=q)
@@ -195,79 +445,248 @@ class Client:
         )
 
     @staticmethod
-    def create_video(id_) -> VideoQuery:
+    def create_video(id_: Union[str, Iterable[str]]) -> VideoQuery:
+        """
+        Query one or many videos (up to 50), for longer lists
+        use :meth:`videos`.
+        """
+        if not isinstance(id_, str):
+            id_ = ",".join(id_)
         return VideoQuery(id=id_)
 
-    def _dict2searchitem(self, item: Dict[str, Any]) -> SearchItem:
-        id_ = item["id"].get("videoId")
-        if not id_:
-            id_ = item["id"].get("channelId")
-
-        s = item["snippet"]
-        pat = s["publishedAt"]
-        pat2 = s["publishTime"]
-        return SearchItem(
-            id=id_,
-            kind=item["kind"],
-            published_at=pat,
-            publish_time=pat2,
-            title=s["title"],
-            description=s["description"],
-            thumbnail=s["thumbnails"]["default"]["url"],
-            channel_id=s["channelId"],
-            channel_title=s["channelTitle"],
-        )
-
-    def _dict2searchresponse(self, rsp: Dict[str, Any]) -> SearchResponse:
-        items = [self._dict2searchitem(i) for i in rsp["items"]]
-        return SearchResponse(
-            items=items,
-            next_page=rsp["nextPageToken"],
-            total_results=rsp["pageInfo"]["totalResults"],
+    @staticmethod
+    def _chunks(ids: Iterable[str]) -> List[str]:
+        # duplicated ids are requested once
+        unique = list(dict.fromkeys(ids))
+        return [
+            ",".join(unique[ix : ix + MAX_IDS]) for ix in range(0, len(unique), MAX_IDS)
+        ]
+
+    def _merge_videos(self, responses: List[Dict[str, Any]]) -> VideoResponse:
+        return self._dict2videoresponse(
+            {
+                "items": [i for rsp in responses for i in rsp["items"]],
+                "pageInfo": {
+                    "totalResults": sum(len(rsp["items"]) for rsp in responses)
+                },
+            }
         )
 
     def search(self, q: SearchQuery) -> SearchResponse:
-        data = q.dict(by_alias=True, exclude_none=True)
-        data.update({"key": self._api_key})
-        uri = urlencode(data)
-        rsp = httpx.get(f"{self.URL}/search?{uri}", headers=self._h)
-        self._store_rsp(rsp)
+        return self._dict2searchresponse(self._get("search", q))
 
-        return self._dict2searchresponse(rsp.json())
+    async def asearch(self, q: SearchQuery) -> SearchResponse:
+        return self._dict2searchresponse(await self._aget("search", q))
 
     def video(self, v: VideoQuery) -> VideoResponse:
-        data = v.dict(by_alias=True, exclude_none=True)
-        data.update({"key": self._api_key})
-        uri = urlencode(data)
-        rsp = httpx.get(f"{self.URL}/videos?{uri}", headers=self._h)
-        self._store_rsp(rsp)
+        return self._dict2videoresponse(self._get("videos", v))
 
-        return self._dict2videoresponse(rsp.json())
+    async def avideo(self, v: VideoQuery) -> VideoResponse:
+        return self._dict2videoresponse(await self._aget("videos", v))
 
-    def _dict2videoitem(self, item: Dict[str, Any]) -> VideoItem:
-        s = item["snippet"]
-        st = item["statistics"]
-
-        return VideoItem(
-            id=item["id"],
-            kind=item["kind"],
-            tags=s["tags"],
-            published_at=s["publishedAt"],
-            title=s["title"],
-            thumbnail=s["thumbnails"]["default"]["url"],
-            default_audio_lang=s.get("defaultAudioLanguage"),
-            default_lang=s.get("defaultLanguage"),
-            channel_id=s["channelId"],
-            channel_title=s["channelTitle"],
-            view_count=st["viewCount"],
-            like_count=st["likeCount"],
-            comment_count=st["commentCount"],
+    def _videos_raw(self, ids: Iterable[str], part: str) -> List[Dict[str, Any]]:
+        queries = [VideoQuery(id=chunk, part=part) for chunk in self._chunks(ids)]
+        return map_concurrent(
+            lambda q: self._get("videos", q), queries, workers=self.concurrency
+        )
+
+    async def _avideos_raw(
+        self, ids: Iterable[str], part: str
+    ) -> List[Dict[str, Any]]:
+        queries = [VideoQuery(id=chunk, part=part) for chunk in self._chunks(ids)]
+        return await gather_limited(
+            [self._aget("videos", q) for q in queries], limit=self.concurrency
+        )
+
+    def videos(
+        self, ids: Iterable[str], part="snippet,contentDetails,statistics"
+    ) -> VideoResponse:
+        """
+        Get many videos by id, in requests of 50 ids run concurrently.
+        Each request costs a single quota unit.
+        """
+        return self._merge_videos(self._videos_raw(ids, part))
+
+    async def avideos(
+        self, ids: Iterable[str], part="snippet,contentDetails,statistics"
+    ) -> VideoResponse:
+        """Async version of :meth:`videos`"""
+        return self._merge_videos(await self._avideos_raw(ids, part))
+
+    def videos_columns(
+        self, ids: Iterable[str], part="snippet,contentDetails,statistics"
+    ) -> Dict[str, List[Any]]:
+        """Like :meth:`videos` but the result is given by :func:`video_columns`"""
+        items = [i for rsp in self._videos_raw(ids, part) for i in rsp["items"]]
+        return video_columns({"items": items})
+
+    async def avideos_columns(
+        self, ids: Iterable[str], part="snippet,contentDetails,statistics"
+    ) -> Dict[str, List[Any]]:
+        items = [i for rsp in await self._avideos_raw(ids, part) for i in rsp["items"]]
+        return video_columns({"items": items})
+
+    async def _iter_pages(
+        self,
+        endpoint: str,
+        q: BaseModel,
+        parse: Callable[[Dict[str, Any]], Any],
+        max_items: Optional[int],
+        max_quota: Optional[int],
+    ) -> AsyncIterator[Any]:
+        cost = QUOTA_COSTS.get(endpoint, 1)
+        spent = 0
+        emitted = 0
+
+        def _fetch(query: BaseModel) -> "asyncio.Future[Dict[str, Any]]":
+            nonlocal spent
+            spent += cost
+            return asyncio.ensure_future(self._aget(endpoint, query))
+
+        if max_quota is not None and cost > max_quota:
+            return
+        task: Optional[asyncio.Future] = _fetch(q)
+        try:
+            while task is not None:
+                rsp = await task
+                task = None
+                page = parse(rsp)
+                pending = None if max_items is None else max_items - emitted
+                more_items = pending is None or pending > len(page.items)
+                more_quota = max_quota is None or spent + cost <= max_quota
+                if page.next_page and more_items and more_quota:
+                    # the next page is requested while this one is consumed
+                    task = _fetch(q.model_copy(update={"page_token": page.next_page}))
+                for item in page.items:
+                    if max_items is not None and emitted >= max_items:
+                        return
+                    emitted += 1
+                    yield item
+        finally:
+            if task is not None:
+                task.cancel()
+
+    def iter_search(
+        self,
+        q: SearchQuery,
+        max_items: Optional[int] = None,
+        max_quota: Optional[int] = None,
+    ) -> AsyncIterator[SearchItem]:
+        """
+        Iterate the items of every page of a search, the next page
+        is fetched while the current one is consumed.
+
+        :param max_items: stop after this number of items.
+        :param max_quota: quota units this iteration could spend,
+            each page of search costs 100 units.
+        """
+        return self._iter_pages(
+            "search", q, self._dict2searchresponse, max_items, max_quota
+        )
+
+    def iter_videos(
+        self,
+        v: VideoQuery,
+        max_items: Optional[int] = None,
+        max_quota: Optional[int] = None,
+    ) -> AsyncIterator[VideoItem]:
+        """
+        Like :meth:`iter_search` for video queries,
+        as :meth:`create_video_popular` charts.
+        """
+        return self._iter_pages(
+            "videos", v, self._dict2videoresponse, max_items, max_quota
+        )
+
+    def _dict2searchitem(self, item: Dict[str, Any]) -> SearchItem:
+        if self.validate:
+            return SearchItem(**_search_fields(item))
+        return SearchItem.model_construct(**_search_fields(item))
+
+    def _dict2searchresponse(self, rsp: Dict[str, Any]) -> SearchResponse:
+        items = [self._dict2searchitem(i) for i in rsp["items"]]
+        fields = dict(
+            items=items,
+            next_page=rsp.get("nextPageToken"),
+            total_results=rsp.get("pageInfo", {}).get("totalResults"),
         )
+        if self.validate:
+            return SearchResponse(**fields)
+        return SearchResponse.model_construct(**fields)
+
+    def _dict2videoitem(self, item: Dict[str, Any]) -> VideoItem:
+        if self.validate:
+            return VideoItem(**_video_fields(item))
+        return VideoItem.model_construct(**_video_fields(item))
 
     def _dict2videoresponse(self, rsp: Dict[str, Any]) -> VideoResponse:
         items = [self._dict2videoitem(i) for i in rsp["items"]]
-        return VideoResponse(
+        fields = dict(
             items=items,
             next_page=rsp.get("nextPageToken"),
-            total_results=rsp["pageInfo"]["totalResults"],
+            total_results=rsp.get("pageInfo", {}).get("totalResults"),
         )
+        if self.validate:
+            return VideoResponse(**fields)
+        return VideoResponse.model_construct(**fields)
+
+
+def _search_fields(item: Dict[str, Any]) -> Dict[str, Any]:
+    id_ = item["id"].get("videoId")
+    if not id_:
+        id_ = item["id"].get("channelId")
+
+    s = item["snippet"]
+    return dict(
+        id=id_,
+        kind=item["kind"],
+        published_at=s["publishedAt"],
+        publish_time=s["publishTime"],
+        title=s["title"],
+        description=s["description"],
+        thumbnail=s["thumbnails"]["default"]["url"],
+        channel_id=s["channelId"],
+        channel_title=s["channelTitle"],
+    )
+
+
+def _video_fields(item: Dict[str, Any]) -> Dict[str, Any]:
+    s = item["snippet"]
+    st = item["statistics"]
+    return dict(
+        id=item["id"],
+        kind=item["kind"],
+        tags=s.get("tags", []),
+        published_at=s["publishedAt"],
+        default_audio_lang=s.get("defaultAudioLanguage"),
+        default_lang=s.get("defaultLanguage"),
+        title=s["title"],
+        thumbnail=s["thumbnails"]["default"]["url"],
+        channel_id=s["channelId"],
+        channel_title=s["channelTitle"],
+        view_count=st["viewCount"],
+        like_count=st.get("likeCount"),
+        comment_count=st.get("commentCount"),
+    )
+
+
+def _columns(
+    items: Iterable[Dict[str, Any]], fields: Callable[[Dict[str, Any]], Dict[str, Any]]
+) -> Dict[str, List[Any]]:
+    rows = [fields(i) for i in items]
+    if not rows:
+        return {}
+    return {name: [r[name] for r in rows] for name in rows[0]}
+
+
+def search_columns(rsp: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    Fields of the items of a raw search response as lists, by field name
+    of :class:`SearchItem`, without building a model for each item.
+    """
+    return _columns(rsp["items"], _search_fields)
+
+
+def video_columns(rsp: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Like :func:`search_columns` for the fields of :class:`VideoItem`"""
+    return _columns(rsp["items"], _video_fields)
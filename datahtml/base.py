@@ -26,21 +26,25 @@ class CrawlResponse:
     def json(self):
         return json.loads(self.text)
 
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("content-type", "")
+
     @property
     def is_json(self):
-        if "application/json" in self.headers["content-type"]:
+        if "application/json" in self.content_type:
             return True
         return False
 
     @property
     def is_xml(self):
-        if "xml" in self.headers["content-type"]:
+        if "xml" in self.content_type:
             return True
         return False
 
     @property
     def is_txt(self):
-        if "text/plain" in self.headers["content-type"]:
+        if "text/plain" in self.content_type:
             return True
         return False
 
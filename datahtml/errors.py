@@ -37,5 +37,13 @@ class XMLContentNotFound(Exception):
         super().__init__(msg)
 
 
+class QuotaExceeded(Exception):
+    def __init__(self, endpoint, used, limit):
+        msg = f"Request to {endpoint} exceeds the quota, {used} of {limit} units used"
+        super().__init__(msg)
 
 
+class WikidataAPIError(Exception):
+    def __init__(self, url, code, info):
+        msg = f"Wikidata error {code} for {url}: {info}"
+        super().__init__(msg)
@@ -0,0 +1,421 @@
+"""
+Adaptive polling of rss feeds.
+
+Each feed keeps the rate of new entries observed between polls
+(an exponential moving average) and the validators sent by the server
+(ETag and Last-Modified). The next poll of a feed is scheduled from
+that rate: busy feeds are polled often, dormant ones back off until
+`max_interval`.
+
+.. code-block:: python
+
+    from datahtml import crawler, feed_scheduler
+
+    c = crawler.LocalCrawler()
+    sched = feed_scheduler.FeedScheduler(
+        store=feed_scheduler.FeedStore("feeds.db")
+    )
+    sched.add("https://www.infobae.com/feeds/rss/")
+    entries = asyncio.run(sched.poll(c))
+
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from attrs import define
+
+from datahtml import defaults, errors, rss
+from datahtml._utils import gather_limited
+from datahtml.base import CrawlerSpec, CrawlResponse
+
+logger = logging.getLogger(__name__)
+
+#: interval in seconds used for feeds without history
+INITIAL_INTERVAL = 15 * 60
+MIN_INTERVAL = 60
+MAX_INTERVAL = 12 * 60 * 60
+#: seconds an entry key is remembered
+SEEN_TTL = 30 * 24 * 60 * 60
+
+
+def conditional_headers(
+    etag: Optional[str] = None, last_modified: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Headers for a conditional GET. The user agent is included because
+    crawlers like :class:`datahtml.crawler.LocalCrawler` replace the
+    default headers when headers are given.
+    """
+    headers = {"User-Agent": defaults.AGENT}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+@define
+class FeedState:
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    #: new entries per hour, smoothed between polls
+    rate: float = 0.0
+    #: current polling interval in seconds
+    interval: float = INITIAL_INTERVAL
+    #: unix timestamp of the next poll
+    next_poll: float = 0.0
+    #: unix timestamp of the last successful poll
+    last_poll: Optional[float] = None
+    polls: int = 0
+    errors: int = 0
+
+
+@define
+class PollStats:
+    """Counters of the polls done by a :class:`FeedScheduler`"""
+
+    polls: int = 0
+    not_modified: int = 0
+    errors: int = 0
+    entries: int = 0
+    new_entries: int = 0
+    bytes: int = 0
+    #: seconds spent in :meth:`FeedScheduler.poll`
+    elapsed: float = 0.0
+
+    @property
+    def feeds_per_sec(self) -> float:
+        return self.polls / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def entries_per_sec(self) -> float:
+        return self.entries / self.elapsed if self.elapsed else 0.0
+
+
+class FeedStore:
+    """
+    Sqlite store for :class:`FeedState` and for the keys of the entries
+    already emitted.
+
+    :param uri: sqlite database, by default an in-memory one.
+    """
+
+    def __init__(self, uri=":memory:"):
+        self.conn = sqlite3.connect(uri)
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS feeds
+            (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,
+             rate REAL, interval REAL, next_poll REAL, last_poll REAL,
+             polls INTEGER, errors INTEGER);
+            """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS feeds_next_poll_idx ON feeds(next_poll);"
+            )
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS seen
+            (key TEXT PRIMARY KEY, feed TEXT, first_seen REAL, last_seen REAL)
+            WITHOUT ROWID;
+            """
+            )
+            columns = [r[1] for r in self.conn.execute("PRAGMA table_info(seen);")]
+            if "last_seen" not in columns:
+                # stores of previous versions
+                self.conn.execute("ALTER TABLE seen ADD COLUMN last_seen REAL;")
+                self.conn.execute("UPDATE seen SET last_seen = first_seen;")
+            self.conn.execute("DROP INDEX IF EXISTS seen_first_seen_idx;")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS seen_last_seen_idx ON seen(last_seen);"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS seen_feed_idx ON seen(feed, last_seen);"
+            )
+
+    def get(self, url: str) -> Optional[FeedState]:
+        row = self.conn.execute(
+            "select * from feeds where url = ?;", (url,)
+        ).fetchone()
+        if not row:
+            return None
+        return FeedState(*row)
+
+    @staticmethod
+    def _row(state: FeedState):
+        return (
+            state.url,
+            state.etag,
+            state.last_modified,
+            state.rate,
+            state.interval,
+            state.next_poll,
+            state.last_poll,
+            state.polls,
+            state.errors,
+        )
+
+    def put(self, state: FeedState):
+        with self.conn:
+            self.conn.execute(
+                "insert or replace into feeds values (?, ?, ?, ?, ?, ?, ?, ?, ?);",
+                self._row(state),
+            )
+
+    def add_many(self, states: Iterable[FeedState]):
+        """Add feeds in a single transaction, keeping those already stored"""
+        with self.conn:
+            self.conn.executemany(
+                "insert or ignore into feeds values (?, ?, ?, ?, ?, ?, ?, ?, ?);",
+                (self._row(s) for s in states),
+            )
+
+    def delete(self, url: str):
+        with self.conn:
+            self.conn.execute("delete from feeds where url = ?;", (url,))
+
+    def feeds(self) -> List[FeedState]:
+        rows = self.conn.execute("select * from feeds;").fetchall()
+        return [FeedState(*r) for r in rows]
+
+    def due(self, now: float) -> List[FeedState]:
+        rows = self.conn.execute(
+            "select * from feeds where next_poll <= ? order by next_poll;", (now,)
+        ).fetchall()
+        return [FeedState(*r) for r in rows]
+
+    def next_poll(self) -> Optional[float]:
+        row = self.conn.execute("select min(next_poll) from feeds;").fetchone()
+        return row[0]
+
+    def add_unseen(self, feed: str, keys: List[str], now: float) -> List[str]:
+        """
+        Register keys as seen and return those which weren't seen before,
+        in the same order as given. Every key gets `now` as its last sight.
+        """
+        seen = set()
+        for ix in range(0, len(keys), 500):
+            chunk = keys[ix : ix + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"select key from seen where key in ({marks});", chunk
+            ).fetchall()
+            seen.update(r[0] for r in rows)
+        unseen = [k for k in keys if k not in seen]
+        with self.conn:
+            self.conn.executemany(
+                """insert into seen values (?, ?, ?, ?)
+                on conflict(key) do update
+                set feed = excluded.feed, last_seen = excluded.last_seen;""",
+                [(k, feed, now, now) for k in keys],
+            )
+        return unseen
+
+    def touch_seen(self, feed: str, now: float):
+        """
+        Refresh the keys of the last version of a feed,
+        when the server says it's not modified.
+        """
+        with self.conn:
+            self.conn.execute(
+                """update seen set last_seen = ? where feed = ? and last_seen =
+                (select max(last_seen) from seen where feed = ?);""",
+                (now, feed, feed),
+            )
+
+    def prune(self, older_than: float) -> int:
+        """
+        Forget the keys not seen in a feed since `older_than`.
+
+        :return: number of keys removed.
+        """
+        with self.conn:
+            cur = self.conn.execute(
+                "delete from seen where last_seen < ?;", (older_than,)
+            )
+        return cur.rowcount
+
+
+class FeedScheduler:
+    """
+    Polls feeds concurrently and emits only entries not seen before,
+    deduplicated by :attr:`datahtml.rss.Entry.link`.
+
+    :param store: a :class:`FeedStore`, in memory if not given.
+    :param min_interval: lower bound of the polling interval in seconds.
+    :param max_interval: upper bound of the polling interval in seconds.
+    :param target_new: how many new entries we expect between two polls,
+        a feed publishing 6 entries/hour with `target_new=1` is polled
+        every 10 minutes.
+    :param smoothing: weight of the last poll in the rate average.
+    :param backoff: factor applied to the interval of feeds without
+        activity or failing.
+    :param concurrency: max number of feeds polled at the same time.
+    :param seen_ttl: seconds the keys of the entries are remembered since
+        they were last in their feed, after each poll older keys are pruned.
+        None keeps them forever.
+    """
+
+    def __init__(
+        self,
+        store: Optional[FeedStore] = None,
+        *,
+        min_interval: float = MIN_INTERVAL,
+        max_interval: float = MAX_INTERVAL,
+        target_new: float = 1.0,
+        smoothing: float = 0.3,
+        backoff: float = 2.0,
+        concurrency: int = 16,
+        timeout_secs: int = 30,
+        seen_ttl: Optional[float] = SEEN_TTL,
+    ):
+        self.store = store or FeedStore()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_new = target_new
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.concurrency = concurrency
+        self.timeout_secs = timeout_secs
+        self.seen_ttl = seen_ttl
+        self.stats = PollStats()
+
+    def parse_entries(self, rsp: CrawlResponse) -> List[Any]:
+        """
+        Entries of a feed, :class:`datahtml.rss.Entry` by default. Subclasses
+        could return other types, as long as :meth:`entry_key` supports them.
+        """
+        if not rsp.is_xml:
+            raise errors.XMLContentNotFound(rsp.url)
+        return rss.parse(rsp.text)
+
+    def entry_key(self, entry: Any) -> str:
+        return entry.link
+
+    def add(self, url: str, now: Optional[float] = None):
+        """Add a feed, it will be due on the next poll"""
+        if not self.store.get(url):
+            self.store.put(FeedState(url=url, next_poll=now or 0.0))
+
+    def add_many(self, urls: Iterable[str], now: Optional[float] = None):
+        self.store.add_many(FeedState(url=url, next_poll=now or 0.0) for url in urls)
+
+    def remove(self, url: str):
+        self.store.delete(url)
+
+    def seconds_until_next(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait until the next feed is due, None without feeds"""
+        _next = self.store.next_poll()
+        if _next is None:
+            return None
+        now = time.time() if now is None else now
+        return max(_next - now, 0.0)
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _reschedule(self, state: FeedState, new_count: int, now: float):
+        if state.last_poll is not None:
+            # the first poll only gives the history of the feed,
+            # so the rate is learned from the following ones.
+            elapsed = max(now - state.last_poll, 1.0)
+            current = new_count * 3600 / elapsed
+            state.rate = (
+                self.smoothing * current + (1 - self.smoothing) * state.rate
+            )
+            if state.rate > 0:
+                state.interval = self.target_new * 3600 / state.rate
+            else:
+                state.interval = state.interval * self.backoff
+        state.interval = self._clamp(state.interval)
+        state.last_poll = now
+        state.next_poll = now + state.interval
+        state.polls += 1
+        state.errors = 0
+
+    def _reschedule_error(self, state: FeedState, now: float):
+        state.errors += 1
+        state.interval = self._clamp(state.interval * self.backoff)
+        state.next_poll = now + state.interval
+
+    async def poll_feed(
+        self, url: str, *, crawler: CrawlerSpec, now: Optional[float] = None
+    ) -> List[rss.Entry]:
+        """
+        Poll a single feed using a conditional request
+        and return its new entries.
+        """
+        state = self.store.get(url) or FeedState(url=url)
+        self.stats.polls += 1
+        try:
+            rsp = await crawler.aget(
+                url,
+                headers=conditional_headers(state.etag, state.last_modified),
+                timeout_secs=self.timeout_secs,
+            )
+            if rsp.status_code == 304:
+                self.stats.not_modified += 1
+                self.store.touch_seen(url, time.time() if now is None else now)
+                entries = []
+            elif rsp.status_code != 200:
+                raise errors.CrawlingError(url=url, status=rsp.status_code)
+            else:
+                self.stats.bytes += len(rsp.content)
+                entries = self.parse_entries(rsp)
+                state.etag = rsp.headers.get("etag")
+                state.last_modified = rsp.headers.get("last-modified")
+        except (
+            errors.CrawlHTTPError,
+            errors.CrawlingError,
+            errors.XMLContentNotFound,
+        ) as e:
+            logger.warning("polling %s failed: %s", url, e)
+            self.stats.errors += 1
+            self._reschedule_error(state, time.time() if now is None else now)
+            self.store.put(state)
+            return []
+
+        now = time.time() if now is None else now
+        by_key = {}
+        for e in entries:
+            by_key.setdefault(self.entry_key(e), e)
+        fresh = self.store.add_unseen(url, list(by_key.keys()), now)
+        self.stats.entries += len(entries)
+        self.stats.new_entries += len(fresh)
+        self._reschedule(state, len(fresh), now)
+        self.store.put(state)
+        return [by_key[k] for k in fresh]
+
+    async def poll(
+        self, crawler: CrawlerSpec, now: Optional[float] = None
+    ) -> List[rss.Entry]:
+        """Poll every due feed concurrently and return the new entries"""
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        due = self.store.due(now)
+        results = await gather_limited(
+            [self.poll_feed(s.url, crawler=crawler, now=now) for s in due],
+            limit=self.concurrency,
+        )
+        if self.seen_ttl is not None:
+            self.store.prune(now - self.seen_ttl)
+        self.stats.elapsed += time.perf_counter() - started
+        return [e for entries in results for e in entries]
+
+    async def stream(self, crawler: CrawlerSpec) -> AsyncIterator[List[rss.Entry]]:
+        """
+        Poll forever, sleeping until the next feed is due,
+        yielding batches of new entries.
+        """
+        while True:
+            entries = await self.poll(crawler)
+            if entries:
+                yield entries
+            wait = self.seconds_until_next()
+            await asyncio.sleep(self.min_interval if wait is None else wait)
@@ -1,24 +1,42 @@
+import logging
 import re
 from dataclasses import dataclass
-from typing import List
-from urllib.parse import parse_qs, quote, urlparse
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import parse_qs, quote
 
-from bs4 import BeautifulSoup as BS
+import lxml.html
+from lxml.etree import ParserError
 
+from datahtml._utils import gather_limited, map_concurrent
 from datahtml.base import CrawlerSpec
+from datahtml.errors import CrawlHTTPError
+
+logger = logging.getLogger(__name__)
 
 _G = "https://www.google.com/search?q="
-_BLACKLIST = [
-    "gstatic",
-    "w3.org",
-    "google.com",
-    "googleapis.com",
-    "googleadservices.com",
-    "ytimg.com",
-    "googleusercontent.com",
-    "schema.org",
-]
-_REGEX = "(?:(?:https?|ftp):\/\/)?[\w/\-?=%.]+\.[\w/\-&?=%.]+"
+#: domains whose links are never results, subdomains included
+_BLACKLIST = frozenset(
+    [
+        "gstatic.com",
+        "w3.org",
+        "google.com",
+        "googleapis.com",
+        "googleadservices.com",
+        "ytimg.com",
+        "googleusercontent.com",
+        "schema.org",
+    ]
+)
+#: labels blocked in any position, like google.com.ar or fonts.gstatic.net
+_BLACKLIST_LABELS = frozenset(["google", "gstatic"])
+# a match without protocol only starts where a run of url chars starts,
+# the same matches but it doesn't retry every position of long runs
+_REGEX = (
+    r"(?:(?:https?|ftp):\/\/|(?<![\w/\-?=%.]))[\w/\-?=%.]+\.[\w/\-&?=%.]+"
+)
+_URL = re.compile(_REGEX)
+# scheme and netloc, as urlparse splits them
+_NETLOC = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://([^/?#]+)")
 
 
 LANGS = dict(es="tbs=lr:lang_1es&lr=lang_es", pt="tbs=lr:lang_1pt&lr=lang_pt")
@@ -36,33 +54,38 @@ class SearchResult:
     related: List[str]
 
 
-def _valid_url(url) -> bool:
-    parsed = urlparse(url)
-    if parsed.scheme != "" and parsed.netloc != "":
-        invalid = False
-        for u in _BLACKLIST:
-            if u in parsed.netloc:
-                invalid = True
-                break
-        if invalid:
-            return False
-        return True
+def _blocked(host: str) -> bool:
+    labels = host.lower().split(".")
+    for ix, label in enumerate(labels):
+        if label in _BLACKLIST_LABELS or ".".join(labels[ix:]) in _BLACKLIST:
+            return True
+    return False
+
+
+def _valid_url(url: str) -> bool:
+    m = _NETLOC.match(url)
+    if not m:
+        return False
+    host = m.group(1).rsplit("@", 1)[-1].split(":", 1)[0]
+    return bool(host) and not _blocked(host)
+
+
+def _query_q(href: str):
+    """Value of the `q` param of a href, if any"""
+    ix = href.find("?")
+    if ix == -1 or "q=" not in href:
+        return None
+    q = parse_qs(href[ix + 1 :].split("#", 1)[0]).get("q")
+    return q[0] if q else None
 
 
 def _get_possible_url(text):
-    u = urlparse(text)
-    possible_url = parse_qs(u.query).get("q")
-    if possible_url:
-        return possible_url[0]
-    return None
+    return _query_q(text)
 
 
 def _get_possible_related(text):
     if text.startswith("/search"):
-        u = urlparse(text)
-        related = parse_qs(u.query).get("q")
-        if related:
-            return related[0]
+        return _query_q(text)
     return None
 
 
@@ -78,30 +101,31 @@ def words2url(words: str, lang=None):
 
 
 def transform_result_simple(html) -> List[str]:
-    urls = re.findall(_REGEX, html)
-    final = set()
-    for u in urls:
-        url = _valid_url(u)
-        if url:
-            final.add(u)
-    return list(final)
+    return list({u for u in _URL.findall(html) if _valid_url(u)})
 
 
 def transform_result(html) -> SearchResult:
-    soup = BS(html, "lxml")
-    links = soup.find_all(href=True)
-    v2 = []
-    for x in links:
-        u = _get_possible_url(x["href"])
-        if u and _valid_url(u):
-            v2.append(GLink(url=u, text=x.text))
-
-    related = set()
-    for x in links:
-        r = _get_possible_related(x["href"])
-        if r:
-            related.add(r)
-    return SearchResult(links=v2, related=list(related))
+    """
+    Links and related searches of a result page,
+    in a single pass over the elements with a href.
+    """
+    if not html or not html.strip():
+        return SearchResult(links=[], related=[])
+    tree = lxml.html.fromstring(html)
+    links = []
+    related: Dict[str, None] = {}
+    for el in tree.iter():
+        href = el.get("href")
+        if not href:
+            continue
+        q = _query_q(href)
+        if not q:
+            continue
+        if _valid_url(q):
+            links.append(GLink(url=q, text=str(el.text_content())))
+        if href.startswith("/search"):
+            related[q] = None
+    return SearchResult(links=links, related=list(related))
 
 
 def search(words: str, *, crawler: CrawlerSpec, lang=None) -> SearchResult:
@@ -109,3 +133,66 @@ def search(words: str, *, crawler: CrawlerSpec, lang=None) -> SearchResult:
     r = crawler.get(u)
     gr = transform_result(r.text)
     return gr
+
+
+async def asearch(words: str, *, crawler: CrawlerSpec, lang=None) -> SearchResult:
+    r = await crawler.aget(words2url(words, lang=lang))
+    return transform_result(r.text)
+
+
+def _dedup(results: List[SearchResult]) -> List[SearchResult]:
+    # a link is kept only in the first query which found it
+    seen: Set[str] = set()
+    for r in results:
+        links = []
+        for l in r.links:
+            if l.url not in seen:
+                seen.add(l.url)
+                links.append(l)
+        r.links = links
+    return results
+
+
+def _by_query(
+    queries: List[str], results: List[Optional[SearchResult]]
+) -> Dict[str, SearchResult]:
+    found = [(q, r) for q, r in zip(queries, results) if r is not None]
+    return dict(zip([q for q, _ in found], _dedup([r for _, r in found])))
+
+
+def search_many(
+    queries: Iterable[str], *, crawler: CrawlerSpec, lang=None, concurrency=8
+) -> Dict[str, SearchResult]:
+    """
+    Search many queries concurrently, each link is only in the result
+    of the first query which found it, in the order of `queries`.
+    Queries which fail are left out.
+    """
+    queries = list(dict.fromkeys(queries))
+
+    def _search(q):
+        try:
+            return search(q, crawler=crawler, lang=lang)
+        except (CrawlHTTPError, ParserError) as e:
+            logger.warning("search %r failed: %s", q, e)
+            return None
+
+    results = map_concurrent(_search, queries, workers=concurrency)
+    return _by_query(queries, results)
+
+
+async def asearch_many(
+    queries: Iterable[str], *, crawler: CrawlerSpec, lang=None, concurrency=8
+) -> Dict[str, SearchResult]:
+    """Async version of :func:`search_many`"""
+    queries = list(dict.fromkeys(queries))
+
+    async def _search(q):
+        try:
+            return await asearch(q, crawler=crawler, lang=lang)
+        except (CrawlHTTPError, ParserError) as e:
+            logger.warning("search %r failed: %s", q, e)
+            return None
+
+    results = await gather_limited([_search(q) for q in queries], limit=concurrency)
+    return _by_query(queries, results)
@@ -1,11 +1,14 @@
 from datetime import datetime
-from typing import List, Optional, Union
+from io import BytesIO
+from typing import Iterable, List, Optional, Union
 
 from dateutil.parser import parse as dtparser
 from attrs import define
+from lxml import etree
 
-from datahtml.base import CrawlerSpec
-from datahtml.parsers import text2soup
+from datahtml import errors
+from datahtml._utils import gather_limited, map_concurrent
+from datahtml.base import CrawlerSpec, CrawlResponse
 
 URL = "https://trends.google.com/trending/rss?geo="
 
@@ -78,13 +81,146 @@ def parse_entries(soup) -> List[GoogleTrend]:
     return trends
 
 
+def _local(tag: str) -> str:
+    # tags of the ht namespace are compared without it, google changed it
+    # between versions of the feed
+    return tag.rsplit("}", 1)[-1]
+
+
+def _children_text(el) -> dict:
+    return {_local(c.tag): c.text or "" for c in el if isinstance(c.tag, str)}
+
+
+def _news_from_xml(el) -> NewsItem:
+    t = _children_text(el)
+    return NewsItem(
+        title=t.get("news_item_title", ""),
+        snippet=t.get("news_item_snippet", ""),
+        url=t.get("news_item_url", ""),
+        source=t.get("news_item_source", ""),
+    )
+
+
+def _trend_from_xml(item) -> GoogleTrend:
+    news = []
+    fields = {}
+    for c in item:
+        if not isinstance(c.tag, str):
+            continue
+        tag = _local(c.tag)
+        if tag == "news_item":
+            news.append(_news_from_xml(c))
+        else:
+            fields.setdefault(tag, c.text or "")
+    return GoogleTrend(
+        title=fields.get("title", ""),
+        description=fields.get("description", ""),
+        aprox_traffic=fields.get("approx_traffic", ""),
+        pubdate=_dt_parser(fields.get("pubDate", "")),
+        picture=fields.get("picture") or None,
+        news=news,
+    )
+
+
+def parse_feed(content: Union[str, bytes]) -> List[GoogleTrend]:
+    """
+    Parse the rss of trends with a streaming xml parser,
+    it gives the same trends as :func:`parse_entries`.
+
+    :raises ValueError: if the document is xml but not a rss feed.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    trends = []
+    is_feed = False
+    for event, el in etree.iterparse(
+        BytesIO(content),
+        events=("start", "end"),
+        tag=("rss", "channel", "item"),
+        resolve_entities=False,
+    ):
+        if event == "start":
+            is_feed = is_feed or el.tag in ("rss", "channel")
+        elif el.tag == "item" and is_feed:
+            trends.append(_trend_from_xml(el))
+            el.clear()
+    if not is_feed:
+        raise ValueError("the document is not a rss feed")
+    return trends
+
+
+def _parse_response(rsp: CrawlResponse) -> List[GoogleTrend]:
+    try:
+        return parse_feed(rsp.content)
+    except (etree.XMLSyntaxError, ValueError):
+        raise errors.XMLContentNotFound(rsp.url)
+
+
 def download(
     geo: str,
     *,
     crawler: CrawlerSpec,
-    url: str = URL, 
+    url: str = URL,
 ) -> List[GoogleTrend]:
     rsp = crawler.get(f"{url}{geo.upper()}")
-    soup = text2soup(rsp.text)
-    trends = parse_entries(soup)
-    return trends
+    return _parse_response(rsp)
+
+
+async def adownload(
+    geo: str,
+    *,
+    crawler: CrawlerSpec,
+    url: str = URL,
+) -> List[GoogleTrend]:
+    rsp = await crawler.aget(f"{url}{geo.upper()}")
+    return _parse_response(rsp)
+
+
+def _trend_lists(geos: List[str], results: list) -> List[GoogleTrendList]:
+    return [
+        GoogleTrendList(geo=geo.upper(), trends=r)
+        for geo, r in zip(geos, results)
+        if r is not None
+    ]
+
+
+def download_many(
+    geos: Iterable[str],
+    *,
+    crawler: CrawlerSpec,
+    url: str = URL,
+    concurrency=8,
+) -> List[GoogleTrendList]:
+    """
+    Download the trends of many geos concurrently, in the order of `geos`.
+    Geos which fail or don't answer with xml are left out.
+    """
+    geos = list(dict.fromkeys(g.upper() for g in geos))
+
+    def _download(geo):
+        try:
+            return download(geo, crawler=crawler, url=url)
+        except (errors.CrawlHTTPError, errors.XMLContentNotFound):
+            return None
+
+    return _trend_lists(geos, map_concurrent(_download, geos, workers=concurrency))
+
+
+async def adownload_many(
+    geos: Iterable[str],
+    *,
+    crawler: CrawlerSpec,
+    url: str = URL,
+    concurrency=8,
+) -> List[GoogleTrendList]:
+    """Async version of :func:`download_many`"""
+    geos = list(dict.fromkeys(g.upper() for g in geos))
+
+    async def _download(geo):
+        try:
+            return await adownload(geo, crawler=crawler, url=url)
+        except (errors.CrawlHTTPError, errors.XMLContentNotFound):
+            return None
+
+    results = await gather_limited([_download(g) for g in geos], limit=concurrency)
+    return _trend_lists(geos, results)
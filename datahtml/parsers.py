@@ -1,6 +1,6 @@
 import json
 import re
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urlparse
 
 from bs4 import BeautifulSoup as BS
@@ -237,6 +237,82 @@ def findkeys(node, kv):
                 yield x
 
 
+class KeyIndex:
+    """
+    Values of a decoded json document by key, collected in a single
+    traversal. The values of each key are in the same order
+    as :func:`findkeys` yields them, so
+
+        KeyIndex(data).get("country") == list(findkeys(data, "country"))
+
+    :param node: a decoded json document.
+    :param keys: keys to record, by default every key.
+    :param with_paths: also record the path of each value,
+        as a tuple of keys and list positions from the root.
+    """
+
+    def __init__(
+        self, node, keys: Optional[Iterable[str]] = None, with_paths=False
+    ):
+        self.root = node
+        self._keys = set(keys) if keys is not None else None
+        self._values: Dict[str, List[Any]] = {}
+        self._paths: Dict[str, List[Tuple]] = {}
+        self._walk(node, with_paths)
+
+    def _walk(self, node, with_paths: bool):
+        keys = self._keys
+        values = self._values
+        paths = self._paths
+        # pre-order traversal, children are pushed in reverse
+        stack: List[Tuple[Any, Tuple]] = [(node, ())]
+        while stack:
+            node, path = stack.pop()
+            if isinstance(node, dict):
+                children = []
+                for k, v in node.items():
+                    if keys is None or k in keys:
+                        values.setdefault(k, []).append(v)
+                        if with_paths:
+                            paths.setdefault(k, []).append(path + (k,))
+                    if isinstance(v, (dict, list)):
+                        children.append((v, path + (k,) if with_paths else path))
+                stack.extend(reversed(children))
+            elif isinstance(node, list):
+                stack.extend(
+                    (node[i], path + (i,) if with_paths else path)
+                    for i in range(len(node) - 1, -1, -1)
+                    if isinstance(node[i], (dict, list))
+                )
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._values
+
+    def keys(self) -> List[str]:
+        return list(self._values.keys())
+
+    def get(self, key: str) -> List[Any]:
+        """Every value of `key`, empty if it's not in the document"""
+        return self._values.get(key, [])
+
+    def first(self, key: str, default=None) -> Any:
+        values = self._values.get(key)
+        if values:
+            return values[0]
+        return default
+
+    def paths(self, key: str) -> List[Tuple]:
+        """Paths of the values of `key`, it requires `with_paths`"""
+        return self._paths.get(key, [])
+
+    def resolve(self, path: Iterable) -> Any:
+        """Value at `path` from the root of the document"""
+        node = self.root
+        for step in path:
+            node = node[step]
+        return node
+
+
 def meta_keywords(soup: BS) -> str:
     data = extract_metadata(soup)
     keywords = ""
@@ -1,6 +1,8 @@
 import logging
+import re
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
 
 import feedparser
 from dateutil.parser import parse as dtparser
@@ -10,6 +12,10 @@ from datahtml.base import CrawlerSpec
 
 # from datahtml.web import Web
 
+FEED_TYPES = ("application/rss+xml", "application/atom+xml")
+_FEED_ROOT = re.compile(rb"<(?:rss|feed|rdf:rdf)[\s>]")
+_FEED_HREF = re.compile(r"""href=["']([^"']*(?:rss|feed)[^"']*)["']""", re.I)
+
 
 @dataclass
 class Entry:
@@ -73,6 +79,41 @@ def find_rss_realated_links(links: List[types.Link]):
     return rss_links
 
 
+def find_alternate_links(soup, base_url: str) -> List[str]:
+    """
+    Feeds announced in the head of a html document with
+    `<link rel="alternate" type="application/rss+xml" href="...">`
+    """
+    links = []
+    for tag in soup.find_all("link", href=True):
+        rel = tag.get("rel") or []
+        if "alternate" in rel and tag.get("type", "").lower() in FEED_TYPES:
+            href = urljoin(base_url, tag["href"].strip())
+            if href not in links:
+                links.append(href)
+    return links
+
+
+def find_rss_related_hrefs(html: str, base_url: str) -> List[str]:
+    """
+    Like :func:`find_rss_realated_links` but it scans the raw html instead
+    of a parsed document.
+    """
+    links = []
+    for href in _FEED_HREF.findall(html):
+        _url = urljoin(base_url, href.strip())
+        if _url not in links:
+            links.append(_url)
+    return links
+
+
+def sniff_feed(content: bytes, size=2048) -> bool:
+    """Check if the first bytes of a document look like a rss/atom feed"""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return bool(_FEED_ROOT.search(content[:size].lower()))
+
+
 def download_as_dict(url, *, crawler: CrawlerSpec) -> List[Dict[str, Any]]:
     """
     Get and parse the rss feed from a URL.
@@ -100,3 +141,15 @@ def download(url, *, crawler: CrawlerSpec) -> List[Entry]:
 
     data = parse(rsp.text)
     return data
+
+
+async def adownload(url, *, crawler: CrawlerSpec) -> List[Entry]:
+    """
+    Async version of :func:`download`
+    """
+    rsp = await crawler.aget(url)
+    if not rsp.is_xml:
+        raise errors.XMLContentNotFound(url)
+
+    data = parse(rsp.text)
+    return data
@@ -1,80 +1,106 @@
-from typing import Dict, List, Optional, Any
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Any
 
 from datahtml import rss, web
 from datahtml.base import CrawlerSpec
 from datahtml.errors import URLParsingError, XMLContentNotFound
 from datahtml.parsers import parse_url, text_from_link
+from datahtml.site_snapshot import SnapshotStore
 from datahtml.sitemap import SitemapLink
-from datahtml.types import Link
+from datahtml.types import Link, URL
 from datahtml.web import WebDocument
 
 from datahtml.types import LinkMerged
 
+logger = logging.getLogger(__name__)
 
-def _map_rss_links(links: Dict[str, LinkMerged], rss_links: List[rss.Entry]):
-    for l in rss_links:
+
+class _LinksMerger:
+    """
+    Merge links from the different sources by their `url_short`,
+    each url is parsed only once.
+
+    The result doesn't depend on the order in which the sources are added:
+    a link found in the html wins over the sitemap, and the sitemap wins over
+    the rss. `lastmod` is always taken from the sitemap when the link is there.
+    """
+
+    def __init__(self):
+        self.links: Dict[str, LinkMerged] = {}
+        self._urls: Dict[str, Optional[URL]] = {}
+
+    def _parse(self, href: str) -> Optional[URL]:
+        try:
+            return self._urls[href]
+        except KeyError:
+            pass
         try:
-            u = parse_url(l.href)
+            u: Optional[URL] = parse_url(href)
         except URLParsingError:
-            break
-        _link2crawl = links.get(u.url_short)
-        if not _link2crawl:
-            text = text_from_link(u.fullurl)
-            title = l.title if l.title else None
-            text2use = title if title else text
-            links[u.url_short] = LinkMerged(
-                fullurl=u.fullurl,
-                urlnorm=u.url_short,
-                source="rss",
-                title=title,
-                text=text2use,
-                text_path=text,
-                lastmod=l.published,
-            )
+            u = None
+        self._urls[href] = u
+        return u
 
+    def _new(self, u: URL, source: str, title=None, lastmod=None) -> LinkMerged:
+        text = text_from_link(u.fullurl)
+        return LinkMerged(
+            fullurl=u.fullurl,
+            urlnorm=u.url_short,
+            source=source,
+            title=title,
+            text=title if title else text,
+            text_path=text,
+            lastmod=lastmod,
+        )
 
-def _map_html_links(links: Dict[str, LinkMerged], html_links: List[Link]):
-    for l in html_links:
-        if l.internal and not l.is_file:
-            try:
-                u = parse_url(l.href)
-            except URLParsingError:
-                u = None
+    def add_html(self, html_links: List[Link]):
+        for l in html_links:
+            if not l.internal or l.is_file:
+                continue
+            u = self._parse(l.href)
             if u and (u.path != "/" or not u.path):
-                _link2crawl = links.get(u.url_short)
-                if not _link2crawl:
-                    text = text_from_link(u.fullurl)
-                    title = l.title if l.title else None
-                    text2use = title if title else text
-
-                    links[u.url_short] = LinkMerged(
-                        fullurl=u.fullurl,
-                        urlnorm=u.url_short,
-                        source="html",
-                        title=title,
-                        text=text2use,
-                        text_path=text,
+                current = self.links.get(u.url_short)
+                if current is None or current.source == "rss":
+                    self.links[u.url_short] = self._new(u, "html", l.title or None)
+                elif current.source == "sitemap":
+                    self.links[u.url_short] = self._new(
+                        u, "html", l.title or None, lastmod=current.lastmod
                     )
 
+    def add_sitemap(self, map_links: List[SitemapLink]):
+        for l in map_links:
+            u = self._parse(l.fullurl)
+            if not u:
+                continue
+            current = self.links.get(u.url_short)
+            if current is None or current.source == "rss":
+                self.links[u.url_short] = self._new(u, "sitemap", lastmod=l.lastmod)
+            else:
+                current.lastmod = l.lastmod
 
-def _map_sitemap_links(links: Dict[str, LinkMerged], map_links: List[SitemapLink]):
-    for l in map_links:
-        u = parse_url(l.fullurl)
-        _link2crawl = links.get(u.url_short)
-        if not _link2crawl:
-            text = text_from_link(u.fullurl)
-            title = None
-            links[u.url_short] = LinkMerged(
-                fullurl=u.fullurl,
-                urlnorm=u.url_short,
-                source="sitemap",
-                title=title,
-                text=text,
-                text_path=text,
-                lastmod=l.lastmod,
-            )
-        else:
-            links[u.url_short].lastmod = l.lastmod
+    def add_rss(self, rss_links: List[rss.Entry]):
+        for l in rss_links:
+            u = self._parse(l.link)
+            if u and u.url_short not in self.links:
+                self.links[u.url_short] = self._new(
+                    u, "rss", l.title or None, lastmod=l.published
+                )
+
+    def add(self, source: str, data):
+        if source == "html":
+            self.add_html(data.links())
+        elif source == "sitemap":
+            self.add_sitemap(data)
+        elif source == "rss":
+            self.add_rss(data)
+
+    def result(self) -> List[LinkMerged]:
+        return list(self.links.values())
+
+
+def _site_key(fullurl: str) -> str:
+    return parse_url(fullurl).domain_base
 
 
 def links_mapping(
@@ -82,14 +108,14 @@ def links_mapping(
     w: Optional[WebDocument] = None,
     rss_data: Optional[List[rss.Entry]] = None,
 ) -> List[LinkMerged]:
-    links: Dict[str, LinkMerged] = {}
+    merger = _LinksMerger()
     if w:
-        _map_html_links(links, w.links())
+        merger.add_html(w.links())
     if sitemap:
-        _map_sitemap_links(links, sitemap)
+        merger.add_sitemap(sitemap)
     if rss_data:
-        _map_rss_links(links, rss_data)
-    return list(links.values())
+        merger.add_rss(rss_data)
+    return merger.result()
 
 
 def extract_links(
@@ -98,6 +124,7 @@ def extract_links(
     from_html=True,
     from_rss=None,
     from_sitemap=False,
+    snapshot: Optional[SnapshotStore] = None,
 ) -> List[LinkMerged]:
     """
     Extract links from different sources.
@@ -107,6 +134,8 @@ def extract_links(
     :param from_html: True if you want to include links from the html source
     :param from_rss: The url of a feed rss to download
     :param from_sitemap: True if you want also get links from the sitemap
+    :param snapshot: if given, only links new or changed since the previous
+        run are returned, see :class:`datahtml.site_snapshot.SnapshotStore`
     """
     w = None
     if from_html:
@@ -122,4 +151,81 @@ def extract_links(
         except XMLContentNotFound:
             pass
     links = links_mapping(smap, w, rss_data)
+    if snapshot:
+        return snapshot.diff(_site_key(fullurl), links)
     return links
+
+
+async def _adownload_rss(url: str, *, crawler: CrawlerSpec) -> List[rss.Entry]:
+    try:
+        return await rss.adownload(url, crawler=crawler)
+    except XMLContentNotFound:
+        return []
+
+
+async def aextract_links(
+    fullurl: str,
+    crawler: CrawlerSpec,
+    from_html=True,
+    from_rss=None,
+    from_sitemap=False,
+    wait_for: Optional[Iterable[str]] = None,
+    snapshot: Optional[SnapshotStore] = None,
+) -> List[LinkMerged]:
+    """
+    Async version of :func:`extract_links`. The sources are fetched
+    concurrently and merged as soon as each one arrives.
+
+    :param fullurl: usually the root url where we want to get links
+    :param crawler: instance of CrawlerSpec
+    :param from_html: True if you want to include links from the html source
+    :param from_rss: The url of a feed rss to download
+    :param from_sitemap: True if you want also get links from the sitemap
+    :param wait_for: names of the sources ("html", "sitemap", "rss") needed
+        to return. When they are done, the sources still running are
+        cancelled and the links merged until then are returned.
+        By default it waits for every requested source. A source which
+        fails raises only if it's needed, otherwise it's skipped.
+    :param snapshot: if given, only links new or changed since the previous
+        run are returned, see :class:`datahtml.site_snapshot.SnapshotStore`
+    """
+    tasks: Dict[asyncio.Task, str] = {}
+    if from_html:
+        tasks[asyncio.ensure_future(web.adownload(fullurl, crawler=crawler))] = "html"
+    if from_sitemap:
+        tasks[
+            asyncio.ensure_future(web.abuild_sitemap(fullurl, crawler=crawler))
+        ] = "sitemap"
+    if from_rss:
+        tasks[asyncio.ensure_future(_adownload_rss(from_rss, crawler=crawler))] = "rss"
+
+    required = set(tasks.values())
+    if wait_for is not None:
+        required &= set(wait_for)
+    pending_required = set(required)
+
+    merger = _LinksMerger()
+    pending = set(tasks.keys())
+    try:
+        while pending and pending_required:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                source = tasks[task]
+                exc = task.exception()
+                if exc is None:
+                    merger.add(source, task.result())
+                elif source in required:
+                    raise exc
+                else:
+                    logger.warning("source %s of %s failed: %s", source, fullurl, exc)
+                pending_required.discard(source)
+    finally:
+        for task in pending:
+            task.cancel()
+        # retrieve the results of every task, cancelled or failed
+        await asyncio.gather(*tasks, return_exceptions=True)
+    if snapshot:
+        return snapshot.diff(_site_key(fullurl), merger.result())
+    return merger.result()
@@ -0,0 +1,146 @@
+"""
+Snapshots of the links of a site between runs.
+
+Links are stored by site and :attr:`datahtml.types.LinkMerged.urlnorm`
+in a sqlite table, the membership check is done against that index in
+batches, so previous runs are never loaded in memory.
+
+.. code-block:: python
+
+    from datahtml import crawler, site
+    from datahtml.site_snapshot import SnapshotStore
+
+    store = SnapshotStore("snapshots.db")
+    new_links = site.extract_links(
+        "https://www.infobae.com", crawler.LocalCrawler(), snapshot=store
+    )
+
+"""
+import hashlib
+import sqlite3
+import time
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
+from attrs import define
+
+from datahtml.types import LinkMerged
+
+
+@define
+class LinkSnapshot:
+    site: str
+    urlnorm: str
+    fullurl: str
+    source: str
+    first_seen: float
+    last_seen: float
+
+
+def link_digest(link: LinkMerged) -> int:
+    """A 64 bits hash of the values that could change for a same url"""
+    h = hashlib.blake2b(digest_size=8)
+    for value in (link.title, link.text, link.lastmod):
+        h.update((value or "").encode("utf-8"))
+        h.update(b"\x00")
+    return int.from_bytes(h.digest(), "big", signed=True)
+
+
+class SnapshotStore:
+    """
+    :param uri: sqlite database, by default an in-memory one.
+    :param batch_size: how many links are checked by query.
+    """
+
+    def __init__(self, uri=":memory:", batch_size=500):
+        self.conn = sqlite3.connect(uri)
+        self.batch_size = batch_size
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS links
+            (site TEXT NOT NULL, urlnorm TEXT NOT NULL, fullurl TEXT,
+             source TEXT, digest INTEGER, first_seen REAL, last_seen REAL,
+             PRIMARY KEY (site, urlnorm)) WITHOUT ROWID;
+            """
+            )
+
+    def _known(self, site: str, urlnorms: List[str]):
+        marks = ",".join("?" * len(urlnorms))
+        rows = self.conn.execute(
+            f"select urlnorm, digest from links where site = ? and urlnorm in ({marks});",
+            (site, *urlnorms),
+        ).fetchall()
+        return dict(rows)
+
+    def idiff(
+        self, site: str, links: Iterable[LinkMerged], now: Optional[float] = None
+    ) -> Iterator[LinkMerged]:
+        """
+        Record `links` as seen for `site` and yield those which are new
+        or whose title, text or lastmod changed since they were recorded.
+        Links are recorded while the generator is consumed.
+        """
+        now = now or time.time()
+        it = iter(links)
+        while True:
+            batch = list(islice(it, self.batch_size))
+            if not batch:
+                break
+            # the last occurrence of an url in the batch wins
+            by_url = {l.urlnorm: l for l in batch}
+            known = self._known(site, list(by_url.keys()))
+            digests = {u: link_digest(l) for u, l in by_url.items()}
+            with self.conn:
+                self.conn.executemany(
+                    """insert into links values (?, ?, ?, ?, ?, ?, ?)
+                    on conflict(site, urlnorm) do update set
+                    fullurl=excluded.fullurl, source=excluded.source,
+                    digest=excluded.digest, last_seen=excluded.last_seen;
+                    """,
+                    [
+                        (site, u, l.fullurl, l.source, digests[u], now, now)
+                        for u, l in by_url.items()
+                    ],
+                )
+            for u, l in by_url.items():
+                if known.get(u) != digests[u]:
+                    yield l
+
+    def diff(
+        self, site: str, links: Iterable[LinkMerged], now: Optional[float] = None
+    ) -> List[LinkMerged]:
+        """Same as :meth:`idiff` but it returns a list"""
+        return list(self.idiff(site, links, now=now))
+
+    def get(self, site: str, urlnorm: str) -> Optional[LinkSnapshot]:
+        row = self.conn.execute(
+            """select site, urlnorm, fullurl, source, first_seen, last_seen
+            from links where site = ? and urlnorm = ?;""",
+            (site, urlnorm),
+        ).fetchone()
+        if not row:
+            return None
+        return LinkSnapshot(*row)
+
+    def count(self, site: str) -> int:
+        row = self.conn.execute(
+            "select count(*) from links where site = ?;", (site,)
+        ).fetchone()
+        return row[0]
+
+    def forget(self, site: str, older_than: Optional[float] = None):
+        """
+        Remove the links of a site, or only those not seen
+        since the `older_than` timestamp.
+        """
+        with self.conn:
+            if older_than is None:
+                self.conn.execute("delete from links where site = ?;", (site,))
+            else:
+                self.conn.execute(
+                    "delete from links where site = ? and last_seen < ?;",
+                    (site, older_than),
+                )
@@ -0,0 +1,246 @@
+"""
+Index from social handles and websites to wikidata entities.
+
+Each handle of an entity (instagram, twitter, facebook, youtube channel)
+and the domain of its websites becomes a key like ``ig:handle`` or
+``site:example.com``, stored in sqlite with the id of the entity.
+Entities could come from the API or from a dump.
+
+.. code-block:: python
+
+    from datahtml.social_index import SocialIndex, SOCIAL_PROPS
+    from datahtml.wikidata_dump import read_dump
+
+    ix = SocialIndex("social.db")
+    ix.add_entities(read_dump("latest-all.json.gz", props=SOCIAL_PROPS.values()))
+
+    ix.lookup_many(WebDocument.parse(url, crawler=c).social_urls())
+    # {"https://twitter.com/lanacion": ["Q1247227"], ...}
+
+"""
+import sqlite3
+from urllib.parse import parse_qs
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from datahtml import errors, types
+from datahtml.parsers import parse_url
+from datahtml.wikidata import PROPS, _get_claim_data
+
+#: network of the key and its wikidata property
+SOCIAL_PROPS = {
+    "ig": PROPS["ig"],
+    "twitter": PROPS["twitter"],
+    "fb": PROPS["facebook"],
+    "yt": PROPS["youtube"],
+    "site": PROPS["websites"],
+}
+
+#: registered domains of each network, subdomains like m. are included
+NETWORKS = {
+    "instagram.com": "ig",
+    "twitter.com": "twitter",
+    "x.com": "twitter",
+    "facebook.com": "fb",
+    "fb.com": "fb",
+    "youtube.com": "yt",
+}
+
+#: first segments of paths which aren't handles
+_NOT_HANDLES = {
+    "p",
+    "reel",
+    "i",
+    "intent",
+    "share",
+    "sharer",
+    "sharer.php",
+    "hashtag",
+    "home",
+    "pages",
+    "groups",
+    "watch",
+    "search",
+    "explore",
+}
+
+Entity = Union[Dict[str, Any], types.WKEntityV1, types.WKEntityExtra]
+
+
+def handle_key(network: str, handle: str) -> str:
+    """
+    Key of a handle, handles are case insensitive but the ids
+    of youtube channels.
+    """
+    handle = handle.strip().strip("/").lstrip("@")
+    if network != "yt":
+        handle = handle.lower()
+    return f"{network}:{handle}"
+
+
+def site_key(url: Union[str, types.URL]) -> Optional[str]:
+    if isinstance(url, str):
+        try:
+            url = parse_url(url)
+        except errors.URLParsingError:
+            return None
+    return f"site:{url.domain_base.lower()}"
+
+
+def url_key(url: Union[str, types.URL]) -> Optional[str]:
+    """
+    Key of a url: the handle for urls of the social networks
+    and the domain for the rest.
+
+    Only the channel ids of youtube are in wikidata, urls like
+    ``youtube.com/@handle`` or ``youtube.com/c/name`` have no key.
+    """
+    if isinstance(url, str):
+        try:
+            url = parse_url(url)
+        except errors.URLParsingError:
+            return None
+    domain = ".".join(url.domain_base.lower().split(".")[-2:])
+    network = NETWORKS.get(domain)
+    if network is None:
+        return site_key(url)
+    path, _, query = url.path.partition("?")
+    parts = [p for p in path.split("/") if p]
+    if network == "yt":
+        if len(parts) >= 2 and parts[0] == "channel":
+            return handle_key(network, parts[1])
+        return None
+    if network == "fb" and parts == ["profile.php"]:
+        # profiles without username, by their numeric id
+        profile = parse_qs(query).get("id")
+        return handle_key(network, profile[0]) if profile else None
+    if not parts or parts[0].lower() in _NOT_HANDLES:
+        return None
+    return handle_key(network, parts[0])
+
+
+def entity_keys(e: Entity) -> List[str]:
+    """
+    Keys of a raw entity, a :class:`datahtml.types.WKEntityV1`
+    or a :class:`datahtml.types.WKEntityExtra`.
+
+    :raises ValueError: for a :class:`datahtml.types.WKEntityV1` without
+        its raw data, like those of ``read_dump(keep_raw=False)``.
+    """
+    if isinstance(e, types.WKEntityExtra):
+        values = {
+            "ig": e.ig,
+            "twitter": e.twitter,
+            "fb": e.fb,
+            "yt": e.youtube,
+            "site": e.sites,
+        }
+    else:
+        if isinstance(e, types.WKEntityV1) and not e.raw:
+            raise ValueError(f"{e.id} has no raw data to take the handles from")
+        raw = e.raw if isinstance(e, types.WKEntityV1) else e
+        values = {
+            net: _get_claim_data(raw, prop) for net, prop in SOCIAL_PROPS.items()
+        }
+    keys = []
+    for network, handles in values.items():
+        for h in handles or []:
+            if not isinstance(h, str):
+                continue
+            key = site_key(h) if network == "site" else handle_key(network, h)
+            if key:
+                keys.append(key)
+    return list(dict.fromkeys(keys))
+
+
+class SocialIndex:
+    """
+    :param uri: sqlite database, by default an in-memory one.
+    """
+
+    def __init__(self, uri=":memory:"):
+        self.conn = sqlite3.connect(uri, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS handles
+            (key TEXT, qid TEXT, PRIMARY KEY (key, qid)) WITHOUT ROWID;
+            """
+            )
+
+    def __len__(self):
+        return self.conn.execute("select count(*) from handles;").fetchone()[0]
+
+    def add_entities(self, entities: Iterable[Entity], batch=10_000) -> int:
+        """
+        Index the keys of `entities`, they are written every `batch`
+        keys so a dump could be streamed.
+
+        :return: number of keys added.
+        """
+        added = 0
+        rows = []
+        for e in entities:
+            qid = e["id"] if isinstance(e, dict) else e.id
+            rows.extend((k, qid) for k in entity_keys(e))
+            if len(rows) >= batch:
+                added += self._insert(rows)
+                rows = []
+        if rows:
+            added += self._insert(rows)
+        return added
+
+    def _insert(self, rows) -> int:
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("insert or ignore into handles values (?, ?);", rows)
+            return self.conn.total_changes - before
+
+    def remove_entity(self, qid: str):
+        with self.conn:
+            self.conn.execute("delete from handles where qid = ?;", (qid,))
+
+    def get(self, key: str) -> List[str]:
+        """Entities of a key like ``ig:handle``"""
+        return [
+            r[0]
+            for r in self.conn.execute(
+                "select qid from handles where key = ? order by qid;", (key,)
+            )
+        ]
+
+    def lookup(self, url: Union[str, types.URL]) -> List[str]:
+        key = url_key(url)
+        return self.get(key) if key else []
+
+    def lookup_many(
+        self, urls: Iterable[Union[str, types.URL]]
+    ) -> Dict[str, List[str]]:
+        """
+        Entities of many urls, like the output of
+        :meth:`datahtml.web.WebDocument.social_urls`, in a query by 500 keys.
+
+        :return: entities by url, urls without entities are left out.
+        """
+        by_key: Dict[str, List[str]] = {}
+        for url in urls:
+            key = url_key(url)
+            if key:
+                fullurl = url if isinstance(url, str) else url.fullurl
+                by_key.setdefault(key, []).append(fullurl)
+        keys = list(by_key)
+        for key in keys:
+            # the same link is usually in the header and in the footer
+            by_key[key] = list(dict.fromkeys(by_key[key]))
+        result: Dict[str, List[str]] = {}
+        for ix in range(0, len(keys), 500):
+            chunk = keys[ix : ix + 500]
+            marks = ",".join("?" * len(chunk))
+            for key, qid in self.conn.execute(
+                f"select key, qid from handles where key in ({marks}) order by key, qid;",
+                chunk,
+            ):
+                for fullurl in by_key[key]:
+                    result.setdefault(fullurl, []).append(qid)
+        return result
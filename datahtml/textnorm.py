@@ -0,0 +1,90 @@
+"""
+Normalization of texts for the url indexes.
+
+A text is transliterated to ascii with `unidecode`, every char which is not
+a letter becomes a space and the spaces are collapsed.
+
+`unidecode` works char by char, so the whole transformation is done with
+:meth:`str.translate` and a table from each char to its normalized value.
+The table is precomputed for the latin scripts and filled lazily for the
+rest of chars, the output is the same as :func:`norm_words_re`.
+
+.. code-block:: python
+
+    from datahtml import textnorm
+
+    textnorm.norm_words("Dólar hoy: a cuánto cotiza")
+    # 'Dolar hoy a cuanto cotiza'
+    textnorm.norm_many(titles)
+
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+from unidecode import unidecode
+
+_NOT_LETTERS = re.compile(r"[^a-zA-Z]")
+
+#: latin-1, latin extended A and B, and general punctuation
+_PRECOMPUTED = [(0x0000, 0x0250), (0x1E00, 0x1F00), (0x2000, 0x2070)]
+
+#: texts up to this size are cached
+SHORT_TEXT = 128
+
+
+def norm_words_re(words: str) -> str:
+    """Reference implementation, based on a regex"""
+    rsp = _NOT_LETTERS.sub(" ", unidecode(words))
+    return " ".join(rsp.split())
+
+
+def _norm_char(char: str) -> str:
+    return _NOT_LETTERS.sub(" ", unidecode(char))
+
+
+class _Table(Dict[int, str]):
+    """Translation table which computes missing chars when they appear"""
+
+    def __missing__(self, code: int) -> str:
+        value = _norm_char(chr(code))
+        self[code] = value
+        return value
+
+
+def _build_table() -> _Table:
+    table = _Table()
+    for start, end in _PRECOMPUTED:
+        for code in range(start, end):
+            table[code] = _norm_char(chr(code))
+    return table
+
+
+_TABLE = _build_table()
+
+
+def _norm(words: str) -> str:
+    return " ".join(words.translate(_TABLE).split())
+
+
+_norm_cached = lru_cache(maxsize=65536)(_norm)
+
+
+def norm_words(words: str) -> str:
+    """
+    Transliterate `words` to ascii and keep only the letters,
+    separated by a single space.
+    """
+    if len(words) <= SHORT_TEXT:
+        return _norm_cached(words)
+    return _norm(words)
+
+
+def norm_many(texts: Iterable[str]) -> List[str]:
+    """
+    :func:`norm_words` of each text, in the same order.
+
+    Joining the texts to translate them at once was slower than
+    translating them one by one, and it missed the cache.
+    """
+    return [norm_words(t) for t in texts]
@@ -153,6 +153,7 @@ class WKEntityExtra:
     fb: Optional[List[str]] = None
     linkedin: Optional[List[str]] = None
     twitter: Optional[List[str]] = None
+    youtube: Optional[List[str]] = None
 
     def __str__(self):
         return f"<WKEntityExtra {self.id} | {self.label}>"
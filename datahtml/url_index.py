@@ -1,19 +1,22 @@
-from collections.abc import Callable
-from unidecode import unidecode
-import re
+import asyncio
+import hashlib
+import queue
 import sqlite3
-from typing import List, Callable
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+
 from attr import define
 from datahtml.types import URL
 from datahtml.parsers import parse_url
-
-_exp = r'[^a-zA-z]'
-
-def norm_words(words):
-    new_ = unidecode(words) 
-    rsp = re.sub(_exp, ' ', new_)
-    final = " ".join(rsp.split())
-    return final
+from datahtml.textnorm import norm_words
 
 @define
 class SearchLink:
@@ -27,11 +30,142 @@ class SearchLink:
         return obj
 
 
+_TRIGGER_AI = """
+CREATE TRIGGER IF NOT EXISTS content_ai AFTER INSERT ON content BEGIN
+  INSERT INTO search_ix(rowid, url, text, domain) VALUES (new.id, new.url, new.text, new.domain);
+END;
+"""
+
+#: parsed url columns stored with each link, so search results don't
+#: need to parse urls again.
+_URL_COLUMNS = (
+    ("url_short", "TEXT"),
+    ("norm", "TEXT"),
+    ("www", "INTEGER"),
+    ("secure", "INTEGER"),
+    ("netloc", "TEXT"),
+    ("path", "TEXT"),
+    ("tld", "TEXT"),
+    ("is_social", "INTEGER"),
+)
+
+#: columns used to refresh links in place, see :meth:`URLIndex.upsert_many`
+_REFRESH_COLUMNS = (
+    ("text_hash", "INTEGER"),
+    ("updated_at", "REAL"),
+)
+
+_INSERT = """insert {conflict} into content
+(url, text, domain, url_short, norm, www, secure, netloc, path, tld, is_social,
+text_hash, updated_at)
+values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?){upsert};"""
+
+_UPSERT = """ on conflict(url) do update set
+text=excluded.text, text_hash=excluded.text_hash, updated_at=excluded.updated_at"""
+
+_SEARCH = """select c.url, c.text, c.domain, c.url_short, c.norm, c.www, c.secure,
+c.netloc, c.path, c.tld, c.is_social, {table}.rank
+from {table} join content c on c.id = {table}.rowid
+where {column} MATCH ? {domain} order by {table}.rank limit ?;"""
+
+_TRIGGER_TRI_AI = """
+CREATE TRIGGER IF NOT EXISTS content_tri_ai AFTER INSERT ON content BEGIN
+  INSERT INTO search_tri(rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+_TRIGGER_AU = """
+CREATE TRIGGER IF NOT EXISTS content_text_au AFTER UPDATE OF text ON content
+WHEN old.text_hash IS NOT new.text_hash BEGIN
+  INSERT INTO search_ix(search_ix, rowid, url, text, domain) VALUES('delete', old.id, old.url, old.text, old.domain);
+  INSERT INTO search_ix(rowid, url, text, domain) VALUES (new.id, new.url, new.text, new.domain);
+END;
+"""
+
+#: search modes of :meth:`URLIndex.search`
+MODES = ("exact", "prefix", "fuzzy")
+
+
+def text_hash(text: str) -> int:
+    """A 64 bits hash of an indexed text"""
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each word of a normalized text, lowercased"""
+    grams = set()
+    for w in text.lower().split():
+        grams.update(w[i : i + 3] for i in range(len(w) - 2))
+    return grams
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA cache_size=-65536;",
+)
+
+
 class URLIndex:
 
-    def __init__(self, uri=":memory:", norm_func: Callable=norm_words):
-        self.conn = sqlite3.connect(uri)
+    def __init__(
+        self,
+        uri=":memory:",
+        norm_func: Callable = norm_words,
+        cache_size=1024,
+        readers=0,
+        mmap_size=256 * 1024 * 1024,
+        shared_cache=False,
+        prefix: Optional[Sequence[int]] = None,
+        trigram=False,
+        fuzzy_candidates=50,
+    ):
+        """
+        :param uri: sqlite database, by default an in-memory one.
+        :param norm_func: function used to normalize texts and queries.
+        :param cache_size: how many search results are kept in memory,
+            0 to disable the cache. It's cleared on each write, of this
+            index or of other connections to the same database.
+        :param readers: for databases on disk, size of a pool of read-only
+            connections used by searches. Writes keep using a single
+            connection. With 0 every operation uses the same connection.
+        :param mmap_size: bytes of the database memory mapped by each reader.
+        :param shared_cache: open the readers with sqlite's shared cache.
+        :param prefix: lengths of the prefix indexes of the fts table,
+            like (2, 3), they make "prefix" searches faster. It only applies
+            when the table is created.
+        :param trigram: keep a second fts table with the trigram tokenizer,
+            needed by "fuzzy" searches.
+        :param fuzzy_candidates: how many rows of the trigram table are
+            scored by each "fuzzy" search.
+        """
+        if readers and (uri == ":memory:" or "mode=memory" in uri):
+            raise ValueError("readers are only available for databases on disk")
+        self.conn = sqlite3.connect(
+            uri, uri=uri.startswith("file:"), check_same_thread=False
+        )
         self.norm: Callable = norm_func
+        self.cache_size = cache_size
+        self.readers = readers
+        self.mmap_size = mmap_size
+        self.shared_cache = shared_cache
+        self.prefix = prefix
+        self.trigram = trigram
+        self.fuzzy_candidates = fuzzy_candidates
+        self._uri = uri
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._data_version: Optional[int] = None
+        # bumped by each clear, results read before it aren't cached
+        self._generation = 0
+        self._lock = threading.RLock()
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._pool_conns: List[sqlite3.Connection] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._create_tables()
+        if readers:
+            self.conn.execute("PRAGMA journal_mode=WAL;")
 
     def _create_tables(self):
         cur = self.conn.cursor()
@@ -40,83 +174,475 @@ class URLIndex:
         (id INTEGER PRIMARY KEY,url TEXT NOT NULL UNIQUE, text TEXT, domain TEXT);
         """
         )
+        # content_au of previous versions wrote to a misspelled table,
+        # it's replaced by content_text_au, which only updates the fts row
+        # when the text changes.
+        cur.execute("DROP TRIGGER IF EXISTS content_au;")
+        self._add_missing_columns(cur)
+        prefix = ""
+        if self.prefix:
+            prefix = ", prefix='{}'".format(" ".join(str(p) for p in self.prefix))
         cur.execute(
-            'CREATE VIRTUAL TABLE IF NOT EXISTS search_ix using fts5(id UNINDEXED, url UNINDEXED, text, domain, tokenize="ascii", content=content, content_rowid=id);'
+            'CREATE VIRTUAL TABLE IF NOT EXISTS search_ix using fts5(id UNINDEXED, url UNINDEXED, text, domain, tokenize="ascii", content=content, content_rowid=id'
+            + prefix
+            + ");"
         )
 
         cur.execute(
-            """CREATE INDEX content_domain_idx ON content(domain);"""
+            """CREATE INDEX IF NOT EXISTS content_domain_idx ON content(domain);"""
 
         )
         cur.execute(
-            """
-        -- Triggers to keep the FTS index up to date.
-        CREATE TRIGGER content_ai AFTER INSERT ON content BEGIN
-          INSERT INTO search_ix(rowid, url, text, domain) VALUES (new.id, new.url, new.text, new.domain);
-        END;
-        """
+            "CREATE INDEX IF NOT EXISTS content_updated_idx ON content(updated_at);"
         )
+        # Triggers to keep the FTS index up to date.
+        cur.execute(_TRIGGER_AI)
         cur.execute("""
-        CREATE TRIGGER content_ad AFTER DELETE ON content BEGIN
+        CREATE TRIGGER IF NOT EXISTS content_ad AFTER DELETE ON content BEGIN
           INSERT INTO search_ix(search_ix, rowid, url, text, domain) VALUES('delete', old.id, old.url, old.text, old.domain);
         END;
         """)
+        cur.execute(_TRIGGER_AU)
+        if self.trigram:
+            self._create_trigram_table(cur)
+        cur.close()
+
+    def _create_trigram_table(self, cur):
+        exists = cur.execute(
+            "select 1 from sqlite_master where name = 'search_tri';"
+        ).fetchone()
+        cur.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS search_tri using fts5(text, tokenize="trigram", content=content, content_rowid=id);'
+        )
+        cur.execute(_TRIGGER_TRI_AI)
         cur.execute("""
-        CREATE TRIGGER content_au AFTER UPDATE ON content BEGIN
-          INSERT INTO search_ix(search_ix, rowid, url, text, domain) VALUES('delete', old.id, old.url, old.text, old.domain);
-          INSERT INTO saerch_ix(rowid, url, text, domain) VALUES (new.id, new.url, new.text, new.domain);
+        CREATE TRIGGER IF NOT EXISTS content_tri_ad AFTER DELETE ON content BEGIN
+          INSERT INTO search_tri(search_tri, rowid, text) VALUES('delete', old.id, old.text);
         END;
-        """
+        """)
+        cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS content_tri_au AFTER UPDATE OF text ON content
+        WHEN old.text_hash IS NOT new.text_hash BEGIN
+          INSERT INTO search_tri(search_tri, rowid, text) VALUES('delete', old.id, old.text);
+          INSERT INTO search_tri(rowid, text) VALUES (new.id, new.text);
+        END;
+        """)
+        if not exists:
+            # links indexed before the table was added
+            cur.execute("INSERT INTO search_tri(search_tri) VALUES('rebuild');")
+            self.conn.commit()
+
+    def _add_missing_columns(self, cur):
+        """Indexes created by previous versions don't have the url columns"""
+        current = {r[1] for r in cur.execute("PRAGMA table_info(content);")}
+        for name, type_ in _URL_COLUMNS + _REFRESH_COLUMNS:
+            if name not in current:
+                cur.execute(f"ALTER TABLE content ADD COLUMN {name} {type_};")
+        if "updated_at" not in current:
+            # the ttl of old links starts now
+            cur.execute("UPDATE content SET updated_at = ?;", (time.time(),))
+            self.conn.commit()
+
+    def _tune(self):
+        for pragma in _PRAGMAS:
+            self.conn.execute(pragma)
+
+    def _row(self, link: SearchLink, now: float):
+        u = link.url
+        text = self.norm(link.text)
+        return (
+            u.fullurl,
+            text,
+            u.domain_base,
+            u.url_short,
+            u.norm,
+            u.www,
+            u.secure,
+            u.netloc,
+            u.path,
+            u.tld,
+            u.is_social,
+            text_hash(text),
+            now,
         )
-        cur.close()
-    def build(self, links: List[SearchLink]):
-        self._create_tables()
+
+    def bulk_load(self, links: Iterable[SearchLink], defer_fts=True) -> int:
+        """
+        Load many links in a single transaction. `links` is consumed
+        lazily, so it could be a generator. Links whose url is already
+        in the index are ignored.
+
+        :param links: links to add.
+        :param defer_fts: if True, the full text index isn't updated
+            on each insert but rebuilt once at the end.
+        :return: number of links added.
+        """
+        with self._lock:
+            return self._bulk_load(links, defer_fts)
+
+    def _bulk_load(self, links: Iterable[SearchLink], defer_fts: bool) -> int:
+        self._tune()
         cur = self.conn.cursor()
-        for link in links:
-            text = self.norm(link.text)
-            cur.execute(
-            "insert into content (url, text, domain) values (?, ?, ?);",
-            (
-                link.url.fullurl,
-                text,
-                link.url.domain_base
-            ),
-        )
+        with self.conn:
+            cur.execute("BEGIN;")
+            # the table exists if any instance on the file was created with
+            # trigram=True, not only this one
+            trigram = defer_fts and cur.execute(
+                "select 1 from sqlite_master where name = 'search_tri';"
+            ).fetchone()
+            if defer_fts:
+                cur.execute("DROP TRIGGER IF EXISTS content_ai;")
+                cur.execute("DROP TRIGGER IF EXISTS content_tri_ai;")
+            now = time.time()
+            cur.executemany(
+                _INSERT.format(conflict="or ignore", upsert=""),
+                (self._row(link, now) for link in links),
+            )
+            total = cur.rowcount
+            if defer_fts:
+                cur.execute("INSERT INTO search_ix(search_ix) VALUES('rebuild');")
+                cur.execute(_TRIGGER_AI)
+                if trigram:
+                    cur.execute(
+                        "INSERT INTO search_tri(search_tri) VALUES('rebuild');"
+                    )
+                    cur.execute(_TRIGGER_TRI_AI)
         cur.close()
+        self._cache_clear()
+        return total
+
+    def build(self, links: Iterable[SearchLink]):
+        self.bulk_load(links)
+
     def add(self, link: SearchLink):
+        """
+        Add a link, it fails with :class:`sqlite3.IntegrityError` if the url
+        is already in the index, use :meth:`upsert` to replace it.
+        """
+        with self._lock, self.conn:
+            self.conn.execute(
+                _INSERT.format(conflict="", upsert=""), self._row(link, time.time())
+            )
+        self._cache_clear()
 
-        text = self.norm(link.text)
-        cur = self.conn.cursor()
-        cur.execute(
-            "insert into content (url, text, domain) values (?, ?, ?);",
-            (
-                link.url.fullurl,
-                text,
-                link.url.domain_base
-            ),
+    def upsert_many(
+        self, links: Iterable[SearchLink], now: Optional[float] = None
+    ) -> int:
+        """
+        Add links or refresh those already in the index, in a single
+        transaction. The full text index is only updated for links whose
+        text changed, but `updated_at` is always renewed, see :meth:`expire`.
+
+        :param now: unix timestamp recorded as `updated_at`.
+        :return: number of links added or refreshed.
+        """
+        now = now or time.time()
+        with self._lock, self.conn:
+            cur = self.conn.cursor()
+            cur.executemany(
+                _INSERT.format(conflict="", upsert=_UPSERT),
+                (self._row(link, now) for link in links),
+            )
+            total = cur.rowcount
+            cur.close()
+        self._cache_clear()
+        return total
+
+    def upsert(self, link: SearchLink, now: Optional[float] = None):
+        self.upsert_many([link], now=now)
+
+    def delete_domain(self, domain: str) -> int:
+        """
+        Remove every link of a domain, as in :attr:`datahtml.types.URL.domain_base`.
+
+        :return: number of links removed.
+        """
+        with self._lock, self.conn:
+            cur = self.conn.execute("delete from content where domain = ?;", (domain,))
+        self._cache_clear()
+        return cur.rowcount
+
+    def expire(
+        self, older_than: Optional[float] = None, ttl: Optional[float] = None
+    ) -> int:
+        """
+        Remove links not added or refreshed since the `older_than`
+        timestamp, or in the last `ttl` seconds.
+
+        :return: number of links removed.
+        """
+        if older_than is None:
+            if ttl is None:
+                raise ValueError("older_than or ttl are required")
+            older_than = time.time() - ttl
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "delete from content where updated_at < ?;", (older_than,)
+            )
+        self._cache_clear()
+        return cur.rowcount
+
+    @staticmethod
+    def _match_query(search: str, mode="exact") -> str:
+        # each word is quoted, so words like OR, NOT or NEAR aren't operators
+        if mode == "prefix":
+            return " ".join(f'"{w}"*' for w in search.split())
+        return " ".join(f'"{w}"' for w in search.split())
+
+    @staticmethod
+    def _row2link(row) -> SearchLink:
+        if row[3] is None:
+            # added by a previous version without the url columns
+            return SearchLink(text=row[1], url=parse_url(row[0]))
+        _u = URL(
+            fullurl=row[0],
+            url_short=row[3],
+            norm=row[4],
+            www=bool(row[5]),
+            secure=bool(row[6]),
+            domain_base=row[2],
+            netloc=row[7],
+            path=row[8],
+            tld=row[9],
+            is_social=bool(row[10]),
         )
-        cur.close()
+        return SearchLink(text=row[1], url=_u)
 
-    def search(self, text, domain=None, top_n=5):
-        search = self.norm(text)
-        cur = self.conn.cursor()
+    def _fetch(
+        self, cur, table: str, match: str, domain: Optional[str], limit: int
+    ) -> List[Tuple[float, SearchLink]]:
+        column = "search_ix.text" if table == "search_ix" else table
         if domain:
-            rows = cur.execute(
-                f"""select * from search_ix where text MATCH '{search}' and domain='{domain}'
-                                    order by rank limit {top_n}"""
-            ).fetchall()
+            sql = _SEARCH.format(table=table, column=column, domain="and c.domain = ?")
+            rows = cur.execute(sql, (match, domain, limit)).fetchall()
+        else:
+            sql = _SEARCH.format(table=table, column=column, domain="")
+            rows = cur.execute(sql, (match, limit)).fetchall()
+        return [(r[-1], self._row2link(r)) for r in rows]
+
+    def _query(
+        self, cur, search: str, domain: Optional[str], top_n: int, mode="exact"
+    ) -> List[Tuple[float, SearchLink]]:
+        if mode == "fuzzy":
+            return self._query_fuzzy(cur, search, domain, top_n)
+        match = self._match_query(search, mode)
+        if not match:
+            return []
+        return self._fetch(cur, "search_ix", match, domain, top_n)
+
+    def _query_fuzzy(
+        self, cur, search: str, domain: Optional[str], top_n: int
+    ) -> List[Tuple[float, SearchLink]]:
+        """
+        Exact matches are combined with the rows sharing more trigrams
+        with the query. Candidates are scored by the jaccard similarity of
+        their trigrams, plus one if they also match exactly.
+        """
+        grams = trigrams(search)
+        exact = self._query(cur, search, domain, top_n)
+        candidates = {l.url.fullurl: l for _, l in exact}
+        # some trigram of each word must match
+        words = [trigrams(w) for w in search.split()]
+        words = [w for w in words if w]
+        if words:
+            match = " AND ".join(
+                "({})".format(" OR ".join(f'"{g}"' for g in sorted(w))) for w in words
+            )
+            for _, l in self._fetch(
+                cur, "search_tri", match, domain, self.fuzzy_candidates
+            ):
+                candidates.setdefault(l.url.fullurl, l)
+
+        exact_urls = {l.url.fullurl for _, l in exact}
+        scored = []
+        for url, l in candidates.items():
+            doc_grams = trigrams(l.text)
+            union = len(grams | doc_grams)
+            score = len(grams & doc_grams) / union if union else 0.0
+            if url in exact_urls:
+                score += 1.0
+            scored.append((-score, l))
+        scored.sort(key=lambda r: r[0])
+        return scored[:top_n]
+
+    def _cache_get(self, key) -> Optional[List[Tuple[float, SearchLink]]]:
+        with self._cache_lock:
+            links = self._cache.get(key)
+            if links is not None:
+                self._cache.move_to_end(key)
+                return list(links)
+        return None
+
+    def _cache_put(self, key, links: List[Tuple[float, SearchLink]], generation: int):
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            if generation != self._generation:
+                # a write cleared the cache while these links were read
+                return
+            self._cache[key] = links
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_clear(self):
+        with self._cache_lock:
+            self._cache.clear()
+            self._generation += 1
 
+    def _cache_check(self) -> int:
+        """
+        Clear the cache when another connection, maybe of another
+        process, committed since the last search.
+
+        :return: the generation of the cache, to be passed to
+            :meth:`_cache_put`.
+        """
+        if self.cache_size <= 0:
+            return self._generation
+        with self._lock:
+            version = self.conn.execute("PRAGMA data_version;").fetchone()[0]
+        if version != self._data_version:
+            self._cache_clear()
+            self._data_version = version
+        return self._generation
+
+    def _open_reader(self) -> sqlite3.Connection:
+        if self._uri.startswith("file:"):
+            path, _, query = self._uri.partition("?")
         else:
-            rows = cur.execute(
-                f"""select * from search_ix where text MATCH '{search}'
-                                    order by rank limit {top_n}"""
-            ).fetchall()
-        cur.close()
-        urls = []
-        for r in rows:
-            # print(r[1])
-            _u = parse_url(r[1])
-            link = SearchLink(text=r[2], url=_u)
-            urls.append(link)
-
-        return urls
+            path, query = Path(self._uri).absolute().as_uri(), ""
+        params = dict(parse_qsl(query))
+        params["mode"] = "ro"
+        if self.shared_cache:
+            params["cache"] = "shared"
+        uri = f"{path}?{urlencode(params)}"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)};")
+        conn.execute("PRAGMA query_only=1;")
+        return conn
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        A connection for reading, from the pool of readers if any,
+        otherwise the main connection.
+        """
+        if not self.readers:
+            with self._lock:
+                yield self.conn
+            return
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if len(self._pool_conns) < self.readers:
+                    conn = self._open_reader()
+                    self._pool_conns.append(conn)
+                else:
+                    conn = None
+            if conn is None:
+                conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def search_many_ranked(
+        self, queries: Iterable[str], domain=None, top_n=5, mode="exact"
+    ) -> List[List[Tuple[float, SearchLink]]]:
+        """
+        Like :meth:`search_many` but each link comes with its rank,
+        lower is better. It's the bm25 rank of sqlite, or the negative
+        similarity for "fuzzy" searches.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown search mode {mode}")
+        if mode == "fuzzy" and not self.trigram:
+            raise ValueError("fuzzy searches need an index built with trigram=True")
+        keys = [(self.norm(text), domain, top_n, mode) for text in queries]
+        generation = self._cache_check()
+        results: List[Optional[List[Tuple[float, SearchLink]]]] = [
+            self._cache_get(k) for k in keys
+        ]
+        if all(r is not None for r in results):
+            return results  # type: ignore
+
+        with self._reader() as conn:
+            cur = conn.cursor()
+            own_tx = not conn.in_transaction
+            if own_tx:
+                cur.execute("BEGIN;")
+            try:
+                for ix, key in enumerate(keys):
+                    if results[ix] is None:
+                        rows = self._query(cur, key[0], domain, top_n, mode)
+                        self._cache_put(key, rows, generation)
+                        results[ix] = list(rows)
+            finally:
+                if own_tx:
+                    cur.execute("COMMIT;")
+                cur.close()
+        return results  # type: ignore
+
+    def search_many(
+        self, queries: Iterable[str], domain=None, top_n=5, mode="exact"
+    ) -> List[List[SearchLink]]:
+        """
+        Run many queries using the same cursor and read transaction.
+
+        :param queries: texts to search, they are normalized with `norm_func`.
+        :param domain: if given, only links of that domain are returned.
+        :param top_n: max number of links by query.
+        :param mode: "exact" matches every word, "prefix" matches words
+            starting with the words of the query and "fuzzy" also
+            returns texts with similar trigrams (it needs `trigram=True`).
+        :return: a list of results for each query, in the same order.
+        """
+        results = self.search_many_ranked(
+            queries, domain=domain, top_n=top_n, mode=mode
+        )
+        return [[l for _, l in rows] for rows in results]
+
+    def search(self, text, domain=None, top_n=5, mode="exact") -> List[SearchLink]:
+        return self.search_many([text], domain=domain, top_n=top_n, mode=mode)[0]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(self.readers, 1)
+                )
+            return self._executor
+
+    async def asearch_many(
+        self, queries: Iterable[str], domain=None, top_n=5, mode="exact"
+    ) -> List[List[SearchLink]]:
+        """
+        Like :meth:`search_many` but it runs in a thread,
+        so it doesn't block the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(),
+            partial(
+                self.search_many, list(queries), domain=domain, top_n=top_n, mode=mode
+            ),
+        )
+
+    async def asearch(
+        self, text, domain=None, top_n=5, mode="exact"
+    ) -> List[SearchLink]:
+        results = await self.asearch_many(
+            [text], domain=domain, top_n=top_n, mode=mode
+        )
+        return results[0]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for conn in self._pool_conns:
+            conn.close()
+        self._pool_conns = []
+        self._pool = queue.Queue()
+        self.conn.close()
@@ -0,0 +1,266 @@
+"""
+In memory alternative to :class:`datahtml.url_index.URLIndex` built on NumPy,
+for short-lived jobs where creating a sqlite FTS table is too heavy.
+
+Postings are kept in CSR arrays (one row per term) with the bm25 (or tf-idf)
+weight of each term in each document precomputed, so a batch of queries
+is scored as a single sparse product of the queries by the postings.
+
+bm25 uses the idf of sqlite's fts5, ties are broken by the order the links
+were added. Ranks still differ a bit from those of the sqlite index: its fts5
+table indexes the domain too, whose tokens count in the length of each
+document, and repeated words of a query are counted once here.
+
+It requires numpy, install it with `pip install datahtml[index]`.
+
+.. code-block:: python
+
+    ix = NumpyURLIndex()
+    ix.build(links)
+    ix.search_many(["dolar hoy", "elecciones"], top_n=3)
+
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from datahtml.url_index import SearchLink, norm_words
+
+
+def _top_n(
+    rows: np.ndarray, docs: np.ndarray, scores: np.ndarray, top_n: int
+) -> np.ndarray:
+    """
+    Indices of the `top_n` best scores of each row, sorted by row, by
+    score descending and then by document, so ties are always broken
+    the same way.
+    """
+    if top_n <= 0 or not len(scores):
+        return np.zeros(0, dtype=np.int64)
+    if len(scores) > top_n and rows[0] == rows[-1]:
+        # a single query, only the scores up to the top_n-th are sorted
+        kth = np.partition(-scores, top_n - 1)[top_n - 1]
+        candidates = np.flatnonzero(-scores <= kth)
+    else:
+        candidates = np.arange(len(scores))
+    order = candidates[
+        np.lexsort((docs[candidates], -scores[candidates], rows[candidates]))
+    ]
+    sorted_rows = rows[order]
+    group_start = np.searchsorted(sorted_rows, sorted_rows, side="left")
+    return order[np.arange(len(order)) - group_start < top_n]
+
+class NumpyURLIndex:
+    """
+    :param norm_func: function used to normalize texts and queries.
+    :param scoring: "bm25" or "tfidf".
+    :param k1: bm25 term frequency saturation.
+    :param b: bm25 length normalization.
+    :param require_all: only documents with every word of the query
+        are returned, like the sqlite index does.
+    :param batch_size: queries scored together by :meth:`search_many`.
+    """
+
+    def __init__(
+        self,
+        norm_func: Callable = norm_words,
+        scoring="bm25",
+        k1=1.2,
+        b=0.75,
+        require_all=True,
+        batch_size=1024,
+    ):
+        if scoring not in ("bm25", "tfidf"):
+            raise ValueError(f"Unknown scoring {scoring}")
+        self.norm: Callable = norm_func
+        self.scoring = scoring
+        self.k1 = k1
+        self.b = b
+        self.require_all = require_all
+        self.batch_size = batch_size
+        self.vocab: Dict[str, int] = {}
+        self.domains: Dict[str, int] = {}
+        self.links: List[SearchLink] = []
+        self._urls: Set[str] = set()
+        # token occurrences (term, doc) of every document, grouped by batch
+        self._terms: List[np.ndarray] = []
+        self._docs: List[np.ndarray] = []
+        self._doc_domain: List[int] = []
+        self._dirty = False
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.doc_domain = np.zeros(0, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.links)
+
+    def _tokens(self, text: str) -> List[str]:
+        # sqlite's ascii tokenizer is case insensitive
+        return self.norm(text).lower().split()
+
+    def bulk_load(self, links: Iterable[SearchLink]) -> int:
+        """
+        Add many links, those whose url is already in the index are ignored.
+
+        :return: number of links added.
+        """
+        terms: List[int] = []
+        docs: List[int] = []
+        added = 0
+        for link in links:
+            if link.url.fullurl in self._urls:
+                continue
+            self._urls.add(link.url.fullurl)
+            doc = len(self.links)
+            text = self.norm(link.text)
+            self.links.append(SearchLink(text=text, url=link.url))
+            self._doc_domain.append(
+                self.domains.setdefault(link.url.domain_base, len(self.domains))
+            )
+            for token in text.lower().split():
+                terms.append(self.vocab.setdefault(token, len(self.vocab)))
+                docs.append(doc)
+            added += 1
+        if added:
+            self._terms.append(np.asarray(terms, dtype=np.int64))
+            self._docs.append(np.asarray(docs, dtype=np.int64))
+            self._dirty = True
+        return added
+
+    def build(self, links: Iterable[SearchLink]):
+        self.bulk_load(links)
+        self._compile()
+
+    def add(self, link: SearchLink):
+        """Postings are recomputed on the next search"""
+        self.bulk_load([link])
+
+    def _compile(self):
+        if not self._dirty:
+            return
+        n_docs = len(self.links)
+        n_terms = len(self.vocab)
+        terms = np.concatenate(self._terms)
+        docs = np.concatenate(self._docs)
+
+        # term frequencies, sorted by term and then by document
+        pairs, tf = np.unique(terms * n_docs + docs, return_counts=True)
+        p_terms = pairs // n_docs
+        p_docs = pairs % n_docs
+        df = np.bincount(p_terms, minlength=n_terms)
+        doc_len = np.bincount(docs, minlength=n_docs).astype(np.float64)
+
+        if self.scoring == "bm25":
+            # as fts5, the idf of words in more than half the documents is ~0
+            idf = np.maximum(np.log((n_docs - df + 0.5) / (df + 0.5)), 1e-6)
+            norm = self.k1 * (1 - self.b + self.b * doc_len / doc_len.mean())
+            weights = idf[p_terms] * tf * (self.k1 + 1) / (tf + norm[p_docs])
+        else:
+            idf = np.log(n_docs / df)
+            weights = idf[p_terms] * (1 + np.log(tf))
+
+        self.indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(df, out=self.indptr[1:])
+        self.doc_ids = p_docs.astype(np.int32)
+        self.weights = weights.astype(np.float32)
+        self.doc_domain = np.asarray(self._doc_domain, dtype=np.int32)
+        self._terms = [terms]
+        self._docs = [docs]
+        self._dirty = False
+
+    def _query_terms(
+        self, queries: List[str]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Term ids of each query, as (query, term) pairs, and how many
+        distinct words each query has.
+        """
+        q_ids: List[int] = []
+        t_ids: List[int] = []
+        required = np.zeros(len(queries), dtype=np.int64)
+        for qx, text in enumerate(queries):
+            words = set(self._tokens(text))
+            known = [self.vocab[w] for w in words if w in self.vocab]
+            q_ids.extend([qx] * len(known))
+            t_ids.extend(known)
+            required[qx] = len(words)
+        return (
+            np.asarray(q_ids, dtype=np.int64),
+            np.asarray(t_ids, dtype=np.int64),
+            required,
+        )
+
+    def _score_batch(
+        self, queries: List[str], domain: Optional[str], top_n: int
+    ) -> List[List[Tuple[float, SearchLink]]]:
+        n_docs = len(self.links)
+        results: List[List[Tuple[float, SearchLink]]] = [[] for _ in queries]
+        q_ids, t_ids, required = self._query_terms(queries)
+        if not len(t_ids):
+            return results
+
+        # gather the postings of every (query, term) pair
+        starts = self.indptr[t_ids]
+        lens = self.indptr[t_ids + 1] - starts
+        total = int(lens.sum())
+        offsets = np.repeat(starts - (np.cumsum(lens) - lens), lens)
+        idx = np.arange(total, dtype=np.int64) + offsets
+        rows = np.repeat(q_ids, lens)
+        docs = self.doc_ids[idx]
+        weights = self.weights[idx]
+
+        if domain is not None:
+            dom = self.domains.get(domain)
+            if dom is None:
+                return results
+            keep = self.doc_domain[docs] == dom
+            rows, docs, weights = rows[keep], docs[keep], weights[keep]
+
+        # sparse product: accumulate the weights by (query, document)
+        keys, inverse = np.unique(rows * n_docs + docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        if self.require_all:
+            hits = np.bincount(inverse)
+            keep = hits == required[keys // n_docs]
+            keys, scores = keys[keep], scores[keep]
+
+        k_rows = keys // n_docs
+        k_docs = keys % n_docs
+        for ix in _top_n(k_rows, k_docs, scores, top_n):
+            results[k_rows[ix]].append((-float(scores[ix]), self.links[k_docs[ix]]))
+        return results
+
+    def search_many_ranked(
+        self, queries: Iterable[str], domain=None, top_n=5
+    ) -> List[List[Tuple[float, SearchLink]]]:
+        """
+        Like :meth:`search_many` but each link comes with its rank,
+        the negative score, so lower is better as in sqlite's fts5.
+        """
+        self._compile()
+        queries = list(queries)
+        results: List[List[Tuple[float, SearchLink]]] = []
+        if not self.links:
+            return [[] for _ in queries]
+        for ix in range(0, len(queries), self.batch_size):
+            batch = queries[ix : ix + self.batch_size]
+            results.extend(self._score_batch(batch, domain, top_n))
+        return results
+
+    def search_many(
+        self, queries: Iterable[str], domain=None, top_n=5
+    ) -> List[List[SearchLink]]:
+        """
+        Score many queries at once.
+
+        :param queries: texts to search, they are normalized with `norm_func`.
+        :param domain: if given, only links of that domain are returned.
+        :param top_n: max number of links by query.
+        :return: a list of results for each query, in the same order.
+        """
+        results = self.search_many_ranked(queries, domain=domain, top_n=top_n)
+        return [[l for _, l in rows] for rows in results]
+
+    def search(self, text, domain=None, top_n=5) -> List[SearchLink]:
+        return self.search_many([text], domain=domain, top_n=top_n)[0]
@@ -0,0 +1,214 @@
+"""
+A :class:`datahtml.url_index.URLIndex` split in many sqlite files.
+
+Links are routed to a shard by a hash of :attr:`datahtml.types.URL.domain_base`,
+so searches filtered by domain only touch one file, and global searches
+are run in parallel over every shard, merging the top results by rank.
+Each shard is a regular :class:`URLIndex` file that could be rebuilt or
+copied on its own.
+
+.. code-block:: python
+
+    ix = ShardedURLIndex("/data/index", shards=16)
+    ix.bulk_load(links)
+    ix.search("dolar hoy", domain="lanacion.com.ar")
+
+"""
+import heapq
+import os
+import queue
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from datahtml.url_index import SearchLink, URLIndex, norm_words
+
+_DONE = object()
+
+
+def shard_for(domain: str, shards: int) -> int:
+    """Stable shard number for a domain"""
+    return zlib.crc32(domain.encode("utf-8")) % shards
+
+
+class ShardedURLIndex:
+    """
+    :param path: directory where the shards are stored,
+        it's created if doesn't exist.
+    :param shards: number of shards. Changing it for an existing index
+        requires a full rebuild because domains are routed by it.
+    :param workers: threads used for global searches, one per shard by default.
+    :param index_kwargs: extra params for each :class:`URLIndex`
+        like `readers` or `cache_size`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        shards=8,
+        norm_func: Callable = norm_words,
+        workers: Optional[int] = None,
+        **index_kwargs: Any,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.norm = norm_func
+        self._index_kwargs = dict(index_kwargs, norm_func=norm_func)
+        self.shards: List[URLIndex] = [
+            URLIndex(str(self.shard_path(i)), **self._index_kwargs)
+            for i in range(shards)
+        ]
+        self._executor = ThreadPoolExecutor(max_workers=workers or shards)
+
+    def shard_path(self, number: int) -> Path:
+        return self.path / f"shard_{number:03d}.db"
+
+    def shard_number(self, domain: str) -> int:
+        return shard_for(domain, len(self.shards))
+
+    def shard_of(self, domain: str) -> URLIndex:
+        return self.shards[self.shard_number(domain)]
+
+    def add(self, link: SearchLink):
+        self.shard_of(link.url.domain_base).add(link)
+
+    def upsert_many(
+        self, links: Iterable[SearchLink], now: Optional[float] = None
+    ) -> int:
+        """See :meth:`URLIndex.upsert_many`, links are grouped by shard"""
+        by_shard: Dict[int, List[SearchLink]] = {}
+        for link in links:
+            by_shard.setdefault(self.shard_number(link.url.domain_base), []).append(
+                link
+            )
+        return sum(
+            self.shards[number].upsert_many(group, now=now)
+            for number, group in by_shard.items()
+        )
+
+    def upsert(self, link: SearchLink, now: Optional[float] = None):
+        self.shard_of(link.url.domain_base).upsert(link, now=now)
+
+    def delete_domain(self, domain: str) -> int:
+        return self.shard_of(domain).delete_domain(domain)
+
+    def expire(
+        self, older_than: Optional[float] = None, ttl: Optional[float] = None
+    ) -> int:
+        return sum(
+            shard.expire(older_than=older_than, ttl=ttl) for shard in self.shards
+        )
+
+    def bulk_load(self, links: Iterable[SearchLink], defer_fts=True) -> int:
+        """
+        Route `links` to their shards. Each shard is loaded by its own
+        thread with :meth:`URLIndex.bulk_load`, fed through a bounded queue,
+        so `links` is consumed lazily.
+
+        :return: number of links added.
+        """
+        queues: List[queue.Queue] = [
+            queue.Queue(maxsize=10_000) for _ in self.shards
+        ]
+        totals: Dict[int, int] = {}
+        failures: List[BaseException] = []
+
+        def _feed(q: queue.Queue):
+            while True:
+                item = q.get()
+                if item is _DONE:
+                    return
+                yield item
+
+        def _load(number: int):
+            try:
+                totals[number] = self.shards[number].bulk_load(
+                    _feed(queues[number]), defer_fts=defer_fts
+                )
+            except BaseException as e:
+                failures.append(e)
+                # keep draining, so the producer never blocks
+                for _ in _feed(queues[number]):
+                    pass
+
+        threads = [
+            threading.Thread(target=_load, args=(i,), daemon=True)
+            for i in range(len(self.shards))
+        ]
+        for t in threads:
+            t.start()
+        try:
+            for link in links:
+                queues[self.shard_number(link.url.domain_base)].put(link)
+        finally:
+            for q in queues:
+                q.put(_DONE)
+            for t in threads:
+                t.join()
+        if failures:
+            raise failures[0]
+        return sum(totals.values())
+
+    def build(self, links: Iterable[SearchLink]):
+        self.bulk_load(links)
+
+    def rebuild_shard(self, number: int, links: Iterable[SearchLink]) -> int:
+        """
+        Replace a shard with a new one built from `links`.
+        Links which don't belong to the shard are ignored.
+        """
+        self.shards[number].close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(f"{self.shard_path(number)}{suffix}")
+            except FileNotFoundError:
+                pass
+        shard = URLIndex(str(self.shard_path(number)), **self._index_kwargs)
+        self.shards[number] = shard
+        return shard.bulk_load(
+            l for l in links if self.shard_number(l.url.domain_base) == number
+        )
+
+    def search_many_ranked(
+        self, queries: Iterable[str], domain=None, top_n=5, mode="exact"
+    ) -> List[List[Tuple[float, SearchLink]]]:
+        queries = list(queries)
+        if domain:
+            return self.shard_of(domain).search_many_ranked(
+                queries, domain=domain, top_n=top_n, mode=mode
+            )
+        by_shard = list(
+            self._executor.map(
+                lambda shard: shard.search_many_ranked(
+                    queries, top_n=top_n, mode=mode
+                ),
+                self.shards,
+            )
+        )
+        results = []
+        for ix in range(len(queries)):
+            candidates = [r for shard_rows in by_shard for r in shard_rows[ix]]
+            results.append(heapq.nsmallest(top_n, candidates, key=lambda r: r[0]))
+        return results
+
+    def search_many(
+        self, queries: Iterable[str], domain=None, top_n=5, mode="exact"
+    ) -> List[List[SearchLink]]:
+        """
+        Searches with a domain go to the shard of that domain, otherwise
+        every shard is searched in parallel and the best `top_n` are kept.
+        """
+        results = self.search_many_ranked(
+            queries, domain=domain, top_n=top_n, mode=mode
+        )
+        return [[l for _, l in rows] for rows in results]
+
+    def search(self, text, domain=None, top_n=5, mode="exact") -> List[SearchLink]:
+        return self.search_many([text], domain=domain, top_n=top_n, mode=mode)[0]
+
+    def close(self):
+        self._executor.shutdown()
+        for shard in self.shards:
+            shard.close()
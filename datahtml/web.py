@@ -1,8 +1,13 @@
-from typing import Any, Dict, List, Union
+import time
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from datahtml import defaults, errors, news, parsers, rss, sitemap, types
-from datahtml._utils import difference_from_now
-from datahtml.base import CrawlerSpec
+from datahtml._utils import difference_from_now, gather_limited, map_concurrent
+from datahtml.base import CrawlerSpec, CrawlResponse
+
+#: feeds found by domain, used by :func:`find_rss_links`
+_FEEDS_CACHE: Dict[str, Tuple[float, List[str]]] = {}
 
 
 class WebDocument:
@@ -141,6 +146,24 @@ def download(
     return w
 
 
+async def adownload(
+    url: str,
+    *,
+    crawler: CrawlerSpec,
+    is_root=True,
+    raise_when_not_200=True,
+) -> WebDocument:
+    """
+    Async version of :func:`download`
+    """
+    rsp = await crawler.aget(url)
+    if raise_when_not_200 and rsp.status_code != 200:
+        raise errors.CrawlingError(url=url, status=rsp.status_code)
+
+    w = WebDocument(url=url, html_txt=rsp.text, is_root=is_root)
+    return w
+
+
 def build_sitemap(
     url: str, *, crawler: CrawlerSpec, filter_dt: int = 1
 ) -> List[sitemap.SitemapLink]:
@@ -191,58 +214,212 @@ def build_sitemap(
     return total_sites
 
 
+async def _adownload_sitemap(
+    url: str, *, crawler: CrawlerSpec
+) -> Optional[WebDocument]:
+    try:
+        return await adownload(url, crawler=crawler)
+    except errors.CrawlingError:
+        return None
+
+
+async def abuild_sitemap(
+    url: str, *, crawler: CrawlerSpec, filter_dt: int = 1, concurrency: int = 8
+) -> List[sitemap.SitemapLink]:
+    """
+    Async version of :func:`build_sitemap`, sitemaps found in the robots.txt
+    and the sitemaps listed by them are fetched concurrently.
+
+    :param concurrency: max number of requests at the same time.
+    """
+    rsp_txt = await crawler.aget(f"{url.strip('/')}/robots.txt")
+    sitesmaps = sitemap.get_sitemaps_from_robots(rsp_txt.text)
+    docs = await gather_limited(
+        [_adownload_sitemap(s, crawler=crawler) for s in sitesmaps],
+        limit=concurrency,
+    )
+
+    total_sites: List[sitemap.SitemapLink] = []
+    nested: List[str] = []
+    for w in docs:
+        if w is None:
+            continue
+        urls = w.soup.find_all("url")
+        if urls:
+            total_sites.extend(sitemap.parse_sitemap_links(urls))
+        else:
+            nested.extend(sitemap.sitemap_sitemaps(w.soup, filter_dt=filter_dt))
+
+    nested_docs = await gather_limited(
+        [_adownload_sitemap(s, crawler=crawler) for s in nested],
+        limit=concurrency,
+    )
+    for w in nested_docs:
+        if w is not None and w.soup:
+            _urls = w.soup.find_all("url")
+            total_sites.extend(sitemap.parse_sitemap_links(_urls))
+    return total_sites
+
+
+class _FeedDiscovery:
+    """
+    Steps of the rss discovery, it tells which urls should be probed next
+    and collects the feeds from the responses. Fetching is left
+    to the callers, so the same steps are used by the sync
+    and the async versions.
+
+    1. feeds known for the domain, from the cache
+    2. feeds announced with `rel="alternate"`
+    3. if nothing was found, links of the page related to rss
+    4. links related to rss found in the html pages of the step 3
+
+    Each step runs only while no feed was found.
+    """
+
+    def __init__(self, w: WebDocument, known: Optional[List[str]] = None):
+        self._w = w
+        self._known = known or []
+        self._step = 0
+        self._parsed: set = set()
+        self._next_level: List[str] = []
+        self.feeds: Dict[str, rss.RSSLink] = {}
+
+    def _step_urls(self) -> List[str]:
+        if self.feeds:
+            return []
+        if self._step == 0:
+            return self._known
+        if self._step == 1:
+            return rss.find_alternate_links(self._w.soup, self._w.url.fullurl)
+        if self._step == 2:
+            return list(rss.find_rss_realated_links(self._w.links()))
+        if self._step == 3:
+            return self._next_level
+        return []
+
+    def next_urls(self) -> List[str]:
+        while self._step < 4:
+            urls = [
+                u for u in dict.fromkeys(self._step_urls()) if u not in self._parsed
+            ]
+            self._step += 1
+            if urls:
+                self._parsed.update(urls)
+                return urls
+        return []
+
+    def add(self, responses: Dict[str, Optional[CrawlResponse]]):
+        for url, rsp in responses.items():
+            if rsp is None or rsp.status_code != 200:
+                continue
+            if rss.sniff_feed(rsp.content):
+                self.feeds.setdefault(
+                    url, rss.RSSLink(url=url, xmlcontent=rsp.text)
+                )
+            elif self._step == 3:
+                self._next_level.extend(rss.find_rss_related_hrefs(rsp.text, url))
+
+
+def _cached_feeds(domain: str, ttl: Optional[int]) -> Optional[List[str]]:
+    if not ttl:
+        return None
+    cached = _FEEDS_CACHE.get(domain)
+    if cached and time.time() - cached[0] < ttl:
+        return cached[1]
+    return None
+
+
+def _get_or_none(url: str, *, crawler: CrawlerSpec) -> Optional[CrawlResponse]:
+    try:
+        return crawler.get(url)
+    except errors.CrawlHTTPError:
+        return None
+
+
+async def _aget_or_none(url: str, *, crawler: CrawlerSpec) -> Optional[CrawlResponse]:
+    try:
+        return await crawler.aget(url)
+    except errors.CrawlHTTPError:
+        return None
+
+
+def _cache_feeds(domain: str, discovery: _FeedDiscovery, ttl: Optional[int]):
+    # a domain without feeds is tried again next time
+    if ttl and discovery.feeds:
+        _FEEDS_CACHE[domain] = (time.time(), list(discovery.feeds.keys()))
+
+
+def clear_feeds_cache():
+    """Forget the feeds found by :func:`find_rss_links`"""
+    _FEEDS_CACHE.clear()
+
+
 def find_rss_links(
-    url: str, *, crawler: CrawlerSpec, web: WebDocument = None
+    url: str,
+    *,
+    crawler: CrawlerSpec,
+    web: WebDocument = None,
+    concurrency: int = 8,
+    cache_ttl: Optional[int] = 24 * 60 * 60,
 ) -> List[rss.RSSLink]:
     """
     It will scrap the url, looking for links related to rss feeds.
     If it found rss links, then it will try to get the feed from those urls.
 
+    Feeds announced with `<link rel="alternate">` are tried first, if any
+    of them works the other links of the page are not crawled. Candidates are
+    fetched concurrently and the feeds found are cached by domain, if the
+    cached feeds stop working the discovery starts again.
+
     :param url: base url to crawl, it should be the root url.
     :type url: str
     :param crawler: class:`CrawlerSpec` implementation to be used
     :type crawler: CrawlerSpec
     :param web: Optional, if a class:`WebDocument`  object is passed, then it wouldn't
         crawl the site.
+    :param concurrency: max number of requests at the same time.
+    :param cache_ttl: seconds to keep the feeds found for a domain,
+        None to disable the cache.
     :return: A list of RSS link already parsed.
     :rtype: List[rss.RSSLink]
     """
-    _rss: List[rss.RSSLink] = []
-    _urls = set()
-    _parsed = set()
-
     w = web or download(url=url, crawler=crawler)
+    domain = w.url.domain_base
+    discovery = _FeedDiscovery(w, known=_cached_feeds(domain, cache_ttl))
+    fetch = partial(_get_or_none, crawler=crawler)
+
+    urls = discovery.next_urls()
+    while urls:
+        rsps = map_concurrent(fetch, urls, workers=concurrency)
+        discovery.add(dict(zip(urls, rsps)))
+        urls = discovery.next_urls()
+
+    _cache_feeds(domain, discovery, cache_ttl)
+    return list(discovery.feeds.values())
 
-    rss_links = rss.find_rss_realated_links(w.links())
-    for x in rss_links:
-        if x not in _parsed:
-            try:
-                possible = crawler.get(x)
-                _parsed.add(x)
-
-                if possible.is_xml:
-                    if x not in _urls:
-                        _urls.add(x)
-                        _rss.append(rss.RSSLink(url=x, xmlcontent=possible.text))
-                else:
-                    w2 = WebDocument(x, html_txt=possible.text)
-                    rss_links2 = rss.find_rss_realated_links(w2.links())
-                    for y in rss_links2:
-                        if y not in _parsed:
-                            # print(y)
-                            possible2 = crawler.get(y)
-                            _parsed.add(y)
-                            try:
-                                if possible2.is_xml:
-                                    if y not in _urls:
-                                        _urls.add(y)
-                                        _rss.append(
-                                            rss.RSSLink(
-                                                url=y, xmlcontent=possible2.text
-                                            )
-                                        )
-                            except KeyError:
-                                pass
-            except errors.CrawlHTTPError as e:
-                print(e)
-    return _rss
+
+async def afind_rss_links(
+    url: str,
+    *,
+    crawler: CrawlerSpec,
+    web: WebDocument = None,
+    concurrency: int = 8,
+    cache_ttl: Optional[int] = 24 * 60 * 60,
+) -> List[rss.RSSLink]:
+    """
+    Async version of :func:`find_rss_links`
+    """
+    w = web or await adownload(url=url, crawler=crawler)
+    domain = w.url.domain_base
+    discovery = _FeedDiscovery(w, known=_cached_feeds(domain, cache_ttl))
+
+    urls = discovery.next_urls()
+    while urls:
+        rsps = await gather_limited(
+            [_aget_or_none(u, crawler=crawler) for u in urls], limit=concurrency
+        )
+        discovery.add(dict(zip(urls, rsps)))
+        urls = discovery.next_urls()
+
+    _cache_feeds(domain, discovery, cache_ttl)
+    return list(discovery.feeds.values())
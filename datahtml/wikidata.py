@@ -1,10 +1,14 @@
-from typing import List, Union, Any, Dict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Union
 from urllib.parse import urlencode
 
-from datahtml import types
+from datahtml import errors, types
+from datahtml._utils import gather_limited, map_concurrent
 from datahtml.base import CrawlerSpec
 from datahtml.defaults import WIKI_API
 
+#: max ids accepted by wbgetentities in a single request
+MAX_IDS = 50
+
 # based on
 # https://www.jcchouinard.com/wikidata-api-python/
 # wiki pages
@@ -74,8 +78,7 @@ def search_entities(
             "language": lang,
         }
     )
-    rsp = crawler.get(f"{WIKI_API}?{params}")
-    data = rsp.json()
+    data = _json(crawler.get(f"{WIKI_API}?{params}"))
     results = []
     for d in data["search"]:
         e = types.WKEntitySearch(
@@ -122,48 +125,176 @@ def _get_country(e) -> Union[str, None]:
     return cid
 
 
-def get_entity(entityid, *, crawler: CrawlerSpec, lang="en") -> types.WKEntityV1:
-    params = urlencode(
-        {
-            "action": "wbgetentities",
-            "format": "json",
-            "ids": entityid,
-            "language": lang,
-        }
+def _text(values: Dict[str, Any], lang: str) -> str:
+    """Value of a label or description in `lang`, or in english"""
+    v = values.get(lang) or values.get("en")
+    return v["value"] if v else ""
+
+
+def _entity_from_dict(e: Dict[str, Any], lang="en") -> types.WKEntityV1:
+    aliases = e.get("aliases", {})
+    instances_of = _get_claim_data(e, PROPS["instance_of"])
+    images = _get_claim_data(e, PROPS["image"])
+    return types.WKEntityV1(
+        id=e["id"],
+        pageid=e.get("pageid"),
+        instance_of=[v.get("id") for v in instances_of],
+        label=_text(e.get("labels", {}), lang),
+        description=_text(e.get("descriptions", {}), lang),
+        modified=e.get("modified"),
+        aliases=[al.get("value") for al in aliases.get(lang, aliases.get("en", []))],
+        image=images[0] if images else None,
+        raw=e,
     )
-    rsp = crawler.get(f"{WIKI_API}?{params}")
+
+
+def _entities_url(ids: Sequence[str], props: Optional[str] = None, lang="en") -> str:
+    params = {"action": "wbgetentities", "format": "json", "ids": "|".join(ids)}
+    if props:
+        params.update({"props": props, "languages": lang})
+    return f"{WIKI_API}?{urlencode(params)}"
+
+
+def _json(rsp) -> Dict[str, Any]:
+    """
+    Body of a response of the api.
+
+    :raises errors.CrawlingError: if the status isn't 200.
+    :raises errors.WikidataAPIError: if the api answered with an error,
+        like an invalid id in a batch.
+    """
+    if rsp.status_code != 200:
+        raise errors.CrawlingError(url=rsp.url, status=rsp.status_code)
     data = rsp.json()
+    if "error" in data:
+        error = data["error"]
+        raise errors.WikidataAPIError(rsp.url, error.get("code"), error.get("info"))
+    return data
+
+
+def _chunks(ids: Iterable[str]) -> List[List[str]]:
+    # duplicated ids are requested once
+    unique = list(dict.fromkeys(ids))
+    return [unique[ix : ix + MAX_IDS] for ix in range(0, len(unique), MAX_IDS)]
+
+
+def _found(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    # unknown ids come back with a "missing" key
+    return {
+        k: e for k, e in data.get("entities", {}).items() if "missing" not in e
+    }
+
+
+def get_entity(entityid, *, crawler: CrawlerSpec, lang="en") -> types.WKEntityV1:
+    data = _json(crawler.get(_entities_url([entityid])))
     e = data["entities"][entityid]
+    return _entity_from_dict(e, lang=lang)
 
-    label = e["labels"]["en"]["value"]
-    desc = e["descriptions"]["en"]["value"]
-    pid = e["pageid"]
-    aliases = [al.get("value") for al in e["aliases"]["en"]]
 
-    instances_of = _get_claim_data(e, PROPS["instance_of"])
-    types_id = [v.get("id") for v in instances_of]
+def get_entities(
+    ids: Iterable[str], *, crawler: CrawlerSpec, lang="en", concurrency=8
+) -> List[types.WKEntityV1]:
+    """
+    Get many entities, in requests of 50 ids run concurrently.
+    Entities not found are skipped, the rest keep the order of `ids`.
+    """
+    chunks = _chunks(ids)
+    responses = map_concurrent(
+        lambda chunk: _json(crawler.get(_entities_url(chunk))),
+        chunks,
+        workers=concurrency,
+    )
+    return _merge_entities(chunks, responses, lang)
 
-    try:
-        image = _get_claim_data(e, PROPS["image"])[0]
-    except AttributeError:
-        image = None
-    return types.WKEntityV1(
-        id=entityid,
-        pageid=pid,
-        instance_of=types_id,
-        label=label,
-        description=desc,
-        modified=e["modified"],
-        aliases=aliases,
-        image=image,
-        raw=e,
 
+async def aget_entities(
+    ids: Iterable[str], *, crawler: CrawlerSpec, lang="en", concurrency=8
+) -> List[types.WKEntityV1]:
+    """Async version of :func:`get_entities`"""
+    chunks = _chunks(ids)
+    responses = await gather_limited(
+        [crawler.aget(_entities_url(chunk)) for chunk in chunks], limit=concurrency
     )
+    return _merge_entities(chunks, [_json(r) for r in responses], lang)
+
+
+def _merge_entities(
+    chunks: List[List[str]], responses: List[Dict[str, Any]], lang: str
+) -> List[types.WKEntityV1]:
+    entities = []
+    for chunk, data in zip(chunks, responses):
+        found = _found(data)
+        entities.extend(
+            _entity_from_dict(found[i], lang=lang) for i in chunk if i in found
+        )
+    return entities
+
+
+def claim_ids(
+    e: Dict[str, Any],
+    props: Iterable[str] = (
+        PROPS["instance_of"],
+        PROPS["gender"],
+        PROPS["country_cityzen"],
+        PROPS["country"],
+    ),
+) -> Set[str]:
+    """Ids of the entities referenced by the claims `props` of an entity"""
+    ids = set()
+    for prop in props:
+        for v in _get_claim_data(e, prop):
+            if isinstance(v, dict) and v.get("id"):
+                ids.add(v["id"])
+    return ids
+
+
+def resolve_labels(
+    ids: Iterable[str], *, crawler: CrawlerSpec, lang="en", concurrency=8
+) -> Dict[str, str]:
+    """
+    Labels of many entities, requesting only their labels
+    in batches of 50 ids.
+
+    .. code-block:: python
+
+        entities = get_entities(qids, crawler=c)
+        refs = set().union(*(claim_ids(e.raw) for e in entities))
+        labels = resolve_labels(refs, crawler=c)
+
+    """
+    responses = map_concurrent(
+        lambda chunk: _json(crawler.get(_entities_url(chunk, "labels", lang))),
+        _chunks(ids),
+        workers=concurrency,
+    )
+    return _merge_labels(responses, lang)
+
+
+async def aresolve_labels(
+    ids: Iterable[str], *, crawler: CrawlerSpec, lang="en", concurrency=8
+) -> Dict[str, str]:
+    """Async version of :func:`resolve_labels`"""
+    responses = await gather_limited(
+        [
+            crawler.aget(_entities_url(chunk, "labels", lang))
+            for chunk in _chunks(ids)
+        ],
+        limit=concurrency,
+    )
+    return _merge_labels([_json(r) for r in responses], lang)
+
+
+def _merge_labels(responses: List[Dict[str, Any]], lang: str) -> Dict[str, str]:
+    labels = {}
+    for data in responses:
+        for id_, e in _found(data).items():
+            labels[id_] = _text(e.get("labels", {}), lang)
+    return labels
 
 
 def extract_extra(e: Dict[str, Any]) -> types.WKEntityExtra:
     id_ = e["id"]
-    label = e["labels"]["en"]["value"]
+    label = _text(e.get("labels", {}), "en")
     sites = _get_claim_data(e, PROPS["websites"])
     gender = _get_gender(e)
     country = _get_country(e)
@@ -171,6 +302,7 @@ def extract_extra(e: Dict[str, Any]) -> types.WKEntityExtra:
     twitter = _get_claim_data(e, PROPS["twitter"])
     lk = _get_claim_data(e, PROPS["linkedin"])
     fb = _get_claim_data(e, PROPS["facebook"])
+    yt = _get_claim_data(e, PROPS["youtube"])
 
     return types.WKEntityExtra(
         id=id_,
@@ -182,6 +314,7 @@ def extract_extra(e: Dict[str, Any]) -> types.WKEntityExtra:
         fb=fb,
         linkedin=lk,
         twitter=twitter,
+        youtube=yt,
     )
 
 
@@ -0,0 +1,281 @@
+"""
+Local cache of wikidata entities.
+
+Entities are stored in sqlite by id, compressed, with their `lastrevid`.
+After `ttl` an entity is revalidated by asking wikidata only for the
+revision of the entities (`props=info`), in batches of 50 ids, and it's
+downloaded again only when it changed. Ids which don't exist are
+remembered too, during `ttl`.
+
+.. code-block:: python
+
+    from datahtml import crawler
+    from datahtml.wikidata_cache import WikidataCache
+
+    cache = WikidataCache("wikidata.db", ttl=24 * 60 * 60)
+    entities = cache.get_entities(["Q9684", "Q5"], crawler=crawler.LocalCrawler())
+    extras = cache.get_extras(["Q9684"], crawler=crawler.LocalCrawler())
+
+"""
+import json
+import sqlite3
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from attrs import define
+
+from datahtml import types, wikidata
+from datahtml._utils import gather_limited, map_concurrent
+from datahtml.base import CrawlerSpec
+
+
+@define
+class WikidataCacheStats:
+    hits: int = 0
+    #: stale entities which didn't change
+    revalidated: int = 0
+    #: entities downloaded, because they were new or changed
+    fetched: int = 0
+    evicted: int = 0
+
+
+def _revision(e: Dict[str, Any]) -> Tuple[Optional[int], Optional[str]]:
+    return e.get("lastrevid"), e.get("modified")
+
+
+class WikidataCache:
+    """
+    :param uri: sqlite database, by default an in-memory one.
+    :param ttl: seconds an entity is used without revalidation.
+    :param max_entities: entities kept, the least recently used
+        are evicted beyond it.
+    :param lang: language of labels and descriptions.
+    :param concurrency: requests to wikidata run at the same time.
+    """
+
+    def __init__(
+        self,
+        uri=":memory:",
+        ttl: float = 24 * 60 * 60,
+        max_entities=100_000,
+        lang="en",
+        concurrency=8,
+    ):
+        self.conn = sqlite3.connect(uri, check_same_thread=False)
+        self.ttl = ttl
+        self.max_entities = max_entities
+        self.lang = lang
+        self.concurrency = concurrency
+        self.stats = WikidataCacheStats()
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS entities
+            (id TEXT PRIMARY KEY, lastrevid INTEGER, modified TEXT,
+             checked_at REAL, used_at REAL, data BLOB) WITHOUT ROWID;
+            """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS entities_used_idx ON entities(used_at);"
+            )
+
+    def __len__(self):
+        return self.conn.execute("select count(*) from entities;").fetchone()[0]
+
+    def _load(self, ids: List[str]) -> Dict[str, Tuple[Any, ...]]:
+        rows = {}
+        for ix in range(0, len(ids), 500):
+            chunk = ids[ix : ix + 500]
+            marks = ",".join("?" * len(chunk))
+            for r in self.conn.execute(
+                f"select id, lastrevid, modified, checked_at, data from entities where id in ({marks});",
+                chunk,
+            ):
+                rows[r[0]] = r
+        return rows
+
+    def _store(
+        self, entities: List[Dict[str, Any]], missing: List[str], now: float
+    ):
+        rows = [
+            (
+                e["id"],
+                *_revision(e),
+                now,
+                now,
+                zlib.compress(json.dumps(e).encode("utf-8")),
+            )
+            for e in entities
+        ]
+        rows.extend((id_, None, None, now, now, None) for id_ in missing)
+        with self.conn:
+            self.conn.executemany(
+                "insert or replace into entities values (?, ?, ?, ?, ?, ?);", rows
+            )
+        self._evict()
+
+    def _touch(self, ids: List[str], now: float, checked=False):
+        column = "checked_at = ?, used_at = ?" if checked else "used_at = ?"
+        params = (now, now) if checked else (now,)
+        with self.conn:
+            self.conn.executemany(
+                f"update entities set {column} where id = ?;",
+                [(*params, i) for i in ids],
+            )
+
+    def _evict(self):
+        excess = len(self) - self.max_entities
+        if excess > 0:
+            with self.conn:
+                self.conn.execute(
+                    """delete from entities where id in
+                    (select id from entities order by used_at limit ?);""",
+                    (excess,),
+                )
+            self.stats.evicted += excess
+
+    def forget(self, ids: Iterable[str]):
+        with self.conn:
+            self.conn.executemany(
+                "delete from entities where id = ?;", [(i,) for i in ids]
+            )
+
+    def _plan(self, ids: List[str], now: float):
+        """Split `ids` into the raw entities still fresh, the stale and the unknown"""
+        rows = self._load(ids)
+        fresh: Dict[str, Dict[str, Any]] = {}
+        stale: Dict[str, Tuple[Any, ...]] = {}
+        unknown = []
+        for id_ in ids:
+            row = rows.get(id_)
+            if row is None:
+                unknown.append(id_)
+            elif now - row[3] > self.ttl:
+                if row[4] is None:
+                    unknown.append(id_)
+                else:
+                    stale[id_] = row
+            elif row[4] is not None:
+                fresh[id_] = json.loads(zlib.decompress(row[4]))
+        return fresh, stale, unknown
+
+    def _changed(
+        self,
+        stale: Dict[str, Tuple[Any, ...]],
+        infos: List[Dict[str, Any]],
+        fresh: Dict[str, Dict[str, Any]],
+        now: float,
+    ) -> List[str]:
+        """
+        Compare the revisions of the stale entities, those unchanged are
+        moved to `fresh`, it returns the ids which must be downloaded.
+        """
+        current: Dict[str, Dict[str, Any]] = {}
+        for data in infos:
+            current.update(wikidata._found(data))
+        unchanged = []
+        changed = []
+        for id_, row in stale.items():
+            info = current.get(id_)
+            if info is None:
+                # deleted or merged, it's downloaded again
+                changed.append(id_)
+            elif _revision(info) == (row[1], row[2]):
+                unchanged.append(id_)
+                fresh[id_] = json.loads(zlib.decompress(row[4]))
+            else:
+                changed.append(id_)
+        self._touch(unchanged, now, checked=True)
+        self.stats.revalidated += len(unchanged)
+        return changed
+
+    def _fetched(
+        self,
+        ids: List[str],
+        downloaded: List[types.WKEntityV1],
+        fresh: Dict[str, Dict[str, Any]],
+        now: float,
+    ):
+        found = {e.id: e.raw for e in downloaded}
+        self._store(
+            list(found.values()), [i for i in ids if i not in found], now
+        )
+        self.stats.fetched += len(found)
+        fresh.update(found)
+
+    def _result(
+        self, ids: List[str], raw: Dict[str, Dict[str, Any]], now: float
+    ) -> List[types.WKEntityV1]:
+        self._touch([i for i in ids if i in raw], now)
+        return [
+            wikidata._entity_from_dict(raw[i], lang=self.lang) for i in ids if i in raw
+        ]
+
+    def get_entities(
+        self, ids: Iterable[str], *, crawler: CrawlerSpec, now: Optional[float] = None
+    ) -> List[types.WKEntityV1]:
+        """
+        Same as :func:`datahtml.wikidata.get_entities`, using the cache.
+        """
+        now = now or time.time()
+        ids = list(dict.fromkeys(ids))
+        fresh, stale, unknown = self._plan(ids, now)
+        self.stats.hits += len(fresh)
+        if stale:
+            infos = map_concurrent(
+                lambda chunk: wikidata._json(
+                    crawler.get(wikidata._entities_url(chunk, "info", self.lang))
+                ),
+                wikidata._chunks(stale.keys()),
+                workers=self.concurrency,
+            )
+            unknown.extend(self._changed(stale, infos, fresh, now))
+        if unknown:
+            downloaded = wikidata.get_entities(
+                unknown, crawler=crawler, lang=self.lang, concurrency=self.concurrency
+            )
+            self._fetched(unknown, downloaded, fresh, now)
+        return self._result(ids, fresh, now)
+
+    async def aget_entities(
+        self, ids: Iterable[str], *, crawler: CrawlerSpec, now: Optional[float] = None
+    ) -> List[types.WKEntityV1]:
+        """Async version of :meth:`get_entities`"""
+        now = now or time.time()
+        ids = list(dict.fromkeys(ids))
+        fresh, stale, unknown = self._plan(ids, now)
+        self.stats.hits += len(fresh)
+        if stale:
+            responses = await gather_limited(
+                [
+                    crawler.aget(wikidata._entities_url(chunk, "info", self.lang))
+                    for chunk in wikidata._chunks(stale.keys())
+                ],
+                limit=self.concurrency,
+            )
+            infos = [wikidata._json(r) for r in responses]
+            unknown.extend(self._changed(stale, infos, fresh, now))
+        if unknown:
+            downloaded = await wikidata.aget_entities(
+                unknown, crawler=crawler, lang=self.lang, concurrency=self.concurrency
+            )
+            self._fetched(unknown, downloaded, fresh, now)
+        return self._result(ids, fresh, now)
+
+    def get_entity(
+        self, entityid: str, *, crawler: CrawlerSpec, now: Optional[float] = None
+    ) -> Optional[types.WKEntityV1]:
+        entities = self.get_entities([entityid], crawler=crawler, now=now)
+        return entities[0] if entities else None
+
+    def get_extras(
+        self, ids: Iterable[str], *, crawler: CrawlerSpec, now: Optional[float] = None
+    ) -> List[types.WKEntityExtra]:
+        """:func:`datahtml.wikidata.extract_extra` of the cached entities"""
+        return [
+            wikidata.extract_extra(e.raw)
+            for e in self.get_entities(ids, crawler=crawler, now=now)
+        ]
@@ -0,0 +1,169 @@
+"""
+Reader of the wikidata JSON dumps.
+
+Dumps are a JSON array with an entity per line, compressed with gzip or
+bzip2, see https://www.wikidata.org/wiki/Wikidata:Database_download.
+Lines are streamed and decoded in a pool of processes, a line is only
+decoded when it contains the ids of the filters, so most of the dump is
+skipped without parsing it.
+
+.. code-block:: python
+
+    from datahtml.wikidata_dump import read_dump
+
+    for e in read_dump("latest-all.json.gz", instance_of=["Q5"], extra=True):
+        print(e.id, e.twitter)
+
+"""
+import bz2
+import gzip
+import json
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from functools import partial
+from typing import IO, Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from datahtml import types
+from datahtml.wikidata import PROPS, _entity_from_dict, _get_claim_data, extract_extra
+
+DumpEntity = Union[types.WKEntityV1, types.WKEntityExtra]
+
+
+def open_dump(path: str) -> IO[str]:
+    """Open a dump as text, compressed or not"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_lines(path: str) -> Iterator[str]:
+    """Lines of the dump with an entity, without the array syntax"""
+    with open_dump(path) as f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            if line and line not in ("[", "]"):
+                yield line
+
+
+def _matches(
+    e: Dict[str, Any], instance_of: Optional[Set[str]], props: Optional[Set[str]]
+) -> bool:
+    if instance_of is not None:
+        ids = {v.get("id") for v in _get_claim_data(e, PROPS["instance_of"])}
+        if not ids & instance_of:
+            return False
+    if props is not None:
+        claims = e.get("claims", {})
+        if not any(p in claims for p in props):
+            return False
+    return True
+
+
+def decode_line(
+    line: str,
+    instance_of: Optional[Set[str]] = None,
+    props: Optional[Set[str]] = None,
+    extra=False,
+    lang="en",
+    keep_raw=True,
+) -> Optional[DumpEntity]:
+    """
+    Decode an entity of the dump if it's an instance of any of `instance_of`
+    and it has any of `props`.
+
+    :return: a :class:`datahtml.types.WKEntityExtra` when `extra`, otherwise
+        a :class:`datahtml.types.WKEntityV1`, or `None` if it's filtered out.
+    """
+    # the ids must be somewhere in the line, it's cheaper than decoding it
+    if instance_of is not None and not any(f'"{q}"' in line for q in instance_of):
+        return None
+    if props is not None and not any(f'"{p}"' in line for p in props):
+        return None
+    e = json.loads(line)
+    if not _matches(e, instance_of, props):
+        return None
+    if extra:
+        return extract_extra(e)
+    entity = _entity_from_dict(e, lang=lang)
+    if not keep_raw:
+        entity.raw = {}
+    return entity
+
+
+def _decode_batch(lines: List[str], **kwargs) -> List[DumpEntity]:
+    decoded = (decode_line(line, **kwargs) for line in lines)
+    return [e for e in decoded if e is not None]
+
+
+def _batches(lines: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _next_done(pending: Deque[Future], ordered: bool) -> List[DumpEntity]:
+    if ordered:
+        return pending.popleft().result()
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    fut = done.pop()
+    pending.remove(fut)
+    return fut.result()
+
+
+def read_dump(
+    path: str,
+    *,
+    instance_of: Optional[Iterable[str]] = None,
+    props: Optional[Iterable[str]] = None,
+    extra=False,
+    lang="en",
+    keep_raw=True,
+    processes: Optional[int] = None,
+    ordered=True,
+    chunksize=512,
+) -> Iterator[DumpEntity]:
+    """
+    Stream the entities of a dump which pass the filters,
+    see :func:`decode_line`.
+
+    :param instance_of: ids like the keys of :data:`datahtml.wikidata.ENTS`.
+    :param props: properties like the values of :data:`datahtml.wikidata.PROPS`.
+    :param keep_raw: keep the decoded entity in `raw`, it's memory heavy.
+    :param processes: size of the pool, by default the number of cpus.
+        With 0 lines are decoded in the current process.
+    :param ordered: yield the entities in the order of the dump, otherwise
+        as soon as they are decoded.
+    :param chunksize: lines sent to a process at once.
+    """
+    decode = partial(
+        _decode_batch,
+        instance_of=set(instance_of) if instance_of is not None else None,
+        props=set(props) if props is not None else None,
+        extra=extra,
+        lang=lang,
+        keep_raw=keep_raw,
+    )
+    batches = _batches(iter_lines(path), chunksize)
+    if processes == 0:
+        for batch in batches:
+            yield from decode(batch)
+        return
+
+    workers = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # a bounded window of batches, the dump doesn't fit in memory
+        pending: Deque[Future] = deque()
+        for batch in batches:
+            pending.append(pool.submit(decode, batch))
+            if len(pending) >= workers * 4:
+                yield from _next_done(pending, ordered)
+        while pending:
+            yield from _next_done(pending, ordered)
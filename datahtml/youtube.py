@@ -1,13 +1,29 @@
+import json
+import re
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 from urllib.parse import parse_qs, urlparse, quote
 
 import feedparser
 import httpx
-from bs4 import BeautifulSoup as BS
+from lxml import etree
 
-from datahtml.parsers import extract_json, extract_metadata, findkeys
+from datahtml.parsers import KeyIndex, findkeys
+
+_DECODER = json.JSONDecoder()
+#: keys of ytInitialData used by :func:`transform_channel`
+_CHANNEL_KEYS = ("country", "viewCountText", "primaryLinks", "joinedDateText")
+_RSS_NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "yt": "http://www.youtube.com/xml/schemas/2015",
+    "media": "http://search.yahoo.com/mrss/",
+}
+_RSS_PARSER = etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=True)
+
+#: what could follow the name of the variable until the object starts,
+#: like in `var ytInitialData = {` or `window["ytInitialData"] = {`
+_ASSIGN = re.compile(r"""["']?\]?\s*=\s*(?={)""")
 
 
 @dataclass
@@ -53,6 +69,7 @@ class RSSVideo:
     published: str
     thumbnail: str
     views: str
+    channel_id: Optional[str] = None
 
 
 @dataclass
@@ -90,17 +107,48 @@ class ChannelMeta:
     social_links: list = field(default_factory=list)
 
 
-def _get_location(data) -> Union[str, None]:
-    keys = list(findkeys(data, "country"))
-    if keys:
-        return keys[0].get("simpleText")
+def extract_initial_data(
+    html: Union[str, bytes], name: str = "ytInitialData"
+) -> Optional[Dict[str, Any]]:
+    """
+    Decode the object assigned to a js variable of a youtube page,
+    like `ytInitialData` or `ytInitialPlayerResponse`.
+
+    The html is scanned for the assignment and only that object is decoded,
+    without parsing the html or the rest of the scripts.
+    """
+    if isinstance(html, bytes):
+        # only the bytes after the first mention of the name are decoded
+        ix = html.find(name.encode())
+        if ix == -1:
+            return None
+        html = html[ix:].decode("utf-8", errors="replace")
+    start = 0
+    while True:
+        ix = html.find(name, start)
+        if ix == -1:
+            return None
+        start = ix + len(name)
+        m = _ASSIGN.match(html, start)
+        if m:
+            try:
+                obj, _ = _DECODER.raw_decode(html, m.end())
+                return obj
+            except json.JSONDecodeError:
+                pass
+
+
+def _get_location(ix: KeyIndex) -> Union[str, None]:
+    country = ix.first("country")
+    if country:
+        return country.get("simpleText")
     return None
 
 
-def _get_view_counts(data):
-    keys = list(findkeys(data, "viewCountText"))
-    if keys:
-        return keys[0].get("simpleText")
+def _get_view_counts(ix: KeyIndex):
+    views = ix.first("viewCountText")
+    if views:
+        return views.get("simpleText")
     return None
 
 
@@ -115,11 +163,10 @@ def _parse_social_link(link):
     return social
 
 
-def _get_primary_links(data):
-    keys = list(findkeys(data, "primaryLinks"))
+def _get_primary_links(ix: KeyIndex):
+    links = ix.first("primaryLinks")
     final = []
-    if keys:
-        links = keys[0]
+    if links:
         for link in links:
             try:
                 sl = _parse_social_link(link)
@@ -129,11 +176,11 @@ def _get_primary_links(data):
     return final
 
 
-def _get_date_creation(data):
-    keys = list(findkeys(data, "joinedDateText"))
-    if keys:
+def _get_date_creation(ix: KeyIndex):
+    joined = ix.first("joinedDateText")
+    if joined:
         try:
-            return keys[0].get("runs")[1]["text"]
+            return joined.get("runs")[1]["text"]
         except (KeyError, IndexError):
             pass
     return None
@@ -141,23 +188,23 @@ def _get_date_creation(data):
 
 def _get_tags(data):
     try:
-        tags = data[1]["microformat"]["microformatDataRenderer"]["tags"]
+        tags = data["microformat"]["microformatDataRenderer"]["tags"]
     except KeyError:
         tags = None
     return tags
 
 
 def _countries(data):
-    return data[1]["microformat"]["microformatDataRenderer"]["availableCountries"]
+    return data["microformat"]["microformatDataRenderer"]["availableCountries"]
 
 
 def _is_family_safe(data):
-    return data[1]["microformat"]["microformatDataRenderer"]["familySafe"]
+    return data["microformat"]["microformatDataRenderer"]["familySafe"]
 
 
 def _get_subscribers(data):
     try:
-        s = data[1]["header"]["c4TabbedHeaderRenderer"]["subscriberCountText"][
+        s = data["header"]["c4TabbedHeaderRenderer"]["subscriberCountText"][
             "simpleText"
         ]
         s = s.replace("\xa0", " ")
@@ -180,7 +227,7 @@ def _get_channel_video(vid):
 
 
 def _get_playlists(data):
-    page = data[1]["contents"]["twoColumnBrowseResultsRenderer"]["tabs"][0][
+    page = data["contents"]["twoColumnBrowseResultsRenderer"]["tabs"][0][
         "tabRenderer"
     ]["content"]["sectionListRenderer"]["contents"]
     playlists_obj = []
@@ -206,7 +253,7 @@ def _get_playlists(data):
 
 
 def _get_main_video(data):
-    page = data[1]["contents"]["twoColumnBrowseResultsRenderer"]["tabs"][0][
+    page = data["contents"]["twoColumnBrowseResultsRenderer"]["tabs"][0][
         "tabRenderer"
     ]["content"]["sectionListRenderer"]["contents"]
     renderer = page[0]["itemSectionRenderer"]["contents"][0][
@@ -228,15 +275,15 @@ def _get_attr(attrs, key):
                 return attr["content"]
 
 
-def _get_related_vids(data):
+def _get_related_vids(ix: KeyIndex):
     """get related videos in a youtube video"""
-    results = findkeys(data, "secondaryResults")
     related = []
-    for level in results:
+    for level in ix.get("secondaryResults"):
         if level.get("secondaryResults"):
-            for _v in findkeys(
-                level["secondaryResults"]["results"], "compactVideoRenderer"
-            ):
+            videos = KeyIndex(
+                level["secondaryResults"]["results"], keys=["compactVideoRenderer"]
+            )
+            for _v in videos.get("compactVideoRenderer"):
                 try:
                     t = _v["longBylineText"]
                     channel_id = t["runs"][0]["navigationEndpoint"]["browseEndpoint"][
@@ -254,26 +301,31 @@ def _get_related_vids(data):
     return related
 
 
-def _get_vid_id(data):
-    data[0]
-    results = list(findkeys(data[0], "videoId"))
+def _get_vid_id(player):
+    results = list(findkeys(player, "videoId"))
     return results[0]
 
 
-def _get_vid_channel_id(data):
-    results = list(findkeys(data[0], "channelId"))
+def _get_vid_channel_id(player):
+    results = list(findkeys(player, "channelId"))
     return results[0]
 
 
-def _get_vid_category(data):
-    results = list(findkeys(data, "category"))
-    return results[0]
+def _get_vid_category(player):
+    try:
+        return player["microformat"]["playerMicroformatRenderer"]["category"]
+    except KeyError:
+        results = list(findkeys(player, "category"))
+        return results[0]
+
+
+def _get_channel_metadata(data):
+    return data["metadata"]["channelMetadataRenderer"]
 
 
 def transform_search(html):
-    soup = BS(html, "lxml")
-    jdata = extract_json(soup)
-    results = jdata[1]["contents"]["twoColumnSearchResultsRenderer"]["primaryContents"][
+    jdata = extract_initial_data(html)
+    results = jdata["contents"]["twoColumnSearchResultsRenderer"]["primaryContents"][
         "sectionListRenderer"
     ]["contents"][0]["itemSectionRenderer"]["contents"]
     search = []
@@ -296,10 +348,9 @@ def transform_search(html):
 
 
 def transform_video(html) -> Video:
-    soup = BS(html, "lxml")
-    # attrs = extract_metadata(soup)
-    jdata = extract_json(soup)
-    vd = list(findkeys(jdata, "videoDetails"))[0]
+    player = extract_initial_data(html, "ytInitialPlayerResponse")
+    jdata = extract_initial_data(html)
+    vd = player["videoDetails"]
 
     id_ = vd["videoId"]
     channel = vd["channelId"]
@@ -310,8 +361,10 @@ def transform_video(html) -> Video:
     description = vd["shortDescription"]
     title = vd["title"]
     length = vd["lengthSeconds"]
-    category = _get_vid_category(jdata)
-    related = _get_related_vids(jdata)
+    category = _get_vid_category(player)
+    related = []
+    if jdata:
+        related = _get_related_vids(KeyIndex(jdata, keys=["secondaryResults"]))
 
     return Video(
         id=id_,
@@ -330,13 +383,13 @@ def transform_video(html) -> Video:
 
 
 def transform_channel(html) -> ChannelMeta:
-    soup = BS(html, "lxml")
-    attrs = extract_metadata(soup)
-    jdata = extract_json(soup)
+    jdata = extract_initial_data(html)
+    meta = _get_channel_metadata(jdata)
+    ix = KeyIndex(jdata, keys=_CHANNEL_KEYS)
 
-    country = _get_location(jdata)
-    view_count = _get_view_counts(jdata)
-    joined = _get_date_creation(jdata)
+    country = _get_location(ix)
+    view_count = _get_view_counts(ix)
+    joined = _get_date_creation(ix)
 
     tags = _get_tags(jdata)
     try:
@@ -346,7 +399,7 @@ def transform_channel(html) -> ChannelMeta:
 
     family = _is_family_safe(jdata)
     sus = _get_subscribers(jdata)
-    socials = _get_primary_links(jdata)
+    socials = _get_primary_links(ix)
     # try:
     #     playlists = _get_playlists(jdata)
     # except KeyError:
@@ -356,10 +409,10 @@ def transform_channel(html) -> ChannelMeta:
     # except KeyError:
     #     main_video = None
     return ChannelMeta(
-        id=_get_attr(attrs, "channelId"),
-        name=_get_attr(attrs, "name"),
-        description=_get_attr(attrs, "og:description"),
-        thumbnail_url=_get_attr(attrs, "og:image"),
+        id=meta["externalId"],
+        name=meta["title"],
+        description=meta["description"],
+        thumbnail_url=meta["avatar"]["thumbnails"][0]["url"],
         available_countries=countries,
         tags=tags,
         subscribers=sus,
@@ -384,12 +437,53 @@ def transform_rss(xml: str) -> List[RSSVideo]:
             published=x.published,
             thumbnail=x.media_thumbnail[0]["url"],
             views=x.media_statistics["views"],
+            channel_id=x.get("yt_channelid"),
         )
         for x in d.entries
     ]
     return videos
 
 
+def _xml_text(node, path: str) -> str:
+    found = node.find(path, _RSS_NS)
+    if found is None or found.text is None:
+        return ""
+    return found.text
+
+
+def _xml_attr(node, path: str, attr: str) -> str:
+    found = node.find(path, _RSS_NS)
+    if found is None:
+        return ""
+    return found.get(attr, "")
+
+
+def transform_rss_fast(xml: Union[str, bytes]) -> List[RSSVideo]:
+    """
+    Same as :func:`transform_rss` but parsed with lxml, without the
+    normalization done by feedparser for any kind of feed.
+    """
+    if isinstance(xml, str):
+        xml = xml.encode("utf-8")
+    root = etree.fromstring(xml, parser=_RSS_PARSER)
+    videos = []
+    for entry in root.iterfind("atom:entry", _RSS_NS):
+        videos.append(
+            RSSVideo(
+                id=_xml_text(entry, "yt:videoId"),
+                title=_xml_text(entry, "atom:title"),
+                description=_xml_text(entry, "media:group/media:description"),
+                published=_xml_text(entry, "atom:published"),
+                thumbnail=_xml_attr(entry, "media:group/media:thumbnail", "url"),
+                views=_xml_attr(
+                    entry, "media:group/media:community/media:statistics", "views"
+                ),
+                channel_id=_xml_text(entry, "yt:channelId") or None,
+            )
+        )
+    return videos
+
+
 def channel_rss_from_id(id_: str):
     return f"https://www.youtube.com/feeds/videos.xml?channel_id={id_}"
 
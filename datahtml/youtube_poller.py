@@ -0,0 +1,54 @@
+"""
+Polling of the rss feeds of many youtube channels.
+
+:class:`ChannelPoller` is a :class:`datahtml.feed_scheduler.FeedScheduler`
+whose feeds are youtube channels: feeds are polled concurrently with
+conditional requests, parsed with lxml and only videos not seen before
+are emitted, deduplicated by video id.
+
+.. code-block:: python
+
+    from datahtml import crawler
+    from datahtml.feed_scheduler import FeedStore
+    from datahtml.youtube_poller import ChannelPoller
+
+    poller = ChannelPoller(store=FeedStore("channels.db"), concurrency=64)
+    poller.add_channels(channel_ids)
+    videos = asyncio.run(poller.poll(crawler.LocalCrawler()))
+    print(poller.stats.feeds_per_sec)
+
+"""
+from typing import Iterable, List, Optional
+
+from lxml import etree
+
+from datahtml import errors
+from datahtml.base import CrawlResponse
+from datahtml.feed_scheduler import FeedScheduler
+from datahtml.youtube import RSSVideo, channel_rss_from_id, transform_rss_fast
+
+
+class ChannelPoller(FeedScheduler):
+    """
+    Takes the same params as :class:`datahtml.feed_scheduler.FeedScheduler`,
+    channels publish less often than news sites, so a longer `min_interval`
+    is usually enough.
+    """
+
+    def parse_entries(self, rsp: CrawlResponse) -> List[RSSVideo]:
+        try:
+            return transform_rss_fast(rsp.content)
+        except etree.XMLSyntaxError:
+            raise errors.XMLContentNotFound(rsp.url)
+
+    def entry_key(self, entry: RSSVideo) -> str:
+        return entry.id
+
+    def add_channel(self, id_: str, now: Optional[float] = None):
+        self.add(channel_rss_from_id(id_), now=now)
+
+    def add_channels(self, ids: Iterable[str], now: Optional[float] = None):
+        self.add_many((channel_rss_from_id(id_) for id_ in ids), now=now)
+
+    def remove_channel(self, id_: str):
+        self.remove(channel_rss_from_id(id_))
@@ -1,3 +1,55 @@
 # SPDX-FileCopyrightText: 2022-present nuxion <nuxion@gmail.com>
 #
 # SPDX-License-Identifier: MIT
+from typing import Any, Dict, Optional
+
+from datahtml import errors
+from datahtml.base import CrawlerSpec, CrawlResponse
+
+
+def make_response(
+    url: str, content, content_type="text/html", status_code=200, headers=None
+) -> CrawlResponse:
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    _headers = {"content-type": content_type}
+    _headers.update(headers or {})
+    return CrawlResponse(
+        content=content, url=url, headers=_headers, status_code=status_code
+    )
+
+
+class MockCrawler(CrawlerSpec):
+    """
+    Crawler which serves canned responses. `routes` maps urls to
+    a :class:`CrawlResponse` or to a callable `(url, headers) -> CrawlResponse`.
+    `default` is used for urls without a route.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, Any]] = None, default=None):
+        self.proxy = None
+        self.routes = routes or {}
+        self.default = default
+        self.calls = []
+
+    def get(
+        self,
+        url,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout_secs: int = 60,
+    ) -> CrawlResponse:
+        self.calls.append((url, headers))
+        rsp = self.routes.get(url, self.default)
+        if rsp is None:
+            raise errors.CrawlHTTPError(f"No route for {url}")
+        if callable(rsp):
+            return rsp(url, headers)
+        return rsp
+
+    async def aget(
+        self,
+        url,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout_secs: int = 60,
+    ) -> CrawlResponse:
+        return self.get(url, headers=headers, timeout_secs=timeout_secs)
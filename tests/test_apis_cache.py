@@ -0,0 +1,41 @@
+import httpx
+
+from datahtml.apis import youtube
+from datahtml.apis.cache import FRESH, MISS, STALE, ResponseCache, cache_key
+
+
+def test_apis_cache_ttl(tmp_path):
+    db = str(tmp_path / "cache.db")
+    cache = ResponseCache(uri=db, ttls={"search": 10}, stale_ttl=5)
+    key = cache_key("search", {"q": "surf", "part": "snippet"})
+    cache.put("search", key, {"items": [1]}, now=100.0)
+
+    assert key == cache_key("search", {"part": "snippet", "q": "surf"})
+    assert cache.get("search", key, cost=100, now=105.0) == ({"items": [1]}, FRESH)
+    assert cache.get("search", key, now=112.0)[1] == STALE
+    assert cache.get("search", key, now=120.0) == (None, MISS)
+    # the sqlite tier is shared with a new cache
+    other = ResponseCache(uri=db, ttls={"search": 10})
+    assert other.get("search", key, now=105.0)[1] == FRESH
+    assert other.purge(now=200.0) == 1
+    assert cache.stats.quota_saved == 100
+    assert round(cache.stats.hit_ratio, 2) == 0.67
+
+
+def test_apis_cache_client():
+    calls = []
+
+    def handler(request: httpx.Request):
+        calls.append(request.url.params["q"])
+        return httpx.Response(200, json={"items": [], "pageInfo": {"totalResults": 0}})
+
+    cache = ResponseCache(maxsize=1)
+    c = youtube.Client(api_key="k", transport=httpx.MockTransport(handler), cache=cache)
+    c.search(c.create_search("surf"))
+    c.search(c.create_search("surf"))
+    c.search(c.create_search("futbol"))
+    c.search(c.create_search("surf"))
+
+    assert calls == ["surf", "futbol", "surf"]
+    assert c.quota_used == 300
+    assert cache.stats.quota_saved == 100
@@ -1,6 +1,12 @@
+import asyncio
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
 
 from datahtml.apis import youtube
+from datahtml.errors import QuotaExceeded
 
 
 def test_apis_youtube_search():
@@ -23,3 +29,118 @@ def test_apis_youtube_video():
     y2 = c._dict2videoresponse(data2)
     assert isinstance(y, youtube.VideoResponse)
     assert isinstance(y2, youtube.VideoResponse)
+
+
+def _transport(calls):
+    with open("tests/youtube_video_response.json", "r") as f:
+        item = json.loads(f.read())["items"][0]
+
+    def handler(request: httpx.Request):
+        ids = request.url.params["id"].split(",")
+        calls.append(ids)
+        items = [dict(item, id=id_) for id_ in ids]
+        return httpx.Response(200, json={"items": items, "pageInfo": {"totalResults": len(ids)}})
+
+    return httpx.MockTransport(handler)
+
+
+def test_apis_youtube_videos():
+    calls = []
+    ids = [f"v{i}" for i in range(120)] + ["v0"]
+    with youtube.Client(api_key="k", transport=_transport(calls)) as c:
+        rsp = c.videos(ids)
+        one = c.video(c.create_video(["a", "b"]))
+
+    # chunks are requested concurrently
+    assert sorted(len(ids) for ids in calls[:3]) == [20, 50, 50]
+    assert len(calls[3]) == 2
+    assert [v.id for v in rsp.items] == [f"v{i}" for i in range(120)]
+    assert len(one.items) == 2
+    assert c.quota_used == 4
+    assert c.requests == {"videos": 4}
+
+
+def test_apis_youtube_client_threads():
+    c = youtube.Client(api_key="k")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        clients = list(pool.map(lambda _: c.client, range(64)))
+
+    assert len({id(client) for client in clients}) == 1
+    c.close()
+    assert clients[0].is_closed
+
+def test_apis_youtube_avideos_quota():
+    calls = []
+    c = youtube.Client(api_key="k", transport=_transport(calls), quota_limit=2)
+    rsp = asyncio.run(c.avideos([f"v{i}" for i in range(60)]))
+
+    assert len(rsp.items) == 60
+    assert c.quota_used == 2
+    with pytest.raises(QuotaExceeded):
+        c.search(c.create_search("surf"))
+    assert len(calls) == 2
+
+
+def _chart_transport(calls, pages=3):
+    with open("tests/youtube_video_response.json", "r") as f:
+        item = json.loads(f.read())["items"][0]
+
+    def handler(request: httpx.Request):
+        page = int(request.url.params.get("pageToken", "0"))
+        calls.append(page)
+        items = [dict(item, id=f"p{page}-{i}") for i in range(5)]
+        data = {"items": items, "pageInfo": {"totalResults": pages * 5}}
+        if page + 1 < pages:
+            data["nextPageToken"] = str(page + 1)
+        return httpx.Response(200, json=data)
+
+    return httpx.MockTransport(handler)
+
+
+def test_apis_youtube_iter_videos():
+    async def _collect(c, **kwargs):
+        return [v.id async for v in c.iter_videos(c.create_video_popular(), **kwargs)]
+
+    calls = []
+    c = youtube.Client(api_key="k", transport=_chart_transport(calls))
+    every = asyncio.run(_collect(c))
+    by_items = asyncio.run(_collect(c, max_items=7))
+    by_quota = asyncio.run(_collect(c, max_quota=1))
+
+    assert len(every) == 15
+    assert every[-1] == "p2-4"
+    assert by_items == every[:7]
+    assert by_quota == every[:5]
+    assert calls == [0, 1, 2, 0, 1, 0]
+
+
+def test_apis_youtube_fast_path():
+    with open("tests/youtube_search_response.json", "r") as f:
+        search = json.loads(f.read())
+    with open("tests/youtube_video_multiple_ids.json", "r") as f:
+        videos = json.loads(f.read())
+    checked = youtube.Client()
+    trusted = youtube.Client(validate=False)
+    columns = youtube.video_columns(videos)
+
+    assert trusted._dict2searchresponse(search) == checked._dict2searchresponse(search)
+    assert trusted._dict2videoresponse(videos) == checked._dict2videoresponse(videos)
+    assert columns["id"] == [v["id"] for v in videos["items"]]
+    assert len(columns) == len(youtube.VideoItem.model_fields)
+    assert youtube.search_columns({"items": []}) == {}
+
+
+def test_apis_youtube_close_async_clients():
+    c = youtube.Client(api_key="key")
+
+    async def _aclient():
+        return c.aclient
+
+    first = asyncio.run(_aclient())
+    second = asyncio.run(_aclient())
+    assert first.is_closed
+    assert not second.is_closed
+
+    c.close()
+    assert second.is_closed
+    assert c._aclient is None
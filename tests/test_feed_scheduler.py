@@ -0,0 +1,97 @@
+import asyncio
+import sqlite3
+
+from datahtml.feed_scheduler import FeedScheduler, FeedState, FeedStore
+from tests import MockCrawler, make_response
+
+FEED = "https://www.youtube.com/feeds/videos.xml?channel_id=UCEbUCwLu8gHSCNVpONOT6pA"
+
+
+def _crawler():
+    with open("tests/youtube_channel_rss.xml", "r") as f:
+        data = f.read()
+
+    def route(url, headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return make_response(url, b"", status_code=304)
+        return make_response(
+            url, data, content_type="application/atom+xml", headers={"etag": '"v1"'}
+        )
+
+    return MockCrawler({FEED: route})
+
+
+def test_feed_scheduler_dedup():
+    c = _crawler()
+    sched = FeedScheduler()
+    sched.add(FEED)
+    first = asyncio.run(sched.poll(c, now=1000.0))
+    second = asyncio.run(sched.poll(c, now=10**6))
+
+    assert len(first) == 15
+    assert len({e.link for e in first}) == 15
+    assert second == []
+    assert c.calls[1][1]["If-None-Match"] == '"v1"'
+
+
+def test_feed_scheduler_backoff():
+    c = _crawler()
+    sched = FeedScheduler(FeedStore(), min_interval=60, max_interval=3600)
+    sched.add(FEED)
+    asyncio.run(sched.poll(c, now=1000.0))
+    s1 = sched.store.get(FEED)
+    asyncio.run(sched.poll(c, now=s1.next_poll))
+    s2 = sched.store.get(FEED)
+
+    assert s2.rate == 0
+    assert s2.interval > s1.interval
+    assert sched.seconds_until_next(now=s2.next_poll) == 0
+    # not due yet
+    assert asyncio.run(sched.poll(c, now=s2.next_poll - 1)) == []
+    assert len(c.calls) == 2
+
+
+def test_feed_scheduler_rate():
+    sched = FeedScheduler(min_interval=60, max_interval=3600)
+    busy = FeedState(url="a", last_poll=0.0)
+    sched._reschedule(busy, new_count=10, now=600.0)
+    assert busy.rate > 0
+    assert busy.interval < 600
+
+
+def _count_seen(store):
+    return store.conn.execute("select count(*) from seen;").fetchone()[0]
+
+
+def test_feed_scheduler_prune_seen():
+    c = _crawler()
+    store = FeedStore()
+    sched = FeedScheduler(store, seen_ttl=3600)
+    sched.add(FEED)
+    asyncio.run(sched.poll(c, now=1000.0))
+    assert _count_seen(store) == 15
+
+    # not modified, the entries are still in the feed
+    assert asyncio.run(sched.poll(c, now=1000.0 + 7200)) == []
+    assert _count_seen(store) == 15
+    # modified but with the same entries
+    sched.store.put(FeedState(url=FEED, next_poll=0.0))
+    assert asyncio.run(sched.poll(c, now=1000.0 + 3 * 7200)) == []
+    assert _count_seen(store) == 15
+
+    assert store.prune(older_than=10**6) == 15
+
+
+def test_feed_store_seen_migration(tmp_path):
+    db = str(tmp_path / "feeds.db")
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "create table seen (key text primary key, feed text, first_seen real);"
+    )
+    conn.execute("insert into seen values ('a', 'f', 10.0);")
+    conn.commit()
+    conn.close()
+    store = FeedStore(db)
+
+    assert store.add_unseen("f", ["a", "b"], now=20.0) == ["b"]
+    assert store.prune(older_than=15.0) == 0
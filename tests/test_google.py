@@ -1,4 +1,7 @@
-from datahtml import google
+import asyncio
+
+from datahtml import errors, google
+from tests import MockCrawler, make_response
 
 
 def test_transform_search():
@@ -6,3 +9,50 @@ def test_transform_search():
         data = f.read()
     parsed = google.transform_result(data)
     assert isinstance(parsed, google.SearchResult)
+
+
+def test_google_transform_result():
+    with open("tests/google_search.html", "r") as f:
+        data = f.read()
+    parsed = google.transform_result(data)
+    urls = google.transform_result_simple(data)
+
+    assert len(parsed.links) == 34
+    assert len(parsed.related) == len(set(parsed.related)) == 16
+    assert "PSG" in parsed.related
+    assert all(google._valid_url(l.url) for l in parsed.links)
+    assert not any("google.com" in u for u in urls)
+    assert google._valid_url("https://news.example.com/a?q=1")
+    assert not google._valid_url("https://www.google.com.ar/search")
+    assert not google._valid_url("https://fonts.gstatic.com/s")
+    assert not google._valid_url("/search?q=x")
+    assert google.transform_result(" \n") == google.SearchResult(links=[], related=[])
+
+
+def test_google_search_many():
+    html = """<a href="/url?q=https://a.com/1">a</a>
+    <a href="/url?q=https://b.com/{q}">b</a>
+    <a href="/search?q=more+{q}">more</a>"""
+
+    def route(url, headers):
+        q = url.split("q=")[1].split("&")[0]
+        if q == "blocked":
+            raise errors.CrawlHTTPError(url)
+        return make_response(url, html.format(q=q))
+
+    c = MockCrawler(default=route)
+    results = google.search_many(
+        ["one", "blocked", "two", "one"], crawler=c, lang="es"
+    )
+    same = asyncio.run(google.asearch_many(["one", "blocked", "two"], crawler=c))
+
+    assert list(results) == ["one", "two"]
+    assert [l.url for l in results["one"].links] == [
+        "https://a.com/1",
+        "https://b.com/one",
+    ]
+    assert [l.url for l in results["two"].links] == ["https://b.com/two"]
+    assert results["two"].related == ["more two"]
+    assert [l.url for l in same["two"].links] == ["https://b.com/two"]
+    assert list(same) == ["one", "two"]
+    assert len(c.calls) == 6
@@ -1,5 +1,16 @@
-from datahtml.google_trends import parse_entries, GoogleTrend
+import asyncio
+
+import pytest
+
+from datahtml.google_trends import (
+    GoogleTrend,
+    adownload_many,
+    download_many,
+    parse_entries,
+    parse_feed,
+)
 from datahtml.parsers import text2soup
+from tests import MockCrawler, make_response
 
 
 def test_google_trends_parse():
@@ -9,3 +20,41 @@ def test_google_trends_parse():
     soup = text2soup(data)
     trends = parse_entries(soup)
     assert isinstance(trends[0], GoogleTrend)
+
+
+def test_google_trends_parse_feed():
+    with open("tests/google_trends_rss.xml", "rb") as f:
+        data = f.read()
+
+    trends = parse_feed(data)
+
+    assert trends == parse_entries(text2soup(data.decode("utf-8")))
+    assert trends[0].title == "Boca vs Colo Colo"
+    assert trends[0].aprox_traffic == "100,000+"
+    assert trends[0].picture.startswith("https://t2.gstatic.com")
+    assert trends[0].news[0].source
+    assert trends[0].pubdate.year == 2023
+    with pytest.raises(ValueError):
+        parse_feed("<html><body><item>x</item></body></html>")
+
+
+def test_google_trends_download_many():
+    with open("tests/google_trends_rss.xml", "rb") as f:
+        data = f.read()
+
+    def route(url, headers):
+        if url.endswith("XX"):
+            return make_response(url, "<html><p>not found", status_code=200)
+        if url.endswith("YY"):
+            # well formed, but not a feed
+            return make_response(url, "<consent><form/></consent>")
+        return make_response(url, data, content_type="application/rss+xml")
+
+    c = MockCrawler(default=route)
+    lists = download_many(["ar", "XX", "br", "YY", "AR"], crawler=c)
+    same = asyncio.run(adownload_many(["ar", "br"], crawler=c))
+
+    assert [t.geo for t in lists] == ["AR", "BR"]
+    assert len(lists[0].trends) == 20
+    assert [t.geo for t in same] == ["AR", "BR"]
+    assert len(c.calls) == 6
@@ -41,3 +41,22 @@ def test_parsers_text_from_link():
     assert "argentinos" in u5
     assert "reproches" in u6
     assert "derecho" in u7
+
+
+def test_parsers_key_index():
+    data = {
+        "a": {"country": 1, "items": [{"country": 2}, {"b": {"country": 3}}]},
+        "country": 4,
+        "other": [[{"name": "x"}]],
+    }
+    ix = parsers.KeyIndex(data, with_paths=True)
+    only = parsers.KeyIndex(data, keys=["name"])
+
+    assert ix.get("country") == list(parsers.findkeys(data, "country"))
+    assert ix.first("name") == "x"
+    assert ix.first("missing", "default") == "default"
+    assert ix.paths("name") == [("other", 0, 0, "name")]
+    assert ix.get("country") == [4, 1, 2, 3]
+    assert ix.resolve(ix.paths("country")[3]) == 3
+    assert only.keys() == ["name"]
+    assert "country" not in only
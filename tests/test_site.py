@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from datahtml import errors, site
+from datahtml.site_snapshot import SnapshotStore
+from tests import MockCrawler, make_response
+
+ROOT = "https://www.example.com"
+
+HOME = """<html><body>
+<a href="/politica/nota-uno">Nota uno</a>
+<a href="/economia/nota-dos"></a>
+<a href="https://other.com/x">Other</a>
+</body></html>"""
+
+ROBOTS = "User-agent: *\nSitemap: https://www.example.com/sitemap.xml\n"
+
+SITEMAP = """<?xml version="1.0"?>
+<urlset><url><loc>https://www.example.com/economia/nota-dos</loc>
+<lastmod>2023-07-01</lastmod></url>
+<url><loc>https://www.example.com/deportes/nota-tres</loc>
+<lastmod>2023-07-02</lastmod></url></urlset>"""
+
+FEED = """<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>
+<item><link>https://www.example.com/deportes/nota-tres</link><title>Tres</title></item>
+<item><link>https://www.example.com/mundo/nota-cuatro</link><title>Cuatro</title></item>
+</channel></rss>"""
+
+
+class SlowCrawler(MockCrawler):
+    async def aget(self, url, headers=None, timeout_secs=60):
+        if url.endswith("robots.txt"):
+            await asyncio.sleep(10)
+        return self.get(url, headers=headers, timeout_secs=timeout_secs)
+
+
+def _routes():
+    return {
+        ROOT: make_response(ROOT, HOME),
+        f"{ROOT}/robots.txt": make_response("", ROBOTS, content_type="text/plain"),
+        f"{ROOT}/sitemap.xml": make_response("", SITEMAP, content_type="text/xml"),
+        f"{ROOT}/rss": make_response("", FEED, content_type="application/rss+xml"),
+    }
+
+
+def test_site_aextract_links():
+    c = MockCrawler(_routes())
+    sync = site.extract_links(ROOT, c, from_rss=f"{ROOT}/rss", from_sitemap=True)
+    links = asyncio.run(
+        site.aextract_links(ROOT, c, from_rss=f"{ROOT}/rss", from_sitemap=True)
+    )
+    by_url = {l.urlnorm: l for l in links}
+
+    assert sorted(links, key=lambda l: l.urlnorm) == sorted(
+        sync, key=lambda l: l.urlnorm
+    )
+    assert by_url["www.example.com/economia/nota-dos"].source == "html"
+    assert by_url["www.example.com/economia/nota-dos"].lastmod == "2023-07-01"
+    assert by_url["www.example.com/deportes/nota-tres"].source == "sitemap"
+    assert by_url["www.example.com/mundo/nota-cuatro"].title == "Cuatro"
+
+
+def test_site_aextract_links_wait_for():
+    c = SlowCrawler(_routes())
+    links = asyncio.run(
+        asyncio.wait_for(
+            site.aextract_links(
+                ROOT,
+                c,
+                from_rss=f"{ROOT}/rss",
+                from_sitemap=True,
+                wait_for={"html", "rss"},
+            ),
+            timeout=5,
+        )
+    )
+    assert {l.source for l in links} == {"html", "rss"}
+
+
+def test_site_extract_links_snapshot():
+    routes = _routes()
+    c = MockCrawler(routes)
+    store = SnapshotStore()
+    first = site.extract_links(ROOT, c, snapshot=store)
+    second = site.extract_links(ROOT, c, snapshot=store)
+    routes[ROOT] = make_response(
+        ROOT, HOME.replace("Nota uno", "Nota uno editada") + '<a href="/nueva">N</a>'
+    )
+    third = site.extract_links(ROOT, c, snapshot=store)
+
+    assert len(first) == 2
+    assert second == []
+    assert {l.urlnorm for l in third} == {
+        "www.example.com/politica/nota-uno",
+        "www.example.com/nueva",
+    }
+    assert store.count("example.com") == 3
+    assert store.get("example.com", "www.example.com/nueva").source == "html"
+
+
+def test_site_aextract_links_failed_source():
+    routes = _routes()
+    del routes[f"{ROOT}/rss"]
+    c = MockCrawler(routes)
+
+    links = asyncio.run(
+        site.aextract_links(ROOT, c, from_rss=f"{ROOT}/rss", wait_for={"html"})
+    )
+    assert {l.source for l in links} == {"html"}
+
+    with pytest.raises(errors.CrawlHTTPError):
+        asyncio.run(site.aextract_links(ROOT, c, from_rss=f"{ROOT}/rss"))
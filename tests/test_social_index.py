@@ -0,0 +1,67 @@
+import pytest
+
+from datahtml import wikidata
+from datahtml.social_index import SocialIndex, entity_keys, url_key
+from datahtml.web import WebDocument
+from tests.test_wikidata import _entity
+
+ENTITIES = [
+    _entity(
+        "Q1",
+        P2002=["LaNacion"],
+        P2003=["lanacioncom"],
+        P856=["https://www.lanacion.com.ar/"],
+    ),
+    _entity("Q2", P2397=["UCabcDEF"], P2013=["Clarin.com"]),
+    _entity("Q3", P856=["https://lanacion.com.ar"]),
+]
+
+HTML = """<html><body>
+<a href="https://twitter.com/lanacion">tw</a>
+<a href="https://twitter.com/lanacion">footer</a>
+<a href="https://www.instagram.com/LaNacionCom/?hl=es">ig</a>
+<a href="https://www.youtube.com/channel/UCabcDEF">yt</a>
+<a href="https://www.youtube.com/channel/UCABCDEF">other</a>
+<a href="https://www.facebook.com/sharer.php?u=x">share</a>
+<a href="https://www.facebook.com/clarin.com/">fb</a>
+</body></html>"""
+
+
+def test_social_index_lookup():
+    ix = SocialIndex()
+    added = ix.add_entities(
+        [
+            ENTITIES[0],
+            wikidata._entity_from_dict(ENTITIES[1]),
+            wikidata.extract_extra(ENTITIES[2]),
+        ]
+    )
+    w = WebDocument("https://www.example.com", html_txt=HTML)
+
+    found = ix.lookup_many(w.social_urls())
+
+    assert added == len(ix) == 6
+    assert url_key("https://x.com/LaNacion/status/1") == "twitter:lanacion"
+    assert url_key("https://es-la.facebook.com/Clarin.com/") == "fb:clarin.com"
+    assert url_key("https://m.facebook.com/profile.php?id=123") == "fb:123"
+    assert url_key("https://www.facebook.com/profile.php") is None
+    assert url_key("https://www.youtube.com/@lanacion") is None
+    assert ix.lookup("https://lanacion.com.ar/politica") == ["Q1", "Q3"]
+    assert found == {
+        "https://twitter.com/lanacion": ["Q1"],
+        "https://www.instagram.com/LaNacionCom": ["Q1"],
+        "https://www.youtube.com/channel/UCabcDEF": ["Q2"],
+        "https://www.facebook.com/clarin.com": ["Q2"],
+    }
+    ix.remove_entity("Q3")
+    assert ix.lookup("https://lanacion.com.ar") == ["Q1"]
+
+
+def test_social_index_entity_keys():
+    extra = wikidata.extract_extra(ENTITIES[1])
+    light = wikidata._entity_from_dict(ENTITIES[1])
+    light.raw = {}
+
+    assert entity_keys(extra) == ["fb:clarin.com", "yt:UCabcDEF"]
+    with pytest.raises(ValueError):
+        entity_keys(light)
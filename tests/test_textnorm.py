@@ -0,0 +1,24 @@
+from datahtml import textnorm
+
+
+def test_textnorm_norm_words():
+    texts = [
+        "Dólar hoy: a cuánto cotiza",
+        "a_b[c]^d`e\\f",
+        "Ελλάδα  Москва 北京",
+        "",
+    ]
+    results = [textnorm.norm_words(t) for t in texts]
+
+    assert results[0] == "Dolar hoy a cuanto cotiza"
+    # the old regex let [\]^_` through
+    assert results[1] == "a b c d e f"
+    assert results == [textnorm.norm_words_re(t) for t in texts]
+    assert textnorm.norm_words(results[0] * 20) == textnorm.norm_words_re(results[0] * 20)
+
+
+def test_textnorm_norm_many():
+    texts = ["Valdés afirmó", "with\x00separator", "", "Ocampo"]
+    assert textnorm.norm_many(texts) == ["Valdes afirmo", "with separator", "", "Ocampo"]
+    assert textnorm.norm_many(iter(texts)) == [textnorm.norm_words(t) for t in texts]
+    assert textnorm.norm_many([]) == []
@@ -0,0 +1,206 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from datahtml.url_index import SearchLink, URLIndex
+
+LINKS = [
+    ("https://www.infobae.com/politica/valdes-paraguay-pescadores", "Valdés afirmó que Paraguay hostiga a pescadores"),
+    ("https://www.infobae.com/leamos/victoria-ocampo-presa", "Los días que Victoria Ocampo estuvo presa"),
+    ("https://www.lanacion.com.ar/economia/dolar-hoy", "Dólar hoy: a cuánto cotiza"),
+]
+
+
+def _links():
+    return (SearchLink.parse(url, text) for url, text in LINKS)
+
+
+def test_url_index_bulk_load(tmp_path):
+    ix = URLIndex(str(tmp_path / "index.db"))
+    total = ix.bulk_load(_links())
+    # duplicated urls are ignored and tables are already created
+    ix.build(_links())
+
+    rows = ix.conn.execute("select count(*) from content").fetchone()
+    mode = ix.conn.execute("PRAGMA journal_mode").fetchone()
+    assert total == 3
+    assert rows[0] == 3
+    assert mode[0] == "wal"
+    assert ix.search("pescadores")[0].url.domain_base == "infobae.com"
+    assert ix.search("dolar", domain="lanacion.com.ar")
+
+
+def test_url_index_add():
+    ix = URLIndex()
+    ix.bulk_load(_links(), defer_fts=False)
+    ix.add(SearchLink.parse("https://www.infobae.com/sociedad/lluvias", "Alerta por lluvias"))
+
+    assert ix.search("lluvias")[0].text == "Alerta por lluvias"
+    assert len(ix.search("presa")) == 1
+
+
+def test_url_index_search_many():
+    ix = URLIndex()
+    ix.build(_links())
+    results = ix.search_many(["pescadores", "Victoria's Ocampo", "not or found"])
+    by_domain = ix.search("dolar", domain="lanacion.com.ar' or '1'='1")
+
+    assert results[0][0].url.url_short == "www.infobae.com/politica/valdes-paraguay-pescadores"
+    assert results[0][0].url.www
+    assert results[1] == []
+    assert results[2] == []
+    assert by_domain == []
+    assert ix.search("Victoria Ocampo") == ix.search("victoria ocampo")
+
+
+def test_url_index_search_cache():
+    ix = URLIndex(cache_size=2)
+    ix.build(_links())
+    assert ix.search("lluvias") == []
+    ix.add(SearchLink.parse("https://www.infobae.com/sociedad/lluvias", "Lluvias"))
+    assert len(ix.search("lluvias")) == 1
+
+
+def test_url_index_legacy_table(tmp_path):
+    db = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "CREATE TABLE content (id INTEGER PRIMARY KEY,url TEXT NOT NULL UNIQUE, text TEXT, domain TEXT);"
+    )
+    conn.execute(
+        "insert into content (url, text, domain) values (?, ?, ?)",
+        (LINKS[0][0], "hostiga a pescadores", "infobae.com"),
+    )
+    conn.commit()
+    conn.close()
+    ix = URLIndex(db)
+    ix.conn.execute("INSERT INTO search_ix(search_ix) VALUES('rebuild');")
+
+    assert ix.search("pescadores")[0].url.domain_base == "infobae.com"
+
+
+def test_url_index_readers(tmp_path):
+    db = str(tmp_path / "index.db")
+    writer = URLIndex(db)
+    writer.build(_links())
+    ix = URLIndex(db, readers=3, cache_size=0)
+    queries = ["pescadores", "ocampo", "dolar"] * 20
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(ix.search, queries))
+    aresults = asyncio.run(ix.asearch_many(queries))
+
+    assert [len(r) for r in results] == [1] * len(queries)
+    assert aresults == results
+    assert 1 <= len(ix._pool_conns) <= 3
+    ix.close()
+
+
+def test_url_index_cache_other_writer(tmp_path):
+    db = str(tmp_path / "index.db")
+    writer = URLIndex(db)
+    writer.build(_links())
+    ix = URLIndex(db, readers=2)
+
+    assert ix.search("lluvias") == []
+    writer.add(
+        SearchLink.parse("https://www.infobae.com/sociedad/lluvias", "Alerta por lluvias")
+    )
+
+    assert len(ix.search("lluvias")) == 1
+    ix.close()
+    writer.close()
+
+
+def test_url_index_cache_race():
+    ix = URLIndex(cache_size=10)
+    ix.build(_links())
+    query = ix._query
+
+    def racing_query(*args):
+        rows = query(*args)
+        # a write committed and cleared the cache during the query
+        ix._cache_clear()
+        return rows
+
+    ix._query = racing_query
+    assert len(ix.search("pescadores")) == 1
+    assert len(ix._cache) == 0
+
+
+def test_url_index_file_uri(tmp_path):
+    uri = f"{(tmp_path / 'index.db').as_uri()}?cache=private"
+    writer = URLIndex(uri)
+    writer.build(_links())
+    ix = URLIndex(uri, readers=2, shared_cache=True)
+
+    assert len(ix.search("pescadores")) == 1
+    assert (tmp_path / "index.db").exists()
+    with pytest.raises(ValueError):
+        URLIndex("file:memdb?mode=memory", readers=2)
+    ix.close()
+    writer.close()
+
+
+def test_url_index_search_modes(tmp_path):
+    ix = URLIndex(str(tmp_path / "index.db"), prefix=(2, 3), trigram=True)
+    ix.bulk_load(_links())
+    ix.add(SearchLink.parse("https://www.infobae.com/sociedad/lluvias", "Alerta por lluvias"))
+
+    assert ix.search("pesca") == []
+    assert ix.search("pesca", mode="prefix")[0].url.path.endswith("pescadores")
+    fuzzy = ix.search("pescadore paraguai", mode="fuzzy")
+    assert fuzzy[0].url.path.endswith("pescadores")
+    # exact matches come first
+    assert ix.search("lluvias", mode="fuzzy")[0].text == "Alerta por lluvias"
+    with pytest.raises(ValueError):
+        URLIndex().search("lluvias", mode="fuzzy")
+    with pytest.raises(ValueError):
+        ix.search("lluvias", mode="regex")
+
+
+
+def test_url_index_bulk_load_trigram(tmp_path):
+    db = str(tmp_path / "index.db")
+    URLIndex(db, trigram=True).close()
+    ix = URLIndex(db)
+    ix.bulk_load(_links())
+    ix.add(SearchLink.parse("https://www.infobae.com/sociedad/lluvias", "Alerta por lluvias"))
+    ix.close()
+
+    ix = URLIndex(db, trigram=True)
+    assert ix.search("paraguai", mode="fuzzy")[0].url.path.endswith("pescadores")
+    assert ix.search("luvias", mode="fuzzy")[0].text == "Alerta por lluvias"
+    ix.close()
+
+def test_url_index_upsert(tmp_path):
+    ix = URLIndex(str(tmp_path / "index.db"), trigram=True)
+    ix.bulk_load(_links())
+    url = LINKS[0][0]
+    with pytest.raises(sqlite3.IntegrityError):
+        ix.add(SearchLink.parse(url, "otro texto"))
+
+    total = ix.upsert_many(
+        [
+            SearchLink.parse(url, "Valdés habló de los pesqueros"),
+            SearchLink.parse(LINKS[1][0], LINKS[1][1]),
+            SearchLink.parse("https://www.clarin.com/politica/nota", "Nota nueva"),
+        ],
+        now=2000.0,
+    )
+    ix.upsert(SearchLink.parse(LINKS[2][0], LINKS[2][1]), now=1000.0)
+
+    assert total == 3
+    assert ix.search("pescadores") == []
+    assert ix.search("pesqueros")[0].url.fullurl == url
+    assert ix.search("pesqueros", mode="fuzzy")[0].url.fullurl == url
+    assert len(ix.search("Ocampo")) == 1
+    assert ix.expire(older_than=1500.0) == 1
+    assert ix.search("dolar") == []
+    assert ix.delete_domain("infobae.com") == 2
+    assert ix.search("pesqueros") == []
+    assert ix.search("nueva")[0].url.domain_base == "clarin.com"
+    with pytest.raises(ValueError):
+        ix.expire()
@@ -0,0 +1,69 @@
+import pytest
+
+from datahtml.url_index import SearchLink, URLIndex
+
+np = pytest.importorskip("numpy")
+
+from datahtml.url_index_numpy import NumpyURLIndex  # noqa: E402
+
+LINKS = [
+    ("https://www.infobae.com/politica/a", "Valdés afirmó que Paraguay hostiga a pescadores"),
+    ("https://www.infobae.com/economia/b", "El dólar hoy: a cuánto cotiza el dólar blue"),
+    ("https://www.lanacion.com.ar/economia/c", "Dólar hoy en Argentina"),
+    ("https://www.lanacion.com.ar/politica/d", "Paraguay y Argentina, tensión por los pescadores"),
+    ("https://www.clarin.com/deportes/e", "Messi volvió a jugar en Argentina"),
+]
+
+
+def _links():
+    return [SearchLink.parse(u, t) for u, t in LINKS]
+
+
+@pytest.mark.parametrize("scoring", ["bm25", "tfidf"])
+def test_url_index_numpy_same_matches(scoring):
+    ix = NumpyURLIndex(scoring=scoring)
+    ix.build(_links())
+    sq = URLIndex()
+    sq.build(_links())
+    queries = ["dolar", "Paraguay pescadores", "argentina", "inexistente", "dolar blue"]
+
+    for q in queries:
+        got = {l.url.fullurl for l in ix.search(q, top_n=10)}
+        expected = {l.url.fullurl for l in sq.search(q, top_n=10)}
+        assert got == expected
+    assert [len(r) for r in ix.search_many(queries, top_n=1)] == [1, 1, 1, 0, 1]
+
+
+def test_url_index_numpy_ranking():
+    ix = NumpyURLIndex(batch_size=2)
+    ix.build(_links())
+    ix.add(SearchLink.parse("https://www.clarin.com/f", "Argentina Argentina Argentina"))
+    many = ix.search_many(["argentina", "dolar", "argentina"], top_n=2)
+
+    assert many[0][0].url.fullurl == "https://www.clarin.com/f"
+    assert many[0] == many[2] == ix.search("argentina", top_n=2)
+    assert many[1][0].url.fullurl == "https://www.infobae.com/economia/b"
+    assert [l.url.domain_base for l in ix.search("dolar", domain="lanacion.com.ar")] == [
+        "lanacion.com.ar"
+    ]
+    assert ix.search("dolar", domain="unknown.com") == []
+    # duplicated urls are ignored
+    assert ix.bulk_load(_links()) == 0
+    assert len(ix) == 6
+
+
+def test_url_index_numpy_ties():
+    texts = ["dolar hoy", "dolar blue", "dolar hoy", "dolar oficial", "dolar hoy"]
+    ix = NumpyURLIndex()
+    ix.build(
+        SearchLink.parse(f"https://www.infobae.com/{i}", t) for i, t in enumerate(texts)
+    )
+    queries = ["dolar", "hoy", "dolar hoy"]
+    many = ix.search_many(queries, top_n=2)
+
+    for q, links in zip(queries, many):
+        # a single query takes another path
+        assert ix.search(q, top_n=2) == links
+    # same score, the first added comes first
+    assert [l.url.path for l in many[0]] == ["/0", "/1"]
+    assert [l.url.path for l in many[1]] == ["/0", "/2"]
@@ -0,0 +1,47 @@
+from datahtml.url_index import SearchLink, URLIndex
+from datahtml.url_index_sharded import ShardedURLIndex, shard_for
+
+DOMAINS = ["infobae.com", "lanacion.com.ar", "clarin.com", "pagina12.com.ar"]
+
+
+def _links():
+    for d in DOMAINS:
+        for i in range(5):
+            yield SearchLink.parse(
+                f"https://www.{d}/nota-{i}", f"Noticia {i} sobre el dolar en {d}"
+            )
+
+
+def _count(ix: URLIndex) -> int:
+    return ix.conn.execute("select count(*) from content").fetchone()[0]
+
+
+def test_url_index_sharded(tmp_path):
+    ix = ShardedURLIndex(str(tmp_path / "ix"), shards=3)
+    total = ix.bulk_load(_links())
+
+    assert total == 20
+    assert sum(_count(s) for s in ix.shards) == 20
+    for d in DOMAINS:
+        shard = ix.shards[shard_for(d, 3)]
+        assert {l.url.domain_base for l in shard.search("dolar", top_n=20)} >= {d}
+        found = ix.search("dolar", domain=d, top_n=10)
+        assert len(found) == 5
+        assert {l.url.domain_base for l in found} == {d}
+
+    assert len(ix.search("dolar", top_n=7)) == 7
+    assert len(ix.search_many(["dolar", "noticia"], top_n=20)[1]) == 20
+    ix.close()
+
+
+def test_url_index_sharded_rebuild(tmp_path):
+    ix = ShardedURLIndex(str(tmp_path / "ix"), shards=2)
+    ix.build(_links())
+    number = ix.shard_number("infobae.com")
+    before = _count(ix.shards[number])
+    added = ix.rebuild_shard(number, _links())
+    ix.add(SearchLink.parse("https://www.infobae.com/nueva", "Nueva nota"))
+
+    assert added == before
+    assert ix.search("nueva", domain="infobae.com")
+    ix.close()
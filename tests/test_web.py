@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from datahtml import web
+from tests import MockCrawler, make_response
+
+
+@pytest.fixture(autouse=True)
+def _feeds_cache():
+    web.clear_feeds_cache()
+    yield
+    web.clear_feeds_cache()
+
+HOME_ALTERNATE = """<html><head>
+<link rel="alternate" type="application/rss+xml" href="/feed.xml">
+</head><body><a href="/rss">RSS</a></body></html>"""
+
+HOME = """<html><head></head>
+<body><a href="/rss">RSS</a><a href="/politica">Politica</a></body></html>"""
+
+RSS_INDEX = """<html><body>
+<a href="https://www.example.com/rss/politica.xml">Politica</a>
+</body></html>"""
+
+FEED = """<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>
+<item><link>https://www.example.com/a</link><title>a</title></item>
+</channel></rss>"""
+
+
+def _crawler(home):
+    return MockCrawler(
+        {
+            "https://www.example.com": make_response("", home),
+            "https://www.example.com/feed.xml": make_response(
+                "", FEED, content_type="application/rss+xml"
+            ),
+            # without content-type
+            "https://www.example.com/rss": make_response(
+                "", RSS_INDEX, headers={"content-type": ""}
+            ),
+            "https://www.example.com/rss/politica.xml": make_response(
+                "", FEED, content_type="text/plain"
+            ),
+        }
+    )
+
+
+def test_web_find_rss_links_alternate():
+    c = _crawler(HOME_ALTERNATE)
+    w = web.download("https://www.example.com", crawler=c)
+    links = web.find_rss_links(w.url.fullurl, crawler=c, web=w, cache_ttl=None)
+
+    assert [l.url for l in links] == ["https://www.example.com/feed.xml"]
+    assert len(links[0].parse()) == 1
+    assert [x[0] for x in c.calls] == [
+        "https://www.example.com",
+        "https://www.example.com/feed.xml",
+    ]
+
+
+def test_web_find_rss_links_second_level():
+    c = _crawler(HOME)
+    links = asyncio.run(
+        web.afind_rss_links("https://www.example.com", crawler=c, cache_ttl=None)
+    )
+    assert [l.url for l in links] == ["https://www.example.com/rss/politica.xml"]
+
+
+def test_web_find_rss_links_cache():
+    c = _crawler(HOME)
+    w = web.download("https://www.example.com", crawler=c)
+    web.find_rss_links(w.url.fullurl, crawler=c, web=w)
+    c.calls.clear()
+    links = web.find_rss_links(w.url.fullurl, crawler=c, web=w)
+
+    assert [l.url for l in links] == ["https://www.example.com/rss/politica.xml"]
+    assert [x[0] for x in c.calls] == ["https://www.example.com/rss/politica.xml"]
+
+
+def test_web_find_rss_links_cache_fallback():
+    c = _crawler(HOME)
+    w = web.download("https://www.example.com", crawler=c)
+    web.find_rss_links(w.url.fullurl, crawler=c, web=w)
+    # the cached feed moved
+    del c.routes["https://www.example.com/rss/politica.xml"]
+    c.routes["https://www.example.com/rss"] = make_response(
+        "", FEED, content_type="application/rss+xml"
+    )
+    links = web.find_rss_links(w.url.fullurl, crawler=c, web=w)
+
+    assert [l.url for l in links] == ["https://www.example.com/rss"]
+    assert list(web._FEEDS_CACHE["example.com"][1]) == ["https://www.example.com/rss"]
+
+
+def test_web_find_rss_links_cache_empty():
+    c = MockCrawler({"https://www.example.com": make_response("", "<html></html>")})
+    w = web.download("https://www.example.com", crawler=c)
+
+    assert web.find_rss_links(w.url.fullurl, crawler=c, web=w) == []
+    assert "example.com" not in web._FEEDS_CACHE
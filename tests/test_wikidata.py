@@ -0,0 +1,100 @@
+import asyncio
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from datahtml import errors, wikidata
+from tests import MockCrawler, make_response
+
+
+def _entity(id_, **claims):
+    return {
+        "id": id_,
+        "pageid": int(id_[1:]),
+        "modified": "2023-01-01T00:00:00Z",
+        "lastrevid": int(id_[1:]) * 10,
+        "labels": {"en": {"language": "en", "value": f"label {id_}"}},
+        "descriptions": {"en": {"language": "en", "value": f"desc {id_}"}},
+        "aliases": {},
+        "claims": {
+            prop: [
+                {"mainsnak": {"datavalue": {"value": v}}} for v in values
+            ]
+            for prop, values in claims.items()
+        },
+    }
+
+
+def _crawler(entities):
+    def route(url, headers):
+        params = parse_qs(urlparse(url).query)
+        ids = params["ids"][0].split("|")
+        data = {
+            "entities": {
+                i: entities.get(i, {"id": i, "missing": ""}) for i in ids
+            }
+        }
+        return make_response(url, json.dumps(data), content_type="application/json")
+
+    return MockCrawler(default=route)
+
+
+ENTITIES = {
+    f"Q{i}": _entity(f"Q{i}", P31=[{"id": "Q5"}], P21=[{"id": "Q6581072"}])
+    for i in range(1, 121)
+}
+ENTITIES["Q5"]["claims"] = {}
+
+
+def test_wikidata_get_entities():
+    c = _crawler(ENTITIES)
+    ids = ["Q3", "Q1", "Q999"] + [f"Q{i}" for i in range(1, 121)]
+    entities = wikidata.get_entities(ids, crawler=c)
+    same = asyncio.run(wikidata.aget_entities(ids, crawler=c))
+    one = wikidata.get_entity("Q2", crawler=c)
+
+    assert [e.id for e in entities[:2]] == ["Q3", "Q1"]
+    assert len(entities) == 120
+    assert [e.id for e in same] == [e.id for e in entities]
+    # 121 unique ids in 3 requests for each call
+    assert len(c.calls) == 7
+    assert one.instance_of == ["Q5"]
+    assert one.image is None
+
+
+def test_wikidata_get_entities_errors():
+    ids = [f"Q{i}" for i in range(1, 121)]
+    ok = _crawler(ENTITIES).default
+
+    def route(url, headers):
+        if "Q51%7C" in url:
+            return make_response(url, "", status_code=503)
+        return ok(url, headers)
+
+    c = MockCrawler(default=route)
+    with pytest.raises(errors.CrawlingError):
+        wikidata.get_entities(ids, crawler=c)
+    with pytest.raises(errors.CrawlingError):
+        asyncio.run(wikidata.aget_entities(ids, crawler=c))
+
+    invalid = {"error": {"code": "no-such-entity", "info": "Invalid id: X1"}}
+    c = MockCrawler(
+        default=lambda url, _: make_response(
+            url, json.dumps(invalid), content_type="application/json"
+        )
+    )
+    with pytest.raises(errors.WikidataAPIError, match="no-such-entity"):
+        wikidata.get_entities(["Q1", "X1"], crawler=c)
+    with pytest.raises(errors.WikidataAPIError):
+        asyncio.run(wikidata.aget_entities(["Q1", "X1"], crawler=c))
+
+def test_wikidata_resolve_labels():
+    c = _crawler(ENTITIES)
+    refs = wikidata.claim_ids(ENTITIES["Q1"])
+    labels = wikidata.resolve_labels(refs | {"Q999"}, crawler=c)
+
+    assert refs == {"Q5", "Q6581072"}
+    assert labels == {"Q5": "label Q5"}
+    assert "props=labels" in c.calls[0][0]
+    assert asyncio.run(wikidata.aresolve_labels(refs, crawler=c)) == labels
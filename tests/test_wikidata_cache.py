@@ -0,0 +1,52 @@
+import asyncio
+import copy
+
+from datahtml.wikidata_cache import WikidataCache
+from tests.test_wikidata import ENTITIES, _crawler
+
+
+def test_wikidata_cache_revalidate():
+    entities = copy.deepcopy(ENTITIES)
+    c = _crawler(entities)
+    cache = WikidataCache(ttl=60)
+    ids = ["Q3", "Q1", "Q999"] + [f"Q{i}" for i in range(1, 61)]
+
+    first = cache.get_entities(ids, crawler=c, now=1000)
+    assert [e.id for e in first[:2]] == ["Q3", "Q1"]
+    # Q999 is remembered as missing
+    assert len(cache) == 61
+    assert cache.stats.fetched == 60
+
+    # fresh, no requests
+    c.calls.clear()
+    again = cache.get_entities(ids, crawler=c, now=1030)
+    assert [e.dict() for e in again] == [e.dict() for e in first]
+    assert not c.calls
+
+    # stale, only Q2 changed
+    entities["Q2"]["lastrevid"] += 1
+    entities["Q2"]["labels"]["en"]["value"] = "new"
+    c.calls.clear()
+    stale = cache.get_entities(ids, crawler=c, now=2000)
+    info = [u for u, _ in c.calls if "props=info" in u]
+    assert len(info) == 2
+    assert cache.stats.revalidated == 59
+    assert cache.get_entity("Q2", crawler=c, now=2000).label == "new"
+    assert [e.id for e in stale] == [e.id for e in first]
+
+    extras = asyncio.run(cache.aget_entities(["Q4"], crawler=c, now=5000))
+    assert extras[0].id == "Q4"
+    assert cache.get_extras(["Q4"], crawler=c, now=5000)[0].gender == "female"
+
+
+def test_wikidata_cache_eviction():
+    c = _crawler(ENTITIES)
+    cache = WikidataCache(max_entities=10)
+    cache.get_entities(["Q1", "Q2"], crawler=c, now=1)
+    cache.get_entities([f"Q{i}" for i in range(3, 12)], crawler=c, now=2)
+
+    assert len(cache) == 10
+    assert cache.stats.evicted == 1
+    c.calls.clear()
+    cache.get_entities(["Q2"], crawler=c, now=3)
+    assert not c.calls
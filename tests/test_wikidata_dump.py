@@ -0,0 +1,48 @@
+import bz2
+import gzip
+import json
+
+from datahtml.wikidata_dump import read_dump
+from tests.test_wikidata import _entity
+
+
+def _dump(path, entities, opener=gzip.open):
+    with opener(path, "wt", encoding="utf-8") as f:
+        f.write("[\n")
+        f.write(",\n".join(json.dumps(e) for e in entities))
+        f.write("\n]\n")
+    return str(path)
+
+
+ENTITIES = [
+    _entity("Q1", P31=[{"id": "Q5"}], P2002=["one"]),
+    _entity("Q2", P31=[{"id": "Q6256"}]),
+    # Q5 is in the line but it isn't an instance of it
+    _entity("Q3", P31=[{"id": "Q1110794"}], P17=[{"id": "Q5"}], P2002=["three"]),
+    _entity("Q4", P31=[{"id": "Q5"}], P21=[{"id": "Q6581072"}]),
+]
+
+
+def test_wikidata_dump_read(tmp_path):
+    path = _dump(tmp_path / "dump.json.gz", ENTITIES)
+
+    all_ = list(read_dump(path, processes=0))
+    persons = list(read_dump(path, instance_of=["Q5"], processes=2, chunksize=1))
+    twitter = list(read_dump(path, props=["P2002"], extra=True, processes=0))
+    unordered = read_dump(path, instance_of=["Q5"], ordered=False, processes=2)
+
+    assert [e.id for e in all_] == ["Q1", "Q2", "Q3", "Q4"]
+    assert [e.id for e in persons] == ["Q1", "Q4"]
+    assert persons[0].label == "label Q1"
+    assert sorted(e.id for e in unordered) == ["Q1", "Q4"]
+    assert [(e.id, e.twitter) for e in twitter] == [("Q1", ["one"]), ("Q3", ["three"])]
+
+
+def test_wikidata_dump_bz2(tmp_path):
+    path = _dump(tmp_path / "dump.json.bz2", ENTITIES, opener=bz2.open)
+
+    persons = list(read_dump(path, instance_of=["Q5"], extra=True, processes=0))
+    light = list(read_dump(path, keep_raw=False, processes=0))
+
+    assert [e.gender for e in persons] == [None, "female"]
+    assert all(e.raw == {} for e in light)
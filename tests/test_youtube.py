@@ -27,3 +27,21 @@ def test_transform_rss():
         data = f.read()
     parsed = youtube.transform_rss(data)
     assert isinstance(parsed[0], youtube.RSSVideo)
+
+
+def test_youtube_extract_initial_data():
+    with open("tests/youtube_video.html", "rb") as f:
+        data = f.read()
+    player = youtube.extract_initial_data(data, "ytInitialPlayerResponse")
+    initial = youtube.extract_initial_data(data.decode("utf-8"))
+
+    assert player["videoDetails"]["videoId"]
+    assert "contents" in initial
+    assert youtube.extract_initial_data("<html>ytInitialData</html>") is None
+
+
+def test_transform_rss_fast():
+    with open("tests/youtube_channel_rss.xml", "rb") as f:
+        data = f.read()
+    parsed = youtube.transform_rss_fast(data)
+    assert parsed == youtube.transform_rss(data.decode("utf-8"))
@@ -0,0 +1,76 @@
+import asyncio
+
+from datahtml import youtube
+from datahtml.youtube_poller import ChannelPoller
+from tests import MockCrawler, make_response
+
+CHANNEL = "UCEbUCwLu8gHSCNVpONOT6pA"
+OTHER = "UCbCmjCuTUZos6Inko4u57UQ"
+
+
+def _crawler():
+    with open("tests/youtube_channel_rss.xml", "rb") as f:
+        data = f.read()
+
+    def route(url, headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return make_response(url, b"", status_code=304)
+        return make_response(
+            url, data, content_type="text/xml; charset=UTF-8", headers={"etag": '"v1"'}
+        )
+
+    return MockCrawler(
+        {
+            youtube.channel_rss_from_id(CHANNEL): route,
+            # the same videos through another feed aren't emitted twice
+            youtube.channel_rss_from_id(OTHER): make_response(
+                youtube.channel_rss_from_id(OTHER), data, content_type="text/xml"
+            ),
+        }
+    )
+
+
+def test_youtube_poller_poll():
+    c = _crawler()
+    poller = ChannelPoller(concurrency=2)
+    poller.add_channels([CHANNEL, OTHER, CHANNEL])
+    first = asyncio.run(poller.poll(c, now=1000.0))
+    second = asyncio.run(poller.poll(c, now=10**6))
+
+    assert len(first) == 15
+    assert first[0].channel_id == CHANNEL
+    assert second == []
+    assert poller.stats.polls == 4
+    assert poller.stats.not_modified == 1
+    assert poller.stats.new_entries == 15
+    assert poller.stats.entries == 45
+    assert poller.stats.feeds_per_sec > 0
+
+
+def test_youtube_poller_invalid_feed():
+    url = youtube.channel_rss_from_id(CHANNEL)
+    c = MockCrawler({url: make_response(url, b"<html>", content_type="text/html")})
+    poller = ChannelPoller()
+    poller.add_channel(CHANNEL)
+
+    assert asyncio.run(poller.poll(c, now=1000.0)) == []
+    assert poller.stats.errors == 1
+    assert poller.store.get(url).errors == 1
+
+
+def test_youtube_poller_dormant_channel():
+    # without validators every poll downloads the feed, it always lists
+    # the last videos of the channel
+    url = youtube.channel_rss_from_id(CHANNEL)
+    with open("tests/youtube_channel_rss.xml", "rb") as f:
+        c = MockCrawler({url: make_response(url, f.read(), content_type="text/xml")})
+    poller = ChannelPoller(seen_ttl=3600)
+    poller.add_channel(CHANNEL)
+    first = asyncio.run(poller.poll(c, now=1000.0))
+
+    later = []
+    for day in range(1, 4):
+        later.extend(asyncio.run(poller.poll(c, now=1000.0 + day * 86400)))
+
+    assert len(first) == 15
+    assert later == []